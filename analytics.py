@@ -0,0 +1,301 @@
+"""
+SR TRADE - Performance Analytics
+Trading performance metrics over a user's closed trades, without Qt.
+
+Closed trades are held per user as numpy columns in exit order. Every
+metric is a whole-array pass over them: the equity curve is a cumsum,
+drawdowns come from running maxima, streaks from run boundaries and
+daily returns from np.add.reduceat. The per-strategy and per-symbol
+breakdowns are the same passes over trades sorted by group, with
+np.bincount and ufunc.reduceat collecting each group's figures, so a
+report costs a few numpy calls however many trades and groups there are.
+
+Loaded trades are cached per user. A refresh reads only the trades
+closed since the last one; the user's trade_summary row (see
+DatabaseManager.init_summary) tells when anything else changed, in
+which case the user's trades are read again from scratch.
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from lod import Columns
+
+TRADING_DAYS = 252
+SECONDS_PER_DAY = 86400
+
+# A user's closed trades; ClosedTrades sorts the rows. Trades imported
+# without an exit date are timed by their entry date.
+CLOSED_TRADES = '''
+    SELECT id, CAST(strftime('%s', COALESCE(exit_date, trade_date)) AS INTEGER),
+           COALESCE(pnl, 0), symbol, COALESCE(strategy, ''), COALESCE(exit_date, '')
+    FROM trades
+    WHERE user_id = ? AND status = 'CLOSED'
+'''
+
+# Those with an exit_date at or after the given one (idx_trades_closed)
+CLOSED_SINCE = CLOSED_TRADES + "AND exit_date >= ?"
+
+
+class Performance:
+    """Metrics over one sequence of closed trades (all, or one strategy / symbol)."""
+
+    FIELDS = (
+        'trades', 'wins', 'losses', 'win_rate', 'net_pnl', 'gross_profit', 'gross_loss',
+        'avg_win', 'avg_loss', 'expectancy', 'profit_factor',
+        'max_drawdown', 'drawdown_trades', 'drawdown_days',
+        'longest_win_streak', 'longest_loss_streak', 'current_streak',
+        'days', 'sharpe', 'sortino',
+    )
+
+    # No trades at all
+    EMPTY = dict.fromkeys(FIELDS, 0)
+    EMPTY.update(win_rate=math.nan, expectancy=math.nan, profit_factor=math.nan,
+                 sharpe=math.nan, sortino=math.nan)
+
+    def __init__(self, values):
+        for name in self.FIELDS:
+            setattr(self, name, values[name])
+
+
+def group_metrics(time, pnl, group, count):
+    """
+    Every Performance field as an array over `count` groups, in one pass.
+
+    Trades are sorted by (group, exit time) and `group` holds codes
+    0..count-1, each used at least once. Running values that restart per
+    group (equity, peaks, streaks, days) are taken over the whole array
+    and rebased at each group's first trade.
+    """
+    n = len(pnl)
+    index = np.arange(n)
+    starts = np.searchsorted(group, np.arange(count))
+    first = starts[group]  # each trade's group's first trade
+    is_first = index == first
+    values = {}
+
+    trades = np.bincount(group, minlength=count)
+    wins = np.bincount(group, pnl > 0, count).astype(np.int64)
+    losses = np.bincount(group, pnl < 0, count).astype(np.int64)
+    net = np.bincount(group, pnl, count)
+    gross_profit = np.bincount(group, np.maximum(pnl, 0.0), count)
+    gross_loss = np.bincount(group, np.maximum(-pnl, 0.0), count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values.update(
+            trades=trades, wins=wins, losses=losses, win_rate=wins / trades,
+            net_pnl=net, gross_profit=gross_profit, gross_loss=gross_loss,
+            avg_win=np.where(wins > 0, gross_profit / wins, 0.0),
+            avg_loss=np.where(losses > 0, gross_loss / losses, 0.0),
+            # Mean P&L per trade: win rate * average win - loss rate * average loss
+            expectancy=net / trades,
+            profit_factor=np.where(gross_loss > 0, gross_profit / gross_loss,
+                                   np.where(gross_profit > 0, math.inf, math.nan)),
+        )
+
+    # Equity curves, each starting from 0 before the group's first trade
+    total = np.cumsum(pnl)
+    equity = total - (total - pnl)[starts][group]
+    peak = np.maximum(pd.Series(equity).groupby(group).cummax().to_numpy(), 0.0)
+    drawdown = equity - peak
+    values['max_drawdown'] = np.maximum.reduceat(peak - equity, starts)
+
+    # The last peak at or before each trade (first - 1 for the starting
+    # 0); a spell under water lasts from that peak until the trade that
+    # gets back to it
+    under = drawdown < 0
+    last_peak = np.maximum.accumulate(np.where(under, first - 1, index))
+    previous = np.where(is_first, first - 1, np.concatenate([[-1], last_peak[:-1]]))
+    spell = under | (np.concatenate([[False], under[:-1]]) & ~is_first)
+    values['drawdown_trades'] = np.maximum.reduceat(np.where(spell, index - previous, 0), starts)
+    duration = np.where(spell, time - time[np.maximum(previous, first)], 0)
+    values['drawdown_days'] = np.maximum.reduceat(duration, starts) / SECONDS_PER_DAY
+
+    # Runs of wins (sign 1), losses (-1) and flat trades (0)
+    sign = np.sign(pnl).astype(np.int8)
+    runs = np.flatnonzero(is_first | np.concatenate([[True], sign[1:] != sign[:-1]]))
+    lengths = np.diff(np.append(runs, n))
+    run_group, run_sign = group[runs], sign[runs]
+    for name, kind in (('longest_win_streak', 1), ('longest_loss_streak', -1)):
+        longest = np.zeros(count, dtype=np.int64)
+        mask = run_sign == kind
+        np.maximum.at(longest, run_group[mask], lengths[mask])
+        values[name] = longest
+    # Positive for a run of wins, negative for losses
+    last_run = np.searchsorted(runs, np.append(starts[1:], n) - 1, side='right') - 1
+    values['current_streak'] = lengths[last_run] * run_sign[last_run]
+
+    values.update(daily_ratios(time, pnl, group, count, is_first))
+    return values
+
+
+def daily_ratios(time, pnl, group, count, is_first):
+    """
+    Annualized Sharpe and Sortino ratios of each group's daily P&L.
+
+    Days are UTC calendar days with at least one closed trade. The
+    ratios are of P&L rather than of returns on capital, which the
+    journal does not record; both are scale free, so they come out the
+    same for any fixed account size.
+    """
+    day = time // SECONDS_PER_DAY
+    day_starts = np.flatnonzero(is_first | np.concatenate([[True], day[1:] != day[:-1]]))
+    daily = np.add.reduceat(pnl, day_starts)
+    day_group = group[day_starts]
+    days = np.bincount(day_group, minlength=count)
+    mean = np.bincount(day_group, daily, count) / days
+    spread = np.bincount(day_group, (daily - mean[day_group]) ** 2, count)
+    downside = np.sqrt(np.bincount(day_group, np.minimum(daily, 0.0) ** 2, count) / days)
+    scale = math.sqrt(TRADING_DAYS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(spread / (days - 1))
+        return {
+            'days': days,
+            'sharpe': np.where((days > 1) & (std > 0), mean / std * scale, math.nan),
+            'sortino': np.where((days > 1) & (downside > 0), mean / downside * scale, math.nan),
+        }
+
+
+def performances(time, pnl, group, count):
+    """A Performance per group (see group_metrics)."""
+    values = group_metrics(time, pnl, group, count)
+    columns = [values[name].tolist() for name in Performance.FIELDS]
+    return [Performance(dict(zip(Performance.FIELDS, row))) for row in zip(*columns)]
+
+
+class Report:
+    """A user's Performance overall and broken down by strategy and by symbol."""
+
+    def __init__(self, trades):
+        self.time = trades['time']
+        self.equity = np.cumsum(trades['pnl'])
+        if len(self.time):
+            self.overall, = performances(self.time, trades['pnl'],
+                                         np.zeros(len(self.time), dtype=np.intp), 1)
+        else:
+            self.overall = Performance(Performance.EMPTY)
+        self.by_strategy = breakdown(trades, 'strategy')
+        self.by_symbol = breakdown(trades, 'symbol')
+
+
+def breakdown(trades, key):
+    """{value of `key`: Performance} over the trades with that value."""
+    codes, names = pd.factorize(trades[key])
+    if not len(names):
+        return {}
+    # A stable sort keeps each group's trades in exit order
+    order = np.argsort(codes, kind='stable')
+    results = performances(trades['time'][order], trades['pnl'][order], codes[order], len(names))
+    return {name or "(none)": result for name, result in zip(names, results)}
+
+
+# ============================================
+# CACHE
+# ============================================
+class ClosedTrades:
+    """One user's closed trades as growable columns, sorted by (time, id)."""
+
+    def __init__(self):
+        self.columns = None
+        self.watermark = ''  # latest exit_date text loaded
+        self.total_pnl = 0.0
+        self.report = None
+
+    def __len__(self):
+        return 0 if self.columns is None else len(self.columns)
+
+    def append(self, rows):
+        """Add rows of CLOSED_TRADES; returns the number actually new."""
+        if not rows:
+            return 0
+        ids, times, pnl, symbols, strategies, exits = zip(*rows)
+        new = {
+            'id': np.array(ids, dtype=np.int64),
+            'time': np.array(times, dtype=np.int64),
+            'pnl': np.array(pnl, dtype=np.float64),
+            'symbol': np.array(symbols, dtype=object),
+            'strategy': np.array(strategies, dtype=object),
+        }
+        watermark = max(exits)
+        if self.columns is not None:
+            # Trades closed in the watermark's second were loaded already
+            keep = ~np.isin(new['id'], self.columns['id'][self.columns['time'] >= new['time'].min()])
+            new = {name: column[keep] for name, column in new.items()}
+        if not len(new['id']):
+            return 0
+
+        order = np.lexsort((new['id'], new['time']))
+        new = {name: column[order] for name, column in new.items()}
+        if self.columns is None:
+            self.columns = Columns(new)
+        else:
+            last = self.columns['time'][-1]
+            self.columns.write(len(self.columns), new)
+            if new['time'][0] < last:
+                # Closed with an exit time earlier than trades already loaded
+                view = self.columns.view()
+                order = np.lexsort((view['id'], view['time']))
+                self.columns.write(0, {name: column[order] for name, column in view.items()})
+        self.watermark = max(self.watermark, watermark)
+        self.total_pnl += float(new['pnl'].sum())
+        self.report = None
+        return len(new['id'])
+
+
+class TradeAnalytics:
+    """
+    Performance reports per user, kept between calls.
+
+    report() reads the trades closed since the previous call and
+    recomputes only when there are any. Safe to call from worker threads.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def report(self, user_id, token=None, progress=None):
+        with self.lock:
+            trades = self.refresh(user_id, progress)
+            if token is not None:
+                token.check()
+            if trades.report is None:
+                if progress is not None:
+                    progress(70, f"Analyzing {len(trades):,} closed trades...")
+                trades.report = Report(trades.columns.view() if len(trades) else empty_columns())
+            return trades.report
+
+    def refresh(self, user_id, progress=None):
+        summary = self.db.get_summary(user_id)
+        expected = (summary['closed_trades'], summary['realized_pnl'])
+        trades = self.users.get(user_id)
+        if trades is not None:
+            if matches(trades, expected):
+                return trades
+            # Read only the trades closed since, if they account for the change
+            trades.append(self.db.execute_query(CLOSED_SINCE, (user_id, trades.watermark)))
+            if matches(trades, expected):
+                return trades
+
+        # First use, or trades were reopened, edited, deleted or imported
+        if progress is not None:
+            progress(10, "Loading closed trades...")
+        trades = ClosedTrades()
+        trades.append(self.db.execute_query(CLOSED_TRADES, (user_id,)))
+        self.users[user_id] = trades
+        return trades
+
+
+def matches(trades, expected):
+    """True if the loaded trades add up to the summary's (count, realized P&L)."""
+    count, pnl = expected
+    # The summary is a running sum, so allow for float rounding
+    return len(trades) == count and math.isclose(trades.total_pnl, pnl, rel_tol=1e-9, abs_tol=0.005)
+
+
+def empty_columns():
+    return {'id': np.empty(0, np.int64), 'time': np.empty(0, np.int64),
+            'pnl': np.empty(0, np.float64), 'symbol': np.empty(0, object),
+            'strategy': np.empty(0, object)}
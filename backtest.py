@@ -0,0 +1,239 @@
+"""
+SR TRADE - Backtester
+Runs entry/exit rules over a symbol's cached bars, without Qt.
+
+Rules use the screener's language (see screener.py), evaluated at every
+bar instead of only the last one:
+
+    entry: rsi < 30 and macd crosses_above macd_signal
+    exit:  rsi > 70 or close < sma_50
+
+Each indicator a rule names is computed once over the whole history
+with the functions in indicators.py.
+A signal on a bar's close is filled at the next bar's open, so no bar
+trades on information it did not have. Positions are built without a
+per-bar loop: entries set the state to 1, exits to 0, and a running
+maximum over the indices of those bars carries the last state forward.
+
+Fills pay SLIPPAGE against the trade, and every order pays BROKERAGE plus
+COMMISSION_RATE of its value. The trades come out as rows of the trades
+table (trade_import.INSERT_COLUMNS), so save_trades() can put them in the
+journal where the trade views and analytics show them.
+"""
+import numpy as np
+import pandas as pd
+
+import indicators
+from analytics import Report
+from screener import MA_COLUMN, parse_rule, rule_names
+from trade_import import DATE_FORMAT, INSERT_COLUMNS, INSERT_TRADE, sql_rows
+
+# Costs per order
+BROKERAGE = 20.0          # flat, per order
+COMMISSION_RATE = 0.0003  # of the order's value (taxes and exchange fees)
+SLIPPAGE = 0.0005         # price moved against each fill
+
+BACKTEST_STRATEGY = "Backtest"
+
+COMPARE = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater,
+    '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal,
+}
+
+
+def rule_signal(node, columns):
+    """Boolean array over bars of a parsed rule; NaN comparisons are False."""
+    kind = node[0]
+    if kind == 'and':
+        return rule_signal(node[1], columns) & rule_signal(node[2], columns)
+    if kind == 'or':
+        return rule_signal(node[1], columns) | rule_signal(node[2], columns)
+    if kind == 'not':
+        return ~rule_signal(node[1], columns)
+
+    _, op, left, right = node
+    a, b = operand(left, columns), operand(right, columns)
+    with np.errstate(invalid='ignore'):
+        if op in ('crosses_above', 'crosses_below'):
+            a_prev, b_prev = previous(a), previous(b)
+            if op == 'crosses_above':
+                return (a_prev <= b_prev) & (a > b)
+            return (a_prev >= b_prev) & (a < b)
+        return COMPARE[op](a, b)
+
+
+def operand(node, columns):
+    if node[0] == 'number':
+        return np.full(len(columns['close']), node[1])
+    return columns[node[1]]
+
+
+def previous(values):
+    return np.concatenate([[np.nan], values[:-1]])
+
+
+def indicator_columns(close, rules, rsi_period=14, macd_params=(12, 26, 9)):
+    """The indicators the parsed rules use, one value per bar."""
+    names = set().union(*(rule_names(rule) for rule in rules))
+    columns = {'close': close}
+    if 'rsi' in names:
+        columns['rsi'] = indicators.rsi(close, rsi_period)
+    if names & {'macd', 'macd_signal', 'macd_hist'}:
+        columns['macd'], columns['macd_signal'], columns['macd_hist'] = indicators.macd(close, *macd_params)
+    if 'change_pct' in names:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['change_pct'] = (close / previous(close) - 1) * 100
+    for name in names:
+        match = MA_COLUMN.match(name)
+        if match:
+            kind, period = match.groups()
+            columns[name] = getattr(indicators, kind)(close, int(period))
+    return columns
+
+
+def positions(entry, exit):
+    """
+    1 from each entry signal until the next exit signal, else 0.
+
+    An exit on the same bar as an entry wins: the position is flat
+    after that bar.
+    """
+    state = np.where(exit, 0, np.where(entry, 1, -1))
+    index = np.arange(len(state))
+    # Index of the last bar with a signal, carried forward
+    last = np.maximum.accumulate(np.where(state >= 0, index, -1))
+    return np.where(last >= 0, state[np.maximum(last, 0)], 0)
+
+
+def date_texts(times):
+    return pd.to_datetime(times).strftime(DATE_FORMAT).to_numpy(dtype=object)
+
+
+def order_costs(fills, quantity, brokerage, commission_rate):
+    return brokerage + commission_rate * fills * quantity
+
+
+# ============================================
+# BACKTEST
+# ============================================
+class BacktestResult:
+    """Trades, per-bar equity and a performance report of one backtest."""
+
+    def __init__(self, symbol, time, trades, equity, held, report):
+        self.symbol = symbol
+        self.time = time        # bar times, ns since epoch (UTC)
+        self.trades = trades    # DataFrame of INSERT_COLUMNS, without user_id
+        self.equity = equity    # P&L marked to each bar's close, after costs
+        self.held = held        # position over each bar: 1 long, -1 short, 0 flat
+        self.report = report    # analytics.Report over the closed trades
+
+    def summary(self):
+        overall = self.report.overall
+        open_trades = int((self.trades['status'] == 'OPEN').sum())
+        final = self.equity[-1] if len(self.equity) else 0.0
+        text = f"{overall.trades:,} closed trades over {len(self.time):,} bars"
+        if overall.trades:
+            text += (f": net ₹{overall.net_pnl:,.2f}, win rate {overall.win_rate:.1%}, "
+                     f"max drawdown ₹{overall.max_drawdown:,.2f}")
+        if open_trades:
+            text += f"; position still open, equity ₹{final:,.2f}"
+        return text
+
+
+def run_backtest(symbol, bars, entry, exit, side='BUY', quantity=1,
+                 brokerage=BROKERAGE, commission_rate=COMMISSION_RATE, slippage=SLIPPAGE,
+                 rsi_period=14, macd_params=(12, 26, 9)):
+    """
+    Backtest entry/exit rule texts over bar_store.Bars.
+
+    side 'BUY' goes long on entry, 'SELL' goes short. Each trade is for
+    `quantity` units; a position still held after the last bar is
+    returned as an OPEN trade.
+    """
+    entry_rule, exit_rule = parse_rule(entry), parse_rule(exit)
+    direction = -1.0 if side == 'SELL' else 1.0
+    n = len(bars)
+
+    columns = indicator_columns(bars.close, (entry_rule, exit_rule), rsi_period, macd_params)
+    state = positions(rule_signal(entry_rule, columns), rule_signal(exit_rule, columns))
+    # Signals fill at the next bar's open
+    held = np.zeros(n, dtype=np.int8)
+    held[1:] = state[:-1]
+    change = np.diff(held, prepend=0)
+    entries, exits = np.flatnonzero(change > 0), np.flatnonzero(change < 0)
+
+    opens, closes = bars.open, bars.close
+    entry_fill = opens[entries] * (1 + direction * slippage)
+    exit_fill = opens[exits] * (1 - direction * slippage)
+    entry_cost = order_costs(entry_fill, quantity, brokerage, commission_rate)
+    exit_cost = order_costs(exit_fill, quantity, brokerage, commission_rate)
+
+    # Marked to market: each held bar earns its move from the previous
+    # close, or from the entry fill on the bar a trade opens; the bar a
+    # trade closes on earns the move from the previous close to the fill
+    reference = previous(closes)
+    reference[entries] = entry_fill
+    bar_pnl = np.where(held == 1, closes - reference, 0.0)
+    np.add.at(bar_pnl, exits, exit_fill - reference[exits])
+    bar_pnl *= direction * quantity
+    np.subtract.at(bar_pnl, entries, entry_cost)
+    np.subtract.at(bar_pnl, exits, exit_cost)
+    equity = np.cumsum(bar_pnl)
+
+    closed = len(exits)
+    pnl = (direction * (exit_fill - entry_fill[:closed]) * quantity
+           - entry_cost[:closed] - exit_cost)
+    costs = entry_cost.copy()
+    costs[:closed] += exit_cost
+    trades = trade_rows(symbol, side, quantity, date_texts(bars.time[entries]), entry_fill,
+                        date_texts(bars.time[exits]), exit_fill, pnl, costs,
+                        f"Entry: {entry}; Exit: {exit}")
+
+    report = Report({
+        'id': np.arange(closed, dtype=np.int64),
+        'time': bars.time[exits] // 1_000_000_000,
+        'pnl': pnl,
+        'symbol': np.full(closed, symbol, dtype=object),
+        'strategy': np.full(closed, BACKTEST_STRATEGY, dtype=object),
+    })
+    return BacktestResult(symbol, bars.time, trades, equity, held * np.int8(direction), report)
+
+
+def trade_rows(symbol, side, quantity, entry_dates, entry_fill, exit_dates, exit_fill, pnl, costs,
+               description):
+    """The backtest's trades as a DataFrame of trades-table columns; the last may be open."""
+    count, closed = len(entry_dates), len(exit_dates)
+    still_open = count - closed
+    trades = pd.DataFrame({
+        'user_id': None,
+        'symbol': symbol,
+        'trade_type': side,
+        'quantity': np.full(count, quantity, dtype=np.int64),
+        'entry_price': np.round(entry_fill, 2),
+        'exit_price': np.append(np.round(exit_fill, 2), np.full(still_open, np.nan)),
+        'stop_loss': np.nan,
+        'target_price': np.nan,
+        'trade_date': entry_dates,
+        'exit_date': np.append(exit_dates, np.full(still_open, None)),
+        'expiry_date': None,
+        'strike_price': np.nan,
+        'option_type': None,
+        'strategy': BACKTEST_STRATEGY,
+        'notes': [f"{description}; costs ₹{cost:,.2f}" for cost in costs.tolist()],
+        'status': ['CLOSED'] * closed + ['OPEN'] * still_open,
+        'pnl': np.append(np.round(pnl, 2), np.zeros(still_open)),
+    })
+    return trades[list(INSERT_COLUMNS)]
+
+
+def backtest(bar_store, symbol, interval, entry, exit, **options):
+    """run_backtest() over every cached bar of symbol/interval."""
+    return run_backtest(symbol, bar_store.read(symbol, interval), entry, exit, **options)
+
+
+def save_trades(db, user_id, result):
+    """Add a backtest's trades to user_id's journal; returns the number saved."""
+    trades = result.trades.assign(user_id=user_id)
+    with db.bulk_insert() as conn:
+        conn.executemany(INSERT_TRADE, sql_rows(trades))
+    return len(trades)
@@ -0,0 +1,359 @@
+"""
+SR TRADE - OHLCV Bar Store
+Columnar, binary storage of price bars per symbol and interval.
+
+Bars are kept in chunks of up to CHUNK_SIZE rows. Each chunk is a single
+BLOB holding the int64 timestamps (ns since epoch, UTC) followed by the
+Open/High/Low/Close/Volume columns as contiguous float64 arrays, so a read
+is a handful of np.frombuffer calls instead of a JSON parse.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 8192
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+TIME_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f8')
+
+
+class Bars:
+    """Columnar OHLCV arrays for one symbol/interval, sorted by time."""
+
+    __slots__ = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, key):
+        return Bars(*(column[key] for column in self.columns()))
+
+    def columns(self):
+        return (self.time, self.open, self.high, self.low, self.close, self.volume)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, TIME_DTYPE), *(np.empty(0, VALUE_DTYPE) for _ in FIELDS))
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build bars from a DataFrame with a DatetimeIndex and OHLCV columns."""
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.droplevel(list(range(1, df.columns.nlevels)), axis=1)
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        time = index.as_unit('ns').asi8.astype(TIME_DTYPE)
+        values = [
+            np.ascontiguousarray(df[field].to_numpy(dtype=VALUE_DTYPE, na_value=np.nan))
+            if field in df else np.full(len(df), np.nan)
+            for field in FIELDS
+        ]
+        return cls(time, *values)
+
+    def to_frame(self):
+        index = pd.DatetimeIndex(self.time.view('datetime64[ns]'))
+        return pd.DataFrame(dict(zip(FIELDS, self.columns()[1:])), index=index)
+
+
+def concat_bars(parts):
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return Bars.empty()
+    if len(parts) == 1:
+        return parts[0]
+    return Bars(*(np.concatenate(columns) for columns in zip(*(p.columns() for p in parts))))
+
+
+def merge_bars(old, new):
+    """Union two bar sets by timestamp; rows from `new` win on collisions."""
+    if not len(old):
+        order = np.argsort(new.time, kind='stable')
+        merged = new[order]
+    else:
+        merged = concat_bars([old, new])
+        order = np.argsort(merged.time, kind='stable')
+        merged = merged[order]
+    # Keep the last occurrence of each timestamp (the one from `new`)
+    keep = np.ones(len(merged), dtype=bool)
+    keep[:-1] = merged.time[1:] != merged.time[:-1]
+    return merged[keep]
+
+
+def encode_chunk(bars):
+    return b''.join(np.ascontiguousarray(column).tobytes() for column in bars.columns())
+
+
+def decode_chunk(payload, count):
+    # np.frombuffer returns read-only views over the BLOB, no copy is made
+    time = np.frombuffer(payload, dtype=TIME_DTYPE, count=count)
+    step = count * VALUE_DTYPE.itemsize
+    values = [
+        np.frombuffer(payload, dtype=VALUE_DTYPE, count=count,
+                      offset=count * TIME_DTYPE.itemsize + i * step)
+        for i in range(len(FIELDS))
+    ]
+    return Bars(time, *values)
+
+
+def to_timestamp(value):
+    """Normalize None/datetime/str/ns-int bounds to ns since epoch (UTC)."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.as_unit('ns').value
+
+
+class BarStore:
+    def __init__(self, db):
+        self.db = db
+        self.listeners = []
+        # A read-only store (the screener's processes) trusts the schema
+        # the application has already set up
+        if not db.read_only:
+            self.init_tables()
+            self.migrate_market_cache()
+
+    def init_tables(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    end_ts INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (symbol, interval, start_ts)
+                ) WITHOUT ROWID
+            ''')
+
+            # Bumped on every write so caches can tell when a series changed
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS bar_versions (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (symbol, interval)
+                ) WITHOUT ROWID
+            ''')
+
+    def add_listener(self, callback):
+        """Call callback(symbol, interval) after bars of a series are written."""
+        self.listeners.append(callback)
+
+    # ----------------------------------------
+    # Reads
+    # ----------------------------------------
+    def read(self, symbol, interval, start=None, end=None):
+        """
+        Return the bars of symbol/interval with start <= time <= end.
+
+        Columns are read-only arrays. A range inside one chunk comes back as
+        views over the stored buffer; wider ranges are joined in one pass.
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        query = "SELECT count, payload FROM bars WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start is not None:
+            query += " AND end_ts >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND start_ts <= ?"
+            params.append(end)
+        query += " ORDER BY start_ts"
+
+        bars = concat_bars([decode_chunk(payload, count)
+                            for count, payload in self.db.execute_query(query, params)])
+        lo = 0 if start is None else np.searchsorted(bars.time, start, side='left')
+        hi = len(bars) if end is None else np.searchsorted(bars.time, end, side='right')
+        return bars[lo:hi]
+
+    def read_frame(self, symbol, interval, start=None, end=None):
+        return self.read(symbol, interval, start, end).to_frame()
+
+    def read_versioned(self, symbol, interval, start=None, end=None):
+        """
+        Return (bars, version) read from one snapshot.
+
+        The version is that of exactly these bars, so results cached
+        under it always match them, even with writes landing meanwhile.
+        """
+        with self.db.snapshot():
+            return self.read(symbol, interval, start, end), self.version(symbol, interval)
+
+    def tail(self, symbol, interval, count=1):
+        """Return the last `count` bars, reading only the trailing chunks."""
+        chunks = []
+        total = 0
+        # Iterate the cursor lazily so older chunks are never fetched
+        for n, payload in self.db.connection.execute(
+            "SELECT count, payload FROM bars WHERE symbol = ? AND interval = ? "
+            "ORDER BY start_ts DESC",
+            (symbol, interval)
+        ):
+            chunks.append(decode_chunk(payload, n))
+            total += n
+            if total >= count:
+                break
+        bars = concat_bars(chunks[::-1])
+        return bars[max(len(bars) - count, 0):]
+
+    def last_timestamp(self, symbol, interval):
+        result = self.db.execute_query(
+            "SELECT MAX(end_ts) FROM bars WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        )
+        return result[0][0]
+
+    def version(self, symbol, interval):
+        """Data version of a series; changes whenever its bars are written."""
+        result = self.db.execute_query(
+            "SELECT version FROM bar_versions WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        )
+        return result[0][0] if result else 0
+
+    def series(self):
+        """List the (symbol, interval) pairs that have bars stored."""
+        return self.db.execute_query(
+            "SELECT DISTINCT symbol, interval FROM bars ORDER BY symbol, interval"
+        )
+
+    # ----------------------------------------
+    # Writes
+    # ----------------------------------------
+    def write(self, symbol, interval, bars):
+        """
+        Merge bars into the store, replacing rows with the same timestamp.
+
+        Only chunks from the first affected one onward are rewritten, so
+        appending new bars touches the tail chunk and nothing else.
+        """
+        if isinstance(bars, pd.DataFrame):
+            bars = Bars.from_frame(bars)
+        if not len(bars):
+            return 0
+
+        first = int(bars.time.min())
+        with self.db.transaction() as conn:
+            # Earliest chunk the new rows can land in
+            row = conn.execute(
+                "SELECT MAX(start_ts) FROM bars WHERE symbol = ? AND interval = ? "
+                "AND start_ts <= ?",
+                (symbol, interval, first)
+            ).fetchone()
+            rewrite_from = row[0] if row[0] is not None else first
+
+            old = concat_bars([
+                decode_chunk(payload, count) for count, payload in conn.execute(
+                    "SELECT count, payload FROM bars WHERE symbol = ? AND interval = ? "
+                    "AND start_ts >= ? ORDER BY start_ts",
+                    (symbol, interval, rewrite_from)
+                )
+            ])
+            merged = merge_bars(old, bars)
+
+            conn.execute(
+                "DELETE FROM bars WHERE symbol = ? AND interval = ? AND start_ts >= ?",
+                (symbol, interval, rewrite_from)
+            )
+            conn.executemany(
+                "INSERT INTO bars (symbol, interval, start_ts, end_ts, count, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (symbol, interval, int(chunk.time[0]), int(chunk.time[-1]),
+                     len(chunk), encode_chunk(chunk))
+                    for chunk in (merged[i:i + CHUNK_SIZE]
+                                  for i in range(0, len(merged), CHUNK_SIZE))
+                ]
+            )
+            self.bump_version(conn, symbol, interval)
+
+        for callback in self.listeners:
+            callback(symbol, interval)
+        return len(bars)
+
+    def bump_version(self, conn, symbol, interval):
+        conn.execute(
+            "INSERT INTO bar_versions (symbol, interval, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (symbol, interval) DO UPDATE SET version = version + 1",
+            (symbol, interval)
+        )
+
+    def delete(self, symbol, interval=None):
+        with self.db.transaction() as conn:
+            if interval is None:
+                conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+                conn.execute(
+                    "UPDATE bar_versions SET version = version + 1 WHERE symbol = ?", (symbol,)
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+                )
+                self.bump_version(conn, symbol, interval)
+
+        for callback in self.listeners:
+            callback(symbol, interval)
+
+    # ----------------------------------------
+    # Migration
+    # ----------------------------------------
+    def migrate_market_cache(self, interval='1d'):
+        """
+        Move the legacy JSON rows of market_cache into the bar store.
+
+        market_cache only ever held daily downloads, so rows land under
+        `interval`. The table is dropped afterwards, so this runs once.
+        """
+        exists = self.db.execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'market_cache'"
+        )
+        if not exists:
+            return 0
+
+        migrated = 0
+        with self.db.transaction():
+            for symbol, data in self.db.execute_query("SELECT symbol, data FROM market_cache"):
+                try:
+                    bars = parse_cached_json(data)
+                except (ValueError, TypeError):
+                    continue
+                migrated += self.write(symbol, interval, bars)
+            self.db.execute_query("DROP TABLE market_cache")
+        return migrated
+
+
+def parse_cached_json(data):
+    """Decode a DataFrame.to_json() blob ({column: {epoch_ms: value}})."""
+    columns = {}
+    for key, values in json.loads(data).items():
+        # Multi-level columns serialize as "('Close', 'TCS')" or '["Close","TCS"]'
+        name = key.strip("([)]").split(',')[0].strip(" '\"")
+        if name in FIELDS:
+            columns[name] = values
+    if not columns:
+        raise ValueError("no OHLCV columns in cached data")
+
+    keys = sorted(next(iter(columns.values())), key=int)
+    time = np.array([int(k) for k in keys], dtype=TIME_DTYPE) * 1_000_000
+    values = [
+        np.array([columns[field].get(k) if field in columns else None for k in keys],
+                 dtype=VALUE_DTYPE)
+        for field in FIELDS
+    ]
+    return Bars(time, *values)
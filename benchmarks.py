@@ -0,0 +1,324 @@
+"""
+SR TRADE - Benchmarks
+Times the hot paths against their previous implementations.
+
+Usage: python benchmarks.py [name ...]   (default: all)
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def timeit(fn, *args, repeat=5):
+    """Best wall time of `repeat` runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def random_walk(n, seed=0):
+    return 100 + np.cumsum(np.random.default_rng(seed).standard_normal(n))
+
+
+# ============================================
+# INDICATORS
+# ============================================
+def legacy_rsi(prices, period=14):
+    # TechnicalIndicatorChart.calculate_rsi before indicators.py
+    deltas = np.diff(prices)
+    seed = deltas[:period+1]
+    up = seed[seed >= 0].sum()/period
+    down = -seed[seed < 0].sum()/period
+    rs = up/down
+    rsi = np.zeros_like(prices)
+    rsi[:period] = 100. - 100./(1.+rs)
+    
+    for i in range(period, len(prices)):
+        delta = deltas[i-1]
+        if delta > 0:
+            upval = delta
+            downval = 0.
+        else:
+            upval = 0.
+            downval = -delta
+        
+        up = (up*(period-1) + upval)/period
+        down = (down*(period-1) + downval)/period
+        rs = up/down
+        rsi[i] = 100. - 100./(1.+rs)
+    
+    return rsi
+
+
+def legacy_macd(prices, fast=12, slow=26, signal=9):
+    exp1 = prices.ewm(span=fast, adjust=False).mean()
+    exp2 = prices.ewm(span=slow, adjust=False).mean()
+    macd = exp1 - exp2
+    signal_line = macd.ewm(span=signal, adjust=False).mean()
+    histogram = macd - signal_line
+    return macd, signal_line, histogram
+
+
+def bench_indicators(n=1_000_000):
+    import indicators
+
+    prices = random_walk(n)
+    series = pd.Series(prices)
+
+    old = timeit(legacy_rsi, prices, repeat=1)
+    new = timeit(indicators.rsi, prices)
+    error = np.max(np.abs(legacy_rsi(prices) - indicators.rsi(prices)))
+    print(f"rsi   {n:,} bars: loop {old * 1000:8.1f} ms  vectorized {new * 1000:6.1f} ms  "
+          f"x{old / new:5.1f}  max diff {error:.1e}")
+
+    old = timeit(legacy_macd, series)
+    new = timeit(indicators.macd, prices)
+    error = max(np.max(np.abs(a.to_numpy() - b))
+                for a, b in zip(legacy_macd(series), indicators.macd(prices)))
+    print(f"macd  {n:,} bars: pandas {old * 1000:6.1f} ms  vectorized {new * 1000:6.1f} ms  "
+          f"x{old / new:5.1f}  max diff {error:.1e}")
+
+    # A missing bar blanks only the windows that contain it, as in pandas
+    gappy = series.copy()
+    gappy.iloc[::1000] = np.nan
+    expected = gappy.rolling(20).mean().to_numpy()
+    result = indicators.sma(gappy, 20)
+    assert np.array_equal(np.isnan(result), np.isnan(expected)), "sma NaN windows differ from pandas"
+    error = np.nanmax(np.abs(result - expected))
+    print(f"sma   {n:,} bars, every 1000th NaN: {np.isnan(result).sum():,} NaN as in pandas  "
+          f"max diff {error:.1e}")
+
+    # EMAs carry the last value through a missing bar, as pandas ewm does
+    for fast, slow, signal in ((12, 26, 9), (3, 5, 3)):
+        expected = legacy_macd(gappy, fast, slow, signal)
+        result = indicators.macd(gappy, fast, slow, signal)
+        assert not np.isnan(result[0][1:]).any(), "macd is NaN after a missing bar"
+        assert all(np.array_equal(np.isnan(a.to_numpy()), np.isnan(b))
+                   for a, b in zip(expected, result)), "macd NaN bars differ from pandas"
+        error = max(np.nanmax(np.abs(a.to_numpy() - b)) for a, b in zip(expected, result))
+        tail = gappy.to_numpy()[-5000:]
+        state = indicators.MACDState(fast, slow, signal).seed(gappy.to_numpy()[:-5000])
+        streamed = np.array([state.update(value) for value in tail]).T
+        error = max(error, *(np.nanmax(np.abs(a.to_numpy()[-5000:] - b))
+                             for a, b in zip(expected, streamed)))
+        print(f"macd  {n:,} bars ({fast}, {slow}, {signal}), every 1000th NaN: batch and streaming "
+              f"max diff {error:.1e}")
+
+
+# ============================================
+# CHARTS
+# ============================================
+def frame_time(fn, frames):
+    """Mean wall time of one fn(frame) call over `frames` frames, in seconds."""
+    start = time.perf_counter()
+    for frame in range(frames):
+        fn(frame)
+    return (time.perf_counter() - start) / frames
+
+
+def bench_charts(n=20_000, frames=50):
+    import os
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from main import CHART_BACKENDS
+
+    close = random_walk(n)
+    open = np.append(close[0], close[:-1])
+    df = pd.DataFrame({
+        'Open': open, 'High': np.maximum(open, close) + 0.5, 'Low': np.minimum(open, close) - 0.5,
+        'Close': close, 'Volume': np.random.default_rng(1).uniform(1e4, 1e6, n),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='min'))
+
+    def matplotlib_pan(chart, frame):
+        ax = chart.ax
+        low, high = ax.get_xlim()
+        step = (high - low) * 0.01 * (-1 if frame % 20 >= 10 else 1)
+        ax.set_xlim(low + step, high + step)
+        chart.canvas.draw()
+
+    def qt_pan(chart, frame):
+        pane = chart.panes[0]
+        low, high = pane.x_range()
+        step = (high - low) * 0.01 * (-1 if frame % 20 >= 10 else 1)
+        pane.set_x(low + step, high + step)  # rangeChanged syncs and re-decimates the panes
+
+    pans = {"Matplotlib": matplotlib_pan, "Qt Charts": qt_pan}
+
+    print(f"charts {n:,} bars, RSI + MACD + Bollinger, mean of {frames} frames:")
+    for name, (chart_class, _) in CHART_BACKENDS.items():
+        chart = chart_class()
+        chart.indicators = ["Bollinger Bands", "RSI", "MACD"]
+        chart.resize(1200, 800)
+        chart.show()
+        app.processEvents()
+
+        def render():
+            chart.render(df)
+            chart.grab()
+
+        def tick(frame):
+            chart.update_tick(close[-1] + np.sin(frame / 5), 100.0)
+            chart.grab()
+
+        def pan(frame):
+            pans[name](chart, frame)
+            chart.grab()
+
+        full = timeit(render, repeat=3)
+        chart.plot_candlestick(df, "bench")
+        chart.grab()
+        print(f"  {name:<10}  render {full * 1000:7.1f} ms  tick {frame_time(tick, frames) * 1000:6.1f} ms  "
+              f"pan {frame_time(pan, frames) * 1000:6.1f} ms")
+        chart.close()
+
+
+# ============================================
+# TICKS
+# ============================================
+def bench_ticks(symbols=5000, seconds=2.0, interval=0.1):
+    from ticks import SimulatedFeed, TickHub
+
+    hub = TickHub()
+    prices = {f"SYM{i}": 100.0 for i in range(symbols)}
+    watched = list(prices)[:500]
+    feed = SimulatedFeed(hub, prices, rate=None, seed=1)
+    everything, watchlist = hub.subscribe(), hub.subscribe(watched)
+
+    polls, delivered, poll_time = 0, 0, 0.0
+    feed.start()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        time.sleep(interval)
+        start = time.perf_counter()
+        delivered += len(everything.poll()) + len(watchlist.poll())
+        poll_time = max(poll_time, time.perf_counter() - start)
+        polls += 1
+    feed.stop()
+
+    print(f"ticks {symbols:,} symbols, polled every {interval * 1000:.0f} ms for {seconds:.0f} s:")
+    print(f"  published {feed.published / seconds:10,.0f} ticks/s  delivered {delivered / seconds:8,.0f} "
+          f"updates/s  ({delivered / polls:,.0f} per poll, slowest poll {poll_time * 1000:.1f} ms)")
+
+
+# ============================================
+# OPTIONS
+# ============================================
+def scalar_chain(spot, strikes, years, vol, calls, rate):
+    """Price and Greeks contract by contract with scipy.stats, as before."""
+    from scipy.stats import norm
+
+    rows = []
+    for strike, t, call in zip(strikes, years, calls):
+        d1 = (np.log(spot / strike) + (rate + vol * vol / 2) * t) / (vol * np.sqrt(t))
+        d2 = d1 - vol * np.sqrt(t)
+        if call:
+            value = spot * norm.cdf(d1) - strike * np.exp(-rate * t) * norm.cdf(d2)
+            delta = norm.cdf(d1)
+        else:
+            value = strike * np.exp(-rate * t) * norm.cdf(-d2) - spot * norm.cdf(-d1)
+            delta = norm.cdf(d1) - 1
+        gamma = norm.pdf(d1) / (spot * vol * np.sqrt(t))
+        vega = spot * norm.pdf(d1) * np.sqrt(t) / 100
+        rows.append((value, delta, gamma, vega))
+    return rows
+
+
+def scalar_implied_vols(premiums, spot, strikes, years, calls, rate):
+    from scipy.optimize import brentq
+    import options
+
+    result = []
+    for premium, strike, t, call in zip(premiums, strikes, years, calls):
+        try:
+            result.append(brentq(lambda vol: options.price(spot, strike, t, vol, call, rate) - premium,
+                                 options.MIN_VOL, options.MAX_VOL, xtol=1e-10))
+        except ValueError:
+            result.append(np.nan)
+    return np.array(result)
+
+
+def bench_options(strikes=100, expiries=10):
+    import options
+
+    spot, rate = 22000.0, options.RISK_FREE_RATE
+    strike_list = options.strikes_around(spot, 50, strikes)
+    dates = options.expiry_dates(expiries)
+    chain = options.Chain(spot, strike_list, dates, 0.15)
+    n = len(chain)
+    vols = np.random.default_rng(0).uniform(0.08, 0.6, n)
+    premiums = options.price(spot, chain.strike, chain.years, vols, chain.call)
+
+    old = timeit(scalar_chain, spot, chain.strike, chain.years, 0.15, chain.call, rate, repeat=1)
+    new = timeit(options.Chain, spot, strike_list, dates, 0.15)
+    print(f"chain {n:,} contracts: scipy.stats loop {old * 1000:7.1f} ms  vectorized {new * 1000:6.2f} ms  "
+          f"x{old / new:5.0f}")
+
+    old = timeit(scalar_implied_vols, premiums, spot, chain.strike, chain.years, chain.call, rate,
+                 repeat=1)
+    new = timeit(chain.implied_vols, premiums)
+    solved = chain.implied_vols(premiums)
+    error = np.nanmax(np.abs(options.price(spot, chain.strike, chain.years, solved, chain.call)
+                             - premiums))
+    print(f"iv    {n:,} contracts: brentq loop {old * 1000:10.1f} ms  vectorized {new * 1000:6.2f} ms  "
+          f"x{old / new:5.0f}  max price error {error:.1e}")
+
+
+# ============================================
+# BACKTEST
+# ============================================
+def loop_backtest(opens, close, quantity=1):
+    """rsi < 30 / rsi > 70 long trades, bar by bar, with backtest's costs."""
+    import backtest
+    import indicators
+
+    rsi = indicators.rsi(close)
+    pnl, entry = [], None
+    for i in range(len(close) - 1):
+        if entry is not None and rsi[i] > 70:
+            fill = opens[i + 1] * (1 - backtest.SLIPPAGE)
+            costs = sum(backtest.order_costs(price, quantity, backtest.BROKERAGE, backtest.COMMISSION_RATE)
+                        for price in (entry, fill))
+            pnl.append((fill - entry) * quantity - costs)
+            entry = None
+        elif entry is None and rsi[i] < 30:
+            entry = opens[i + 1] * (1 + backtest.SLIPPAGE)
+    return np.array(pnl)
+
+
+def bench_backtest(n=1_000_000):
+    import backtest
+    from bar_store import Bars
+
+    close = random_walk(n)
+    opens = np.concatenate([[close[0]], close[:-1]])
+    bars = Bars(np.arange(n, dtype=np.int64) * 60_000_000_000, opens, close, close, close, np.ones(n))
+
+    old = timeit(loop_backtest, opens, close, repeat=1)
+    new = timeit(backtest.run_backtest, "TEST", bars, "rsi < 30", "rsi > 70")
+    result = backtest.run_backtest("TEST", bars, "rsi < 30", "rsi > 70")
+    closed = result.trades.loc[result.trades['status'] == 'CLOSED', 'pnl'].to_numpy()
+    error = np.max(np.abs(closed - np.round(loop_backtest(opens, close), 2)), initial=0.0)
+    print(f"backtest {n:,} bars, {len(closed):,} trades: loop {old * 1000:7.1f} ms  "
+          f"vectorized {new * 1000:6.1f} ms  x{old / new:5.1f}  max diff {error:.1e}")
+
+
+BENCHMARKS = {
+    'indicators': bench_indicators,
+    'charts': bench_charts,
+    'ticks': bench_ticks,
+    'options': bench_options,
+    'backtest': bench_backtest,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
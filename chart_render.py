@@ -0,0 +1,341 @@
+"""
+SR TRADE - Chart Rendering
+Matplotlib artists for price charts that are updated in place.
+
+Every series is split in two: the closed bars, drawn once into the
+canvas background, and the forming bar, drawn by animated artists that
+are blitted over that background. A tick only repaints the forming bar;
+a newly closed bar is appended to the existing artists.
+
+Closed bars are drawn through lod pyramids: LevelOfDetail picks the
+level that fits the axes' pixel width and re-decimates on zoom and pan.
+"""
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.patches import Polygon
+
+import lod
+
+UP_COLOR = '#006340'
+DOWN_COLOR = '#a02128'
+
+
+def date_x(index):
+    """x positions of a DatetimeIndex, in the units ax.plot(index, ...) uses."""
+    return mdates.date2num(index)
+
+
+def bar_width(x, fraction=0.6):
+    """A box width of `fraction` of the typical spacing between bars."""
+    if len(x) < 2:
+        return fraction
+    return float(np.median(np.diff(x))) * fraction
+
+
+def padded(low, high, margin=0.05):
+    """An axis range around low..high with `margin` of it added on each side."""
+    pad = (high - low) * margin or abs(high) * margin or 1.0
+    return low - pad, high + pad
+
+
+def candle_colors(open, close):
+    return np.where((close >= open)[:, None], to_rgba_array(UP_COLOR), to_rgba_array(DOWN_COLOR))
+
+
+class BoxArtist:
+    """Vertical boxes (candle bodies, histogram bars) in one PolyCollection."""
+
+    def __init__(self, ax, width, animated=False, **style):
+        self.width = width
+        self.collection = PolyCollection([], animated=animated, **style)
+        ax.add_collection(self.collection, autolim=False)
+
+    def set_data(self, x, bottom, top, colors=None, width=None):
+        half = (width or self.width) / 2
+        left, right = x - half, x + half
+        self.collection.set_verts(np.stack([
+            np.column_stack([left, bottom]), np.column_stack([left, top]),
+            np.column_stack([right, top]), np.column_stack([right, bottom]),
+        ], axis=1))
+        if colors is not None:
+            self.collection.set_facecolor(colors)
+            self.collection.set_edgecolor(colors)
+
+
+class CandleArtist:
+    """
+    Candles as one LineCollection of wicks and one BoxArtist of bodies.
+
+    draw() paints the given bars as they are. set_data()/append() keep
+    the bars in an lod.OHLCPyramid and show() paints one level of it; a
+    decimated candle spans its bucket and is widened to match.
+    """
+
+    def __init__(self, ax, width, animated=False):
+        self.width = width
+        self.wicks = LineCollection([], linewidths=1, animated=animated)
+        ax.add_collection(self.wicks, autolim=False)
+        self.bodies = BoxArtist(ax, width, animated=animated, linewidths=0.5)
+        self.x = None
+        self.pyramid = None
+        self.view = (0, None, 0)
+
+    @property
+    def artists(self):
+        return [self.wicks, self.bodies.collection]
+
+    def draw(self, x, open, high, low, close, width=None):
+        colors = candle_colors(open, close)
+        self.wicks.set_segments(np.stack([np.column_stack([x, low]),
+                                          np.column_stack([x, high])], axis=1))
+        self.wicks.set_color(colors)
+        self.bodies.set_data(x, np.minimum(open, close), np.maximum(open, close), colors, width)
+
+    def set_data(self, x, open, high, low, close):
+        self.x = lod.Columns({'x': np.asarray(x, dtype=float)})
+        self.pyramid = lod.OHLCPyramid(open, high, low, close)
+
+    def append(self, x, open, high, low, close):
+        self.x.write(len(self.x), {'x': np.asarray(x, dtype=float)})
+        self.pyramid.append(open, high, low, close)
+        self.show(*self.view)
+
+    def show(self, lo=0, hi=None, level=0):
+        self.view = (lo, hi, level)
+        x = self.x['x']
+        bars = self.pyramid.slice(lo, len(x) if hi is None else hi, level)
+        self.draw((x[bars['first']] + x[bars['last']]) / 2, bars['open'], bars['high'],
+                  bars['low'], bars['close'], self.width * 2 ** min(level, self.pyramid.max_level()))
+
+
+class IndicatorTrack:
+    """
+    One indicator drawn as closed history plus a live segment.
+
+    `values` are the indicator's outputs over every bar (the last one
+    forming); `state` is an indicators.IndicatorState seeded with the
+    closed bars, or None to plot the `source` field itself. `outputs`
+    gives, per output, a Line2D style dict, ('bar', style) or None to
+    skip it; `fill` = (i, j, style) shades between outputs i and j.
+    With live=False every bar is history and nothing is animated.
+    """
+
+    def __init__(self, ax, x, values, state=None, outputs=({},), source='close',
+                 width=None, fill=None, live=True):
+        self.ax = ax
+        self.state = state
+        self.outputs = outputs
+        self.source = source
+        self.width = width
+        self.fill = fill
+        closed = slice(None, -1) if live else slice(None)
+        self.x = lod.Columns({'x': np.asarray(x, dtype=float)[closed]})
+        self.pyramids = [None if v is None else lod.LinePyramid(np.asarray(v, dtype=float)[closed])
+                         for v in values]
+        self.live_values = [np.nan] * len(outputs)
+        self.view = (0, None, 0)
+
+        self.static = []
+        self.live = []
+        for style in outputs:
+            if style is None:
+                self.static.append(None)
+                self.live.append(None)
+            elif isinstance(style, tuple):
+                style = style[1]
+                self.static.append(BoxArtist(ax, width, **style))
+                self.live.append(BoxArtist(ax, width, animated=True, **style) if live else None)
+            else:
+                line, = ax.plot([], [], **style)
+                self.static.append(line)
+                if live:
+                    live_style = {k: v for k, v in style.items() if k != 'label'}
+                    line, = ax.plot([], [], animated=True, **live_style)
+                    self.live.append(line)
+                else:
+                    self.live.append(None)
+
+        self.fill_static = None
+        self.fill_live = None
+        if fill is not None and live:
+            self.fill_live = Polygon(np.zeros((4, 2)), closed=True, animated=True, **fill[2])
+            ax.add_artist(self.fill_live)  # not add_patch: keep it out of the data limits
+        if live:
+            self.set_live(x[-1], None, values=[None if v is None else float(v[-1]) for v in values])
+
+    @property
+    def artists(self):
+        live = [a.collection if isinstance(a, BoxArtist) else a for a in self.live if a is not None]
+        return live + ([self.fill_live] if self.fill_live is not None else [])
+
+    def values(self, output):
+        return self.pyramids[output].values
+
+    def show(self, lo=0, hi=None, level=0):
+        """Draw the history of bars lo..hi decimated to `level`."""
+        self.view = (lo, hi, level)
+        x = self.x['x']
+        hi = len(x) if hi is None else hi
+        for output, artist in enumerate(self.static):
+            pyramid = self.pyramids[output]
+            if isinstance(artist, BoxArtist):
+                first, last, pick = pyramid.bars(lo, hi, level)
+                values = pyramid.values[pick]
+                artist.set_data((x[first] + x[last]) / 2, np.zeros_like(values), values,
+                                width=self.width * 2 ** min(level, pyramid.max_level()))
+            elif artist is not None:
+                points = pyramid.points(lo, hi, level)
+                artist.set_data(x[points], pyramid.values[points])
+        if self.fill is not None:
+            if self.fill_static is not None:
+                self.fill_static.remove()
+            i, j, style = self.fill
+            points = np.union1d(self.pyramids[i].points(lo, hi, level),
+                                self.pyramids[j].points(lo, hi, level))
+            self.fill_static = self.ax.fill_between(x[points], self.values(i)[points],
+                                                    self.values(j)[points], **style)
+
+    def step(self, value, commit):
+        if self.state is None:
+            return (value,)
+        result = self.state.update(value) if commit else self.state.peek(value)
+        return result if isinstance(result, tuple) else (result,)
+
+    def append(self, x, inputs):
+        """Bars x closed with source values inputs; extend the history."""
+        new = [self.step(value, commit=True) for value in inputs]
+        self.x.write(len(self.x), {'x': np.asarray(x, dtype=float)})
+        for output, pyramid in enumerate(self.pyramids):
+            if pyramid is not None:
+                pyramid.append([row[output] for row in new])
+        self.show(*self.view)
+
+    def set_live(self, x, value, values=None):
+        """Move the forming bar to source value `value` (or given outputs)."""
+        self.live_values = list(values) if values is not None else list(self.step(value, commit=False))
+        last = len(self.x) - 1
+        for output, artist in enumerate(self.live):
+            if artist is None:
+                continue
+            y = self.live_values[output]
+            if isinstance(artist, BoxArtist):
+                artist.set_data(np.array([x]), np.zeros(1), np.array([y]))
+            elif last >= 0:
+                artist.set_data([self.x['x'][last], x], [self.values(output)[last], y])
+            else:
+                artist.set_data([x], [y])
+        if self.fill_live is not None and last >= 0:
+            i, j, _ = self.fill
+            prev = self.x['x'][last]
+            self.fill_live.set_xy([
+                (prev, self.values(i)[last]), (x, self.live_values[i]),
+                (x, self.live_values[j]), (prev, self.values(j)[last]),
+            ])
+
+    def limits(self):
+        """(low, high) over every drawn value, live bar included."""
+        drawn = [np.append(pyramid.values, self.live_values[output])
+                 for output, pyramid in enumerate(self.pyramids)
+                 if pyramid is not None and self.outputs[output] is not None]
+        for output, style in enumerate(self.outputs):
+            if isinstance(style, tuple):
+                drawn.append(np.zeros(1))
+        values = np.concatenate(drawn) if drawn else np.empty(0)
+        values = values[np.isfinite(values)]
+        return (float(values.min()), float(values.max())) if len(values) else None
+
+    def in_view(self):
+        """False if the live values have left the axes' y range."""
+        low, high = self.ax.get_ylim()
+        live = np.array([v for v, style in zip(self.live_values, self.outputs)
+                         if style is not None], dtype=float)
+        live = live[np.isfinite(live)]
+        return bool(np.all((live >= low) & (live <= high)))
+
+
+class LevelOfDetail:
+    """
+    Keeps decimated artists matched to the visible x range of an axes.
+
+    Artists (anything with show(lo, hi, level)) are drawn for the visible
+    bars plus one screen on either side, so small pans reuse what is
+    drawn; zooming, panning past that margin or resizing re-decimates.
+    """
+
+    def __init__(self, ax, x):
+        self.ax = ax
+        self.x = x  # callable returning the closed bars' x positions
+        self.artists = []
+        self.drawn = None
+        # The x range is ours to set; decimated artists must not move it
+        for shared in ax.get_shared_x_axes().get_siblings(ax):
+            shared.set_autoscalex_on(False)
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+
+    def add(self, artist):
+        self.artists.append(artist)
+
+    def update(self, force=False):
+        x = self.x()
+        n = len(x)
+        left, right = self.ax.get_xlim()
+        lo = int(np.searchsorted(x, left, side='left'))
+        hi = int(np.searchsorted(x, right, side='right'))
+        level = lod.level_for(hi - lo, self.ax.bbox.width)
+        if not force and self.drawn is not None:
+            drawn_lo, drawn_hi, drawn_level = self.drawn
+            if drawn_level == level and drawn_lo <= lo and hi <= drawn_hi:
+                return
+
+        span = max(hi - lo, 1)
+        lo = max(lo - span, 0) >> level << level
+        hi = min(hi + span, n)
+        self.drawn = (lo, hi, level)
+        for artist in self.artists:
+            # hi=None follows bars appended later
+            artist.show(lo, None if hi >= n else hi, level)
+
+
+class BlitManager:
+    """
+    Repaints animated artists over a cached background.
+
+    The background is captured after every full draw (including resizes);
+    update() then restores it and redraws only the registered artists.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add(self, artists):
+        for artist in artists:
+            artist.set_animated(True)
+            self.artists.append(artist)
+
+    def clear(self):
+        self.artists = []
+        self.background = None
+
+    def on_draw(self, event):
+        figure = self.canvas.figure
+        self.background = self.canvas.copy_from_bbox(figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
+
+    def update(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
@@ -0,0 +1,695 @@
+"""
+SR TRADE - Database Layer
+Long-lived SQLite connections shared by every window.
+"""
+import bisect
+import json
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+
+DB_PATH = "sr_trade.db"
+
+# Applied to every new connection. WAL lets readers run alongside the
+# writer and, with synchronous=NORMAL, turns a commit into an append to the
+# log instead of a full fsync of the database file.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Read-only managers never touch the schema; query_only makes any write
+# (including a journal mode change) fail instead of taking the write lock
+READ_ONLY_PRAGMAS = tuple(pragma for pragma in PRAGMAS if 'journal_mode' not in pragma) + (
+    "PRAGMA query_only = ON",
+)
+
+STATEMENT_CACHE_SIZE = 256
+
+# Connections of exited threads kept open for the next threads to reuse;
+# any beyond this are closed
+MAX_IDLE_CONNECTIONS = 4
+
+TRADES_PAGE_SIZE = 200
+
+# Searches with at most this many hits in the user's trades sort those
+# hits; broader ones walk the date index and keep the trades that match
+SEARCH_SORT_LIMIT = 10000
+
+# Rows read per step of that walk, growing while matches are sparse
+SEARCH_SCAN_CHUNK = 1000
+SEARCH_SCAN_MAX_CHUNK = 50000
+
+
+def search_query(text):
+    """
+    An FTS5 MATCH expression for free text typed by the user.
+
+    Every word must match the start of a token; words are quoted, so
+    FTS5 operators and punctuation in the input are taken literally.
+    """
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+def trade_filters(user_id, status=None, since=None, after=None, plus=""):
+    """
+    (WHERE clause, params) of a user's trades with get_trades_page's
+    filters, after keyset cursor `after`. A `plus` of '+' keeps SQLite
+    from using the indexes for these terms.
+    """
+    where = [f"{plus}user_id = ?"]
+    params = [user_id]
+    if status is not None:
+        where.append(f"{plus}status = ?")
+        params.append(status)
+    if since is not None:
+        where.append(f"{plus}trade_date >= ?")
+        params.append(since)
+    if after is not None:
+        where.append(f"({plus}trade_date, id) < (?, ?)")
+        params.extend(after)
+    return " AND ".join(where), params
+
+
+def id_array(text):
+    """Ids from group_concat() text as an int64 array."""
+    return np.fromstring(text or "", sep=",", dtype=np.int64)
+
+
+class TradeSearch:
+    """
+    One journal search, looked up once and then paged from.
+
+    `hits` holds the sorted ids of every trade the words match, of any
+    user. `keys` is the (trade_date, id) of the user's matching trades
+    in ascending order when there are at most SEARCH_SORT_LIMIT of them,
+    else None. See DatabaseManager.search_trades().
+    """
+
+    def __init__(self, user_id, status, since, hits, keys):
+        self.user_id = user_id
+        self.status = status
+        self.since = since
+        self.hits = hits
+        self.keys = keys
+
+    def contains(self, ids):
+        """Bool array: which of ids match the search."""
+        if not len(self.hits):
+            return np.zeros(len(ids), dtype=bool)
+        position = np.minimum(np.searchsorted(self.hits, ids), len(self.hits) - 1)
+        return self.hits[position] == ids
+
+
+FTS_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS trades_fts_insert AFTER INSERT ON trades BEGIN
+        INSERT INTO trades_fts (rowid, symbol, strategy, notes)
+        VALUES (new.id, new.symbol, new.strategy, new.notes);
+    END
+'''
+
+# Index rows above a given id in one statement (see bulk_insert)
+FTS_BULK_INSERT = '''
+    INSERT INTO trades_fts (rowid, symbol, strategy, notes)
+    SELECT id, symbol, strategy, notes FROM trades WHERE id > ?
+'''
+
+# A trade's contribution to its user's trade_summary row
+SUMMARY_COLUMNS = (
+    ('total_trades', "1"),
+    ('open_trades', "{t}.status = 'OPEN'"),
+    ('closed_trades', "{t}.status = 'CLOSED'"),
+    ('wins', "{t}.status = 'CLOSED' AND {t}.pnl > 0"),
+    ('losses', "{t}.status = 'CLOSED' AND {t}.pnl < 0"),
+    ('realized_pnl', "CASE WHEN {t}.status = 'CLOSED' THEN COALESCE({t}.pnl, 0) ELSE 0 END"),
+)
+
+
+def summary_change(row, sign):
+    """UPDATE adding (sign '+') or removing ('-') trade `row` from its user's summary."""
+    changes = ", ".join(f"{name} = {name} {sign} ({term.format(t=row)})"
+                        for name, term in SUMMARY_COLUMNS)
+    return f"UPDATE trade_summary SET {changes} WHERE user_id = {row}.user_id;"
+
+
+SUMMARY_INSERT_TRIGGER = f'''
+    CREATE TRIGGER IF NOT EXISTS trade_summary_insert AFTER INSERT ON trades
+    WHEN new.user_id IS NOT NULL BEGIN
+        INSERT OR IGNORE INTO trade_summary (user_id) VALUES (new.user_id);
+        {summary_change('new', '+')}
+    END
+'''
+
+# Totals per user over rows above a given id, as one statement
+SUMMARY_TOTALS = f'''
+    SELECT user_id, {", ".join(f"TOTAL({term.format(t='trades')})" for _, term in SUMMARY_COLUMNS)}
+    FROM trades WHERE user_id IS NOT NULL AND id > ? GROUP BY user_id
+'''
+
+SUMMARY_BULK_INSERT = f'''
+    INSERT INTO trade_summary (user_id, {", ".join(name for name, _ in SUMMARY_COLUMNS)})
+    {SUMMARY_TOTALS}
+    ON CONFLICT (user_id) DO UPDATE SET
+        {", ".join(f"{name} = {name} + excluded.{name}" for name, _ in SUMMARY_COLUMNS)}
+'''
+
+# Per-row insert triggers that bulk_insert replaces with set-based statements
+BULK_INSERT_TRIGGERS = (
+    ('trades_fts_insert', FTS_INSERT_TRIGGER, FTS_BULK_INSERT),
+    ('trade_summary_insert', SUMMARY_INSERT_TRIGGER, SUMMARY_BULK_INSERT),
+)
+
+
+class ConnectionLease:
+    """
+    A thread's hold on one of the manager's connections.
+
+    Only that thread's locals refer to it, so it is collected when the
+    thread exits (for Qt pool threads, after every task) and `release`
+    takes the connection back.
+    """
+
+    def __init__(self, conn, release):
+        self.conn = conn
+        weakref.finalize(self, release, conn)
+
+
+class DatabaseManager:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path=DB_PATH, read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connections = set()
+        self._idle = []
+        # Reentrant: a lease can be collected, and release run, at any time
+        self._connections_lock = threading.RLock()
+        if not read_only:
+            self.init_database()
+
+    @classmethod
+    def shared(cls, db_path=DB_PATH):
+        """Return the process-wide manager for db_path, creating it once."""
+        with cls._shared_lock:
+            db = cls._shared.get(db_path)
+            if db is None:
+                db = cls(db_path)
+                cls._shared[db_path] = db
+            return db
+
+    # ----------------------------------------
+    # Connections
+    # ----------------------------------------
+    @property
+    def connection(self):
+        """The calling thread's connection, taken on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._acquire()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.lease = ConnectionLease(conn, self._release)
+        return conn
+
+    def _acquire(self):
+        with self._connections_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        """Take back the connection of a thread that has exited."""
+        with self._connections_lock:
+            if conn not in self._connections:
+                return  # closed by close()
+            if not conn.in_transaction and len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+            self._connections.discard(conn)
+        conn.close()
+
+    def _connect(self):
+        # isolation_level=None: the sqlite3 module never opens implicit
+        # transactions, so reads don't hold one open and writes outside
+        # transaction() commit on their own.
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in READ_ONLY_PRAGMAS if self.read_only else PRAGMAS:
+            conn.execute(pragma)
+        with self._connections_lock:
+            self._connections.add(conn)
+        return conn
+
+    def close(self):
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one transaction; nested blocks become savepoints."""
+        conn = self.connection
+        depth = self._local.depth
+        savepoint = f"sp_{depth}"
+        # IMMEDIATE takes the write lock up front, so concurrent writers
+        # wait on busy_timeout instead of failing to upgrade a read lock
+        conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            conn.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+        finally:
+            self._local.depth = depth
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Run a block of reads in one read transaction.
+
+        Under WAL every read in the block sees the database as of the
+        first one, whatever is committed meanwhile; writers are not
+        blocked. Inside transaction() the block just joins it.
+        """
+        conn = self.connection
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def bulk_insert(self):
+        """
+        A transaction for inserting many trades at once.
+
+        The per-row insert triggers (search index, summary) are dropped
+        for its duration and their work is done once, over all the new
+        rows, before it commits. A rollback restores the triggers with
+        everything else.
+        """
+        with self.transaction() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0]
+            for name, _, _ in BULK_INSERT_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            yield conn
+            # AUTOINCREMENT ids only grow, so the new rows are all above last_id
+            for _, trigger, bulk in BULK_INSERT_TRIGGERS:
+                conn.execute(bulk, (last_id,))
+                conn.execute(trigger)
+
+    @property
+    def in_transaction(self):
+        return self.connection.in_transaction
+
+    # ----------------------------------------
+    # Schema
+    # ----------------------------------------
+    def init_database(self):
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+
+            # Users table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    email TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Trades table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    symbol TEXT NOT NULL,
+                    trade_type TEXT NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    entry_price REAL NOT NULL,
+                    exit_price REAL,
+                    stop_loss REAL,
+                    target_price REAL,
+                    trade_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    exit_date TIMESTAMP,
+                    expiry_date DATE,
+                    strike_price REAL,
+                    option_type TEXT,
+                    strategy TEXT,
+                    notes TEXT,
+                    status TEXT DEFAULT 'OPEN',
+                    pnl REAL DEFAULT 0,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+
+            # Watchlist table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS watchlist (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    symbol TEXT NOT NULL,
+                    added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    notes TEXT,
+                    UNIQUE(user_id, symbol)
+                )
+            ''')
+
+            # Journal access paths: newest-first paging per user, optionally
+            # narrowed to one status. The rowid is the implicit last key of
+            # each index, so (trade_date, id) keyset scans need no sort.
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trades_user_date "
+                "ON trades (user_id, trade_date)"
+            )
+            cursor.execute("DROP INDEX IF EXISTS idx_trades_user_status")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trades_user_status_date "
+                "ON trades (user_id, status, trade_date)"
+            )
+
+            # Natural key of a trade, used by trade_import to skip rows the
+            # journal already holds. Led by trade_date so the keys over a
+            # time span are one covering range scan. Not UNIQUE: identical
+            # manual entries stay legal.
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trades_natural_key "
+                "ON trades (user_id, trade_date, symbol, trade_type, quantity, entry_price)"
+            )
+            # Trades closed since a given time (analytics refreshes); partial,
+            # so open trades cost nothing to index
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trades_closed "
+                "ON trades (user_id, exit_date) WHERE status = 'CLOSED'"
+            )
+
+            self.init_search(cursor)
+            self.init_summary(cursor)
+
+    def init_search(self, cursor):
+        """
+        Full-text index over symbol, strategy and notes.
+
+        trades_fts is an external-content FTS5 table: it stores only the
+        index, reads text back from trades, and is kept in step by
+        triggers on every insert, update and delete.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'trades_fts'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS trades_fts USING fts5(
+                symbol, strategy, notes,
+                content = 'trades', content_rowid = 'id',
+                prefix = '2 3'
+            )
+        ''')
+        cursor.execute(FTS_INSERT_TRIGGER)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trades_fts_delete AFTER DELETE ON trades BEGIN
+                INSERT INTO trades_fts (trades_fts, rowid, symbol, strategy, notes)
+                VALUES ('delete', old.id, old.symbol, old.strategy, old.notes);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trades_fts_update
+            AFTER UPDATE OF symbol, strategy, notes ON trades BEGIN
+                INSERT INTO trades_fts (trades_fts, rowid, symbol, strategy, notes)
+                VALUES ('delete', old.id, old.symbol, old.strategy, old.notes);
+                INSERT INTO trades_fts (rowid, symbol, strategy, notes)
+                VALUES (new.id, new.symbol, new.strategy, new.notes);
+            END
+        ''')
+        if not exists:
+            # Journals created before the index existed
+            cursor.execute("INSERT INTO trades_fts (trades_fts) VALUES ('rebuild')")
+
+    def init_summary(self, cursor):
+        """
+        Per-user dashboard totals, maintained by triggers on trades.
+
+        Every insert, delete and update of a trade adds and/or removes
+        that one trade's contribution, so reading the totals is a single
+        primary-key lookup however large the journal grows.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'trade_summary'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trade_summary (
+                user_id INTEGER PRIMARY KEY,
+                total_trades INTEGER NOT NULL DEFAULT 0,
+                open_trades INTEGER NOT NULL DEFAULT 0,
+                closed_trades INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                realized_pnl REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute(SUMMARY_INSERT_TRIGGER)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trade_summary_delete AFTER DELETE ON trades
+            WHEN old.user_id IS NOT NULL BEGIN
+                {summary_change('old', '-')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trade_summary_update
+            AFTER UPDATE OF user_id, status, pnl ON trades BEGIN
+                {summary_change('old', '-')}
+                INSERT OR IGNORE INTO trade_summary (user_id)
+                SELECT new.user_id WHERE new.user_id IS NOT NULL;
+                {summary_change('new', '+')}
+            END
+        ''')
+        if not exists:
+            # Journals created before the summary existed
+            self.rebuild_summary()
+
+    def rebuild_summary(self):
+        """Recompute trade_summary from trades, e.g. after editing the file by hand."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM trade_summary")
+            conn.execute(
+                f"INSERT INTO trade_summary (user_id, {', '.join(name for name, _ in SUMMARY_COLUMNS)}) "
+                f"{SUMMARY_TOTALS}",
+                (0,)
+            )
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+    def execute_query(self, query, params=()):
+        cursor = self.connection.execute(query, params)
+        return cursor.fetchall()
+
+    def execute_many(self, query, rows):
+        with self.transaction() as conn:
+            conn.executemany(query, rows)
+
+    def get_trades(self, user_id=None):
+        if user_id:
+            return self.execute_query(
+                "SELECT * FROM trades WHERE user_id = ? ORDER BY trade_date DESC",
+                (user_id,)
+            )
+        return self.execute_query("SELECT * FROM trades ORDER BY trade_date DESC")
+
+    def get_trades_page(self, user_id, after=None, limit=TRADES_PAGE_SIZE,
+                        status=None, since=None, search=None):
+        """
+        Return (rows, cursor) for one page of a user's trades, newest first.
+
+        Pass the returned cursor back as `after` to get the next page; it is
+        None once the journal is exhausted. Each page is a bounded index
+        range scan, so its cost does not depend on the journal size.
+
+        Filters: `status` ('OPEN'/'CLOSED'), `since` (trades on or after
+        this trade_date) and `search` (words matched as prefixes against
+        symbol, strategy and notes). Pass search as the TradeSearch from
+        search_trades() with the same filters to look the words up once
+        for every page, instead of on each call.
+        """
+        if search is not None and not isinstance(search, TradeSearch):
+            search = self.search_trades(user_id, search, status, since)
+        if search is not None:
+            return self.search_page(search, after, limit)
+
+        where, params = trade_filters(user_id, status, since, after)
+        rows = self.execute_query(
+            f"SELECT * FROM trades WHERE {where} ORDER BY trade_date DESC, id DESC LIMIT ?",
+            (*params, limit)
+        )
+        cursor = (rows[-1][9], rows[-1][0]) if len(rows) == limit else None
+        return rows, cursor
+
+    def search_trades(self, user_id, text, status=None, since=None, limit=SEARCH_SORT_LIMIT):
+        """
+        Look up the trades matching search text; a TradeSearch, or None
+        for blank text.
+
+        The full-text index is read once, for every user. The user's hits
+        are then counted from the smaller side: each hit is looked up by
+        id when there are fewer hits than the user has trades, else the
+        user's trade ids are tested against the hits.
+        """
+        match = search_query(text)
+        if not match:
+            return None
+        found = self.connection.execute(
+            "SELECT group_concat(rowid) FROM trades_fts WHERE trades_fts MATCH ?", (match,)
+        ).fetchone()[0]
+        hits = id_array(found)
+        search = TradeSearch(user_id, status, since, hits, None)
+
+        totals = self.get_summary(user_id)
+        trades = totals[{'OPEN': 'open_trades', 'CLOSED': 'closed_trades'}.get(status, 'total_trades')]
+        if len(hits) <= trades:
+            # '+' keeps SQLite on the id lookups instead of the user's index
+            where, params = trade_filters(user_id, status, since, plus="+")
+            keys = self.execute_query(
+                f"SELECT trade_date, id FROM trades WHERE id IN (SELECT value FROM json_each(?)) "
+                f"AND {where} LIMIT ?",
+                (f"[{found or ''}]", *params, limit + 1)
+            )
+        else:
+            # Newest first, stopping once there are too many hits to sort
+            where, params = trade_filters(user_id, status, since)
+            mine, offset, chunk = [], 0, SEARCH_SCAN_CHUNK
+            while sum(map(len, mine)) <= limit:
+                ids = id_array(self.connection.execute(
+                    f"SELECT group_concat(id) FROM (SELECT id FROM trades WHERE {where} "
+                    "ORDER BY trade_date DESC, id DESC LIMIT ? OFFSET ?)",
+                    (*params, chunk, offset)
+                ).fetchone()[0])
+                mine.append(ids[search.contains(ids)])
+                if len(ids) < chunk:
+                    break
+                offset += chunk
+                chunk = min(chunk * 2, SEARCH_SCAN_MAX_CHUNK)
+            mine = np.concatenate(mine)
+            keys = self.execute_query(
+                "SELECT trade_date, id FROM trades WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(mine.tolist()),)
+            ) if len(mine) <= limit else None
+        if keys is not None and len(keys) <= limit:
+            search.keys = sorted(keys)
+        return search
+
+    def search_page(self, search, after, limit):
+        """get_trades_page() for a TradeSearch."""
+        if search.keys is not None:
+            # Few hits: the page is a slice of the sorted keys
+            end = len(search.keys) if after is None else bisect.bisect_left(search.keys, tuple(after))
+            ids = [trade_id for _, trade_id in search.keys[max(end - limit, 0):end]]
+            more = end > limit
+        else:
+            # Many hits: walk the user's trades by date and keep the matches
+            ids, more = [], True
+            chunk = SEARCH_SCAN_CHUNK
+            while len(ids) < limit and more:
+                where, params = trade_filters(search.user_id, search.status, search.since, after)
+                keys = self.execute_query(
+                    f"SELECT trade_date, id FROM trades WHERE {where} "
+                    "ORDER BY trade_date DESC, id DESC LIMIT ?",
+                    (*params, chunk)
+                )
+                more = len(keys) == chunk
+                found = search.contains(np.array([key[1] for key in keys], dtype=np.int64))
+                matched = np.flatnonzero(found)[:limit - len(ids)]
+                ids.extend(keys[i][1] for i in matched.tolist())
+                if len(ids) == limit:
+                    more = True
+                elif keys:
+                    after = keys[-1]
+                chunk = min(chunk * 2, SEARCH_SCAN_MAX_CHUNK)
+
+        rows = self.execute_query(
+            "SELECT * FROM trades WHERE id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY trade_date DESC, id DESC",
+            (json.dumps(ids),)
+        )
+        cursor = (rows[-1][9], rows[-1][0]) if rows and more else None
+        return rows, cursor
+
+    def add_trade(self, trade_data):
+        query = '''
+            INSERT INTO trades (user_id, symbol, trade_type, quantity, entry_price,
+            stop_loss, target_price, expiry_date, strike_price, option_type, strategy, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        return self.execute_query(query, (
+            trade_data['user_id'],
+            trade_data['symbol'],
+            trade_data['trade_type'],
+            trade_data['quantity'],
+            trade_data['entry_price'],
+            trade_data.get('stop_loss'),
+            trade_data.get('target_price'),
+            trade_data.get('expiry_date'),
+            trade_data.get('strike_price'),
+            trade_data.get('option_type'),
+            trade_data.get('strategy'),
+            trade_data.get('notes')
+        ))
+
+    def update_trade(self, trade_id, exit_price):
+        # SET expressions see the row as it was: exit_price there would
+        # still be NULL, so the new price is bound into the P&L as well
+        query = '''
+            UPDATE trades
+            SET exit_price = ?1, exit_date = CURRENT_TIMESTAMP, status = 'CLOSED',
+                pnl = (?1 - entry_price) * quantity *
+                      CASE WHEN trade_type = 'BUY' THEN 1 ELSE -1 END
+            WHERE id = ?2
+        '''
+        return self.execute_query(query, (exit_price, trade_id))
+
+    def get_summary(self, user_id):
+        """The user's dashboard totals as a dict (zeros for a new user)."""
+        names = [name for name, _ in SUMMARY_COLUMNS]
+        rows = self.execute_query(
+            f"SELECT {', '.join(names)} FROM trade_summary WHERE user_id = ?", (user_id,)
+        )
+        return dict(zip(names, rows[0] if rows else [0] * len(names)))
+
+
+if __name__ == "__main__":
+    # python database.py rebuild-summary [path/to/sr_trade.db]
+    import sys
+
+    if sys.argv[1:2] != ["rebuild-summary"]:
+        sys.exit("usage: python database.py rebuild-summary [database]")
+    db = DatabaseManager(sys.argv[2] if len(sys.argv) > 2 else DB_PATH)
+    db.rebuild_summary()
+    print(f"Rebuilt trade summary in {db.db_path}")
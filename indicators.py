@@ -0,0 +1,819 @@
+"""
+SR TRADE - Technical Indicators
+Vectorized NumPy implementations, independent of the GUI.
+
+Every function takes array-likes (lists, ndarrays or pandas Series) and
+returns float64 ndarrays of the same shape. Moving averages, RSI, MACD
+and Bollinger Bands work along the last axis, so a (symbols x bars)
+matrix is processed in one pass. Recursive smoothers (EMA, Wilder) run
+through scipy.signal.lfilter, which evaluates the recurrence in C
+instead of a per-bar Python loop.
+"""
+import json
+import threading
+import warnings
+from collections import OrderedDict, deque
+
+import numpy as np
+from scipy.signal import lfilter
+
+
+def as_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def smooth(values, alpha, initial):
+    """
+    Exponential smoothing y[i] = alpha * x[i] + (1 - alpha) * y[i - 1].
+
+    `initial` is the value of y[-1], the state before the first input
+    (one per row for 2D input).
+    """
+    values = as_array(values)
+    if not values.shape[-1]:
+        return values
+    zi = ((1 - alpha) * np.asarray(initial, dtype=np.float64))[..., None]
+    result, _ = lfilter([alpha], [1, -(1 - alpha)], values, axis=-1, zi=zi)
+    return result
+
+
+def nan_offset(values):
+    """Mean of each row's finite values (0 for a row without any)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows
+        offset = np.nanmean(values, axis=-1, keepdims=True)
+    return np.nan_to_num(offset)
+
+
+def gap_weight(alpha, gap):
+    """
+    Weight pandas ewm(adjust=False) gives an input that follows `gap` NaNs.
+
+    The previous average keeps (1 - alpha) ** (gap + 1) against alpha for
+    the input, renormalised; pandas special-cases alpha 0.5 (span 3),
+    where the input gets the rest of 1 instead.
+    """
+    keep = (1 - alpha) ** (gap + 1)
+    if alpha == 0.5:
+        return 1 - keep
+    return alpha / (keep + alpha)
+
+
+def affine_scan(coef, inputs):
+    """
+    Solve y[i] = coef[i] * y[i - 1] + inputs[i] along the last axis, y[-1] = 0.
+
+    A prefix scan over the composed steps: log2(n) whole-array passes,
+    for recurrences whose coefficient varies and lfilter cannot run.
+    """
+    coef, result = coef.copy(), inputs.copy()
+    shift = 1
+    while shift < result.shape[-1]:
+        result[..., shift:] += coef[..., shift:] * result[..., :-shift]
+        coef[..., shift:] *= coef[..., :-shift]
+        shift *= 2
+    return result
+
+
+# ============================================
+# MOVING AVERAGES
+# ============================================
+def sma(values, period):
+    """
+    Simple moving average; the first period-1 values are NaN.
+
+    A NaN input blanks only the windows that contain it, as in pandas
+    rolling(period).mean().
+    """
+    values = as_array(values)
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] < period:
+        return result
+    missing = np.isnan(values)
+    # Summing deviations from the mean keeps the running total small
+    offset = nan_offset(values)
+    sums = np.cumsum(np.where(missing, 0., values - offset), axis=-1)
+    gaps = np.cumsum(missing, axis=-1)
+    result[..., period - 1] = sums[..., period - 1]
+    result[..., period:] = sums[..., period:] - sums[..., :-period]
+    result[..., period - 1:] /= period
+    result[..., period - 1:] += offset
+    window_gaps = gaps[..., period - 1:].copy()
+    window_gaps[..., 1:] -= gaps[..., :-period]
+    result[..., period - 1:][window_gaps > 0] = np.nan
+    return result
+
+
+def ema(values, span):
+    """
+    Exponential moving average, same as pandas ewm(span, adjust=False).
+
+    As in pandas, a NaN input repeats the previous average and the input
+    after a gap is weighted by gap_weight(); values before the first
+    finite input are NaN.
+    """
+    values = as_array(values)
+    if not values.shape[-1]:
+        return values
+    alpha = 2.0 / (span + 1)
+    missing = np.isnan(values)
+    if not missing.any():
+        return smooth(values, alpha, values[..., 0])
+
+    started = np.logical_or.accumulate(~missing, axis=-1)
+    if (missing & started).any():
+        return smooth_gaps(values, alpha, missing)
+    # Only leading NaNs: start from each row's first input
+    first = np.take_along_axis(values, started.argmax(axis=-1)[..., None], axis=-1)
+    result = smooth(np.where(missing, first, values), alpha, first[..., 0])
+    result[~started] = np.nan
+    return result
+
+
+def smooth_gaps(values, alpha, missing):
+    """
+    ema() of input with NaN gaps.
+
+    Each run of consecutive inputs is a plain smooth() whose first step
+    is weighted by gap_weight(). Smoothing the whole row once gives every
+    run up to an offset that decays like the average itself. The offsets
+    chain from one run into the next and are solved with affine_scan()
+    over the runs alone, then added back through one more lfilter pass.
+    """
+    shape = values.shape
+    if missing.all():
+        return np.full(shape, np.nan)
+    n = shape[-1]
+    values, missing = values.reshape(-1, n), missing.reshape(-1, n)
+    decay = 1 - alpha
+
+    # Last input at or before each bar (-1 if none yet) and the first bar
+    # of every run of inputs
+    seen = np.maximum.accumulate(np.where(missing, -1, np.arange(n)), axis=1)
+    starts = ~missing
+    starts[:, 1:] &= missing[:, :-1]
+    rows, cols = np.nonzero(starts)
+    before = np.where(cols > 0, seen[rows, cols - 1], -1)
+    first = before < 0
+    before[first] = cols[first]
+    previous_start = np.where(first, cols, np.roll(cols, 1))
+
+    plain = smooth(np.where(missing, 0., values), alpha, np.zeros(len(values)))
+
+    # offset[k] = y - plain at the start of run k; it carries the end of the
+    # run before it through the gap
+    weight = np.where(first, 1., gap_weight(alpha, cols - before - 1))
+    carried = np.exp(np.log(decay) * (before - previous_start))
+    offset = affine_scan(np.where(first, 0., (1 - weight) * carried),
+                         (1 - weight) * plain[rows, before]
+                         + weight * values[rows, cols] - plain[rows, cols])
+
+    # Restart the decaying offset at each run: add the new one, less what
+    # is left of the one before
+    left = np.exp(np.log(decay) * (cols - previous_start)) * np.roll(offset, 1)
+    impulses = np.zeros_like(plain)
+    impulses[rows, cols] = offset - np.where(first, 0., left)
+    plain += lfilter([1.], [1., -decay], impulses, axis=1)
+
+    result = np.take_along_axis(plain, np.maximum(seen, 0), axis=1)
+    result[seen < 0] = np.nan
+    return result.reshape(shape)
+
+
+# ============================================
+# OSCILLATORS
+# ============================================
+def rsi(prices, period=14):
+    """
+    Wilder's RSI, matching TechnicalIndicatorChart.calculate_rsi.
+
+    The average gain/loss is seeded from the first period+1 price changes
+    and the first `period` outputs all carry that seed value.
+    """
+    prices = as_array(prices)
+    if prices.shape[-1] < 2:
+        return np.full(prices.shape, np.nan)
+    result = np.zeros_like(prices)
+
+    deltas = np.diff(prices, axis=-1)
+    seed = deltas[..., :period + 1]
+    up = np.where(seed >= 0, seed, 0.).sum(axis=-1) / period
+    down = -np.where(seed < 0, seed, 0.).sum(axis=-1) / period
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[..., :period] = (100. - 100. / (1. + up / down))[..., None]
+
+        # fmax drops NaN changes from the gains; maximum keeps them in the
+        # losses, like the branch in the original loop
+        changes = deltas[..., period - 1:]
+        ups = smooth(np.fmax(changes, 0.), 1. / period, up)
+        downs = smooth(np.maximum(-changes, 0.), 1. / period, down)
+
+        rs = np.divide(ups, downs, out=ups)
+        rs += 1.
+        np.divide(100., rs, out=rs)
+        np.subtract(100., rs, out=result[..., period:])
+    return result
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """Return (macd, signal_line, histogram), as in calculate_macd."""
+    macd_line = ema(prices, fast) - ema(prices, slow)
+    signal_line = ema(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def bollinger_bands(prices, period=20, num_std=2.0):
+    """
+    Return (upper, middle, lower) bands around the period SMA.
+
+    Uses the population standard deviation of each window. Sums are taken
+    around the series mean to keep the rolling variance numerically stable.
+    """
+    prices = as_array(prices)
+    middle = sma(prices, period)
+    if prices.shape[-1] < period:
+        return middle.copy(), middle, middle.copy()
+
+    offset = nan_offset(prices)
+    centered = prices - offset
+    mean_sq = sma(centered * centered, period)
+    mean = middle - offset
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.))
+    return middle + num_std * std, middle, middle - num_std * std
+
+
+# ============================================
+# VOLUME
+# ============================================
+def obv(close, volume):
+    """On-balance volume, starting from 0 at the first bar."""
+    close, volume = as_array(close), as_array(volume)
+    direction = np.sign(np.diff(close, prepend=close[:1]))
+    return np.cumsum(direction * volume)
+
+
+def volume_sma(volume, period=20):
+    return sma(volume, period)
+
+
+def vwap(high, low, close, volume):
+    """Cumulative volume-weighted average of the typical price."""
+    high, low, close, volume = (as_array(v) for v in (high, low, close, volume))
+    typical = (high + low + close) / 3.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.cumsum(typical * volume) / np.cumsum(volume)
+
+
+# ============================================
+# BATCH (SYMBOLS x BARS)
+# ============================================
+def stack_series(series, length=None):
+    """
+    Right-align 1D histories into a (len(series) x length) matrix.
+
+    Rows end on their latest bar; shorter histories are NaN-padded on the
+    left and longer ones keep only their last `length` values.
+    """
+    series = [as_array(values) for values in series]
+    if length is None:
+        length = max((len(values) for values in series), default=0)
+    matrix = np.full((len(series), length), np.nan)
+    for row, values in enumerate(series):
+        values = values[len(values) - length:] if len(values) > length else values
+        if len(values):
+            matrix[row, length - len(values):] = values
+    return matrix
+
+
+def shift_rows(matrix, offsets, fill):
+    """
+    Row i of the result is row i of `matrix` read from column offsets[i].
+
+    `fill` (S x N, or broadcastable) supplies the columns past the end.
+    Rows are copied as whole windows, which is far cheaper than an
+    element-wise gather.
+    """
+    n = matrix.shape[-1]
+    padded = np.concatenate([matrix, np.broadcast_to(fill, matrix.shape)], axis=-1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, n, axis=-1)
+    return windows[..., np.arange(matrix.shape[-2]), offsets, :]
+
+
+def left_align(matrix):
+    """
+    Shift every row so its history starts at column 0.
+
+    Returns (aligned, start) where start[i] is the first non-NaN column of
+    row i. The tail of a shifted row repeats its last value, which keeps
+    recursive indicators finite; right_align() discards it again.
+    """
+    n = matrix.shape[1]
+    if not n:
+        return matrix, np.zeros(len(matrix), dtype=np.intp)
+    valid = ~np.isnan(matrix)
+    start = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+    if not start.any():
+        return matrix, start
+    return shift_rows(matrix, start, matrix[:, -1:]), start
+
+
+def right_align(aligned, start):
+    """
+    Inverse of left_align(): put results back under their bars, NaN before.
+
+    `aligned` may stack several results as (..., symbols, bars); they are
+    shifted together.
+    """
+    if not start.any():
+        return aligned
+    n = aligned.shape[-1]
+    # Read each row from a NaN block prepended to it, start[i] columns early
+    flipped = shift_rows(aligned[..., ::-1], start, np.nan)
+    return flipped[..., ::-1]
+
+
+class BatchIndicators:
+    """
+    Indicator results for many symbols, stored column by column.
+
+    `full[name]` is the (symbols x bars) array of an indicator and
+    `latest[name]` its value at each symbol's last bar, ready to fill one
+    table row per symbol.
+    """
+
+    def __init__(self, symbols, full):
+        self.symbols = list(symbols)
+        self.full = full
+        self.latest = {
+            name: values[:, -1] if values.shape[1] else np.full(len(values), np.nan)
+            for name, values in full.items()
+        }
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def columns(self):
+        return list(self.full)
+
+    def row(self, symbol):
+        index = self.symbols.index(symbol)
+        return {name: float(values[index]) for name, values in self.latest.items()}
+
+    def rows(self):
+        for index, symbol in enumerate(self.symbols):
+            yield symbol, {name: float(values[index]) for name, values in self.latest.items()}
+
+
+def compute_batch(symbols, closes, rsi_period=14, macd_params=(12, 26, 9), ma_periods=(20, 50)):
+    """
+    RSI, MACD and moving averages for every row of a (symbols x bars) matrix.
+
+    Rows may be ragged: leading NaNs mark bars before a symbol's history
+    starts, and each row gives the same values as the 1D functions run
+    on that row's history alone. A gap inside a history blanks the SMA
+    windows over it and is carried through EMA and MACD, as in pandas.
+    """
+    closes = as_array(closes)
+    aligned, start = left_align(closes)
+    fast, slow, signal = macd_params
+
+    full = {'close': aligned, 'rsi': rsi(aligned, rsi_period)}
+    full['macd'], full['macd_signal'], full['macd_hist'] = macd(aligned, fast, slow, signal)
+    for period in ma_periods:
+        full[f'sma_{period}'] = sma(aligned, period)
+        full[f'ema_{period}'] = ema(aligned, period)
+
+    shifted = right_align(np.stack(list(full.values())), start)
+    full = dict(zip(full, shifted))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        full['change_pct'] = np.full(closes.shape, np.nan)
+        full['change_pct'][:, 1:] = (closes[:, 1:] / closes[:, :-1] - 1) * 100
+    return BatchIndicators(symbols, full)
+
+
+def load_batch(bar_store, symbols, interval='1d', length=250, **params):
+    """compute_batch() over the last `length` stored bars of each symbol."""
+    closes = stack_series([bar_store.tail(symbol, interval, length).close for symbol in symbols],
+                          length)
+    return compute_batch(symbols, closes, **params)
+
+
+# ============================================
+# STREAMING STATE
+# ============================================
+class IndicatorState:
+    """
+    Base for indicators updated one bar at a time in O(1).
+
+    seed(history) primes the state from past closes, update(x) commits a
+    closed bar and returns the new value, peek(x) returns the value a
+    still-forming bar would give without changing the state. snapshot()
+    returns a JSON-safe dict that restore_state() turns back into a state.
+    """
+
+    fields = ()
+
+    def seed(self, values):
+        for value in as_array(values):
+            self.update(value)
+        return self
+
+    def update(self, value):
+        raise NotImplementedError
+
+    def peek(self, value):
+        state = restore_state(self.snapshot())
+        return state.update(value)
+
+    def snapshot(self):
+        snapshot = {'type': type(self).__name__}
+        for name in self.fields:
+            value = getattr(self, name)
+            snapshot[name] = list(value) if isinstance(value, (list, deque)) else value
+        return snapshot
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls.__new__(cls)
+        for name in cls.fields:
+            setattr(state, name, snapshot[name])
+        state.restored()
+        return state
+
+    def restored(self):
+        pass
+
+
+class EMAState(IndicatorState):
+    """Streaming ema(); `gap` counts the NaN inputs since the last finite one."""
+
+    fields = ('span', 'alpha', 'value', 'gap')
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+        self.gap = 0
+
+    def seed(self, values):
+        self.run(values)
+        return self
+
+    def run(self, values):
+        """Advance over many values at once; returns the EMA at each of them."""
+        values = as_array(values)
+        if not len(values):
+            return values
+        if self.value is None:
+            result = ema(values, self.span)
+        else:
+            # Resume from the current average and the gap still open after it
+            lead = np.full(self.gap + 1, np.nan)
+            lead[0] = self.value
+            result = ema(np.concatenate([lead, values]), self.span)[len(lead):]
+
+        finite = np.flatnonzero(~np.isnan(values))
+        if len(finite):
+            self.value = float(result[-1])
+            self.gap = len(values) - 1 - int(finite[-1])
+        elif self.value is not None:
+            self.gap += len(values)
+        return result
+
+    def update(self, value):
+        if np.isnan(value):
+            if self.value is not None:
+                self.gap += 1
+        else:
+            self.value = self.peek(value)
+            self.gap = 0
+        return np.nan if self.value is None else self.value
+
+    def peek(self, value):
+        if np.isnan(value):
+            return np.nan if self.value is None else self.value
+        if self.value is None:
+            return float(value)
+        weight = gap_weight(self.alpha, self.gap)
+        return float(self.value + weight * (value - self.value))
+
+    @classmethod
+    def restore(cls, snapshot):
+        # Snapshots saved before gaps were tracked have none open
+        return super().restore(dict({'gap': 0}, **snapshot))
+
+
+class RSIState(IndicatorState):
+    """
+    Wilder RSI; after seed(prices) + update(p), value equals rsi(prices + [p])[-1].
+
+    Until period + 2 prices have been seen the averages are not defined, so
+    prices are buffered and the state is seeded the way rsi() seeds it.
+    """
+
+    fields = ('period', 'up', 'down', 'last', 'warmup', 'value')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.up = self.down = self.last = None
+        self.warmup = []
+        self.value = np.nan
+
+    def seed(self, values):
+        values = as_array(values)
+        if self.up is not None:
+            return super().seed(values)
+
+        prices = np.concatenate([self.warmup, values])
+        if len(prices) < self.period + 2:
+            self.warmup = prices.tolist()
+            return self
+
+        deltas = np.diff(prices)
+        seed = deltas[:self.period + 1]
+        up = seed[seed >= 0].sum() / self.period
+        down = -seed[seed < 0].sum() / self.period
+        changes = deltas[self.period - 1:]
+        alpha = 1. / self.period
+        self.up = float(smooth(np.fmax(changes, 0.), alpha, up)[-1])
+        self.down = float(smooth(np.maximum(-changes, 0.), alpha, down)[-1])
+        self.last = float(prices[-1])
+        self.warmup = []
+        self.value = self.compute(self.up, self.down)
+        return self
+
+    def update(self, value):
+        if self.up is None:
+            self.seed([value])
+            return self.value
+        self.up, self.down = self.step(value)
+        self.last = float(value)
+        self.value = self.compute(self.up, self.down)
+        return self.value
+
+    def peek(self, value):
+        if self.up is None:
+            return np.nan
+        return self.compute(*self.step(value))
+
+    def step(self, value):
+        delta = value - self.last
+        upval, downval = (delta, 0.) if delta > 0 else (0., -delta)
+        up = (self.up * (self.period - 1) + upval) / self.period
+        down = (self.down * (self.period - 1) + downval) / self.period
+        return up, down
+
+    @staticmethod
+    def compute(up, down):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return float(100. - 100. / (1. + np.float64(up) / down))
+
+
+class MACDState(IndicatorState):
+    fields = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def seed(self, values):
+        self.signal.run(self.fast.run(values) - self.slow.run(values))
+        return self
+
+    def update(self, value):
+        line = self.fast.update(value) - self.slow.update(value)
+        signal = self.signal.update(line)
+        return line, signal, line - signal
+
+    def peek(self, value):
+        line = self.fast.peek(value) - self.slow.peek(value)
+        signal = self.signal.peek(line)
+        return line, signal, line - signal
+
+    def snapshot(self):
+        return {'type': 'MACDState',
+                'fast': self.fast.snapshot(),
+                'slow': self.slow.snapshot(),
+                'signal': self.signal.snapshot()}
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls.__new__(cls)
+        for name in cls.fields:
+            setattr(state, name, EMAState.restore(snapshot[name]))
+        return state
+
+
+class BollingerState(IndicatorState):
+    """
+    Rolling mean/std over the last `period` closes, kept as running sums.
+
+    The sums are rebuilt from the window every `period` updates so float
+    error cannot accumulate; that keeps each update O(1) amortized.
+    """
+
+    fields = ('period', 'num_std', 'window', 'total', 'total_sq', 'updates')
+
+    def __init__(self, period=20, num_std=2.0):
+        self.period = period
+        self.num_std = num_std
+        self.window = deque(maxlen=period)
+        self.total = self.total_sq = 0.
+        self.updates = 0
+
+    def restored(self):
+        self.window = deque(self.window, maxlen=self.period)
+
+    def seed(self, values):
+        self.window.extend(as_array(values)[-self.period:].tolist())
+        self.resum()
+        return self
+
+    def resum(self):
+        window = np.fromiter(self.window, dtype=np.float64)
+        self.total = float(window.sum())
+        self.total_sq = float((window * window).sum())
+        self.updates = 0
+
+    def update(self, value):
+        value = float(value)
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+        self.updates += 1
+        if self.updates >= self.period:
+            self.resum()
+        return self.bands(self.total, self.total_sq)
+
+    def peek(self, value):
+        if len(self.window) < self.period - 1:
+            return (np.nan,) * 3
+        total, total_sq = self.total + value, self.total_sq + value * value
+        if len(self.window) == self.period:
+            total -= self.window[0]
+            total_sq -= self.window[0] ** 2
+        return self.bands(total, total_sq, full=True)
+
+    def bands(self, total, total_sq, full=None):
+        if not full and len(self.window) < self.period:
+            return (np.nan,) * 3
+        mean = total / self.period
+        std = max(total_sq / self.period - mean * mean, 0.) ** 0.5
+        return mean + self.num_std * std, mean, mean - self.num_std * std
+
+
+class SMAState(BollingerState):
+    """Simple moving average: the middle band of a BollingerState."""
+
+    def __init__(self, period=20):
+        super().__init__(period, 0.)
+
+    def update(self, value):
+        return super().update(value)[1]
+
+    def peek(self, value):
+        return super().peek(value)[1]
+
+
+STATE_TYPES = {cls.__name__: cls for cls in (EMAState, SMAState, RSIState, MACDState, BollingerState)}
+
+
+def restore_state(snapshot):
+    return STATE_TYPES[snapshot['type']].restore(snapshot)
+
+
+class IndicatorStateStore:
+    """
+    Persists indicator snapshots per symbol/interval in SQLite.
+
+    Each snapshot is stored with the timestamp of the last bar it has
+    seen; after a restart only the bars after that need to be replayed.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.execute_query('''
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                name TEXT NOT NULL,
+                last_ts INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (symbol, interval, name)
+            )
+        ''')
+
+    def save(self, symbol, interval, name, state, last_ts):
+        self.db.execute_query(
+            "INSERT OR REPLACE INTO indicator_state (symbol, interval, name, last_ts, state) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (symbol, interval, name, int(last_ts), json.dumps(state.snapshot()))
+        )
+
+    def load(self, symbol, interval, name):
+        """Return (state, last_ts), or (None, None) if nothing was saved."""
+        result = self.db.execute_query(
+            "SELECT state, last_ts FROM indicator_state "
+            "WHERE symbol = ? AND interval = ? AND name = ?",
+            (symbol, interval, name)
+        )
+        if not result:
+            return None, None
+        return restore_state(json.loads(result[0][0])), result[0][1]
+
+
+# ============================================
+# RESULT CACHE
+# ============================================
+def result_nbytes(result):
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(result_nbytes(item) for item in result)
+    return 64
+
+
+class IndicatorCache:
+    """
+    LRU memo of indicator results, bounded by entry count and array bytes.
+
+    Entries are keyed by (symbol, interval, version, indicator, params),
+    where version is the bar store's data version of the series, so a
+    result is never served for data it was not computed from. Hook
+    invalidate() to BarStore.add_listener() to also free a series'
+    entries as soon as new bars are written.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def make_key(symbol, interval, version, name, params):
+        return (symbol, interval, version, name, tuple(sorted(params.items())))
+
+    def compute(self, symbol, interval, version, name, fn, *args, **params):
+        """Return fn(*args, **params), computing it only on a cache miss."""
+        key = self.make_key(symbol, interval, version, name, params)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Computed outside the lock; two threads may race to fill one key
+        result = fn(*args, **params)
+        size = result_nbytes(result)
+        if size > self.max_bytes:
+            return result
+
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self.entries[key] = (result, size)
+            self.nbytes += size
+            while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+        return result
+
+    def invalidate(self, symbol, interval=None):
+        """Drop every entry of symbol (or of one symbol/interval series)."""
+        with self._lock:
+            for key in [k for k in self.entries
+                        if k[0] == symbol and (interval is None or k[1] == interval)]:
+                self.nbytes -= self.entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+
+def cached(cache, series, fn, *args, **params):
+    """
+    fn(*args, **params) through `cache` when the data's series is known.
+
+    `series` is (symbol, interval, version) of the bars in args, or None
+    for data that is not in the bar store. Pass indicator parameters as
+    keywords; only those take part in the cache key.
+    """
+    if cache is None or series is None:
+        return fn(*args, **params)
+    return cache.compute(*series, fn.__name__, fn, *args, **params)
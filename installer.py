@@ -19,6 +19,23 @@ def build_apk():
     # Copy all necessary files
     files_to_copy = [
         "main.py",
+        "database.py",
+        "bar_store.py",
+        "market_data.py",
+        "workers.py",
+        "indicators.py",
+        "screener.py",
+        "chart_render.py",
+        "lod.py",
+        "models.py",
+        "export.py",
+        "trade_import.py",
+        "analytics.py",
+        "ticks.py",
+        "options.py",
+        "payoff.py",
+        "backtest.py",
+        "qt_charts.py",
         "requirements.txt",
         "config.json",
         "README.md"
@@ -0,0 +1,206 @@
+"""
+SR TRADE - Level of Detail
+Decimation of long price series down to what the screen can show.
+
+Bars are grouped into buckets of 2**level consecutive bars. Candles keep
+one OHLC bar per bucket and lines keep each bucket's first, last, lowest
+and highest point, so candle extremes and line peaks drawn at any level
+are exactly those of the full series. Each level is built from the one
+below it once per series and is extended in place as bars close.
+"""
+import numpy as np
+
+# Screen pixels per bucket: room for a candle body and a gap
+PIXELS_PER_BUCKET = 3
+
+
+def level_for(count, pixels, pixels_per_bucket=PIXELS_PER_BUCKET):
+    """Coarsest level that still gives a bucket every `pixels_per_bucket` pixels."""
+    buckets = max(int(pixels) // pixels_per_bucket, 1)
+    if count <= buckets:
+        return 0
+    return int(np.log2(count / buckets))
+
+
+def bucket_range(lo, hi, level):
+    """Buckets of `level` covering raw bars lo..hi (exclusive)."""
+    return lo >> level, -(-hi >> level)
+
+
+class Columns:
+    """Equal-length numpy columns with spare capacity, so appends are amortized O(1)."""
+
+    def __init__(self, columns):
+        self.size = len(next(iter(columns.values())))
+        self.data = {name: np.asarray(column).copy() for name, column in columns.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.data[name][:self.size]
+
+    def view(self):
+        return {name: column[:self.size] for name, column in self.data.items()}
+
+    def write(self, at, columns):
+        """Replace every row from `at` on with `columns`."""
+        size = at + len(next(iter(columns.values())))
+        for name, column in columns.items():
+            buffer = self.data[name]
+            if size > len(buffer):
+                grown = np.empty(max(size, 2 * len(buffer)), dtype=buffer.dtype)
+                grown[:at] = buffer[:at]
+                self.data[name] = buffer = grown
+            buffer[at:size] = column
+        self.size = size
+
+
+class Pyramid:
+    """
+    Levels of per-bucket aggregates over one series.
+
+    levels[0] describes single bars; levels[i] pairs up the buckets of
+    levels[i - 1]. Subclasses define the level-0 columns and how two
+    neighbouring buckets combine.
+    """
+
+    def __init__(self):
+        self.levels = []
+
+    def __len__(self):
+        return len(self.levels[0]) if self.levels else 0
+
+    def build(self, base):
+        self.levels = [Columns(base)]
+        self.rebuild_from(0)
+
+    def extend(self, base):
+        """Append level-0 rows; only the trailing bucket of each level is redone."""
+        if not self.levels:
+            self.build(base)
+            return
+        changed = len(self)
+        self.levels[0].write(changed, base)
+        self.rebuild_from(changed)
+
+    def rebuild_from(self, changed):
+        level = 1
+        while len(self.levels[level - 1]) > 1:
+            parent = self.levels[level - 1].view()
+            changed //= 2
+            start = 2 * changed
+            a = {name: column[start::2] for name, column in parent.items()}
+            b = {name: column[start + 1::2] for name, column in parent.items()}
+            if len(b['first']) < len(a['first']):
+                # An odd bucket out stands alone: pair it with itself
+                b = {name: np.append(b[name], a[name][-1:]) for name in b}
+            tail = self.combine(a, b)
+            if level < len(self.levels):
+                self.levels[level].write(changed, tail)
+            else:
+                self.levels.append(Columns(tail))
+            level += 1
+        del self.levels[level:]
+
+    def combine(self, a, b):
+        raise NotImplementedError
+
+    def max_level(self):
+        return len(self.levels) - 1
+
+    def slice(self, lo, hi, level):
+        level = min(level, self.max_level())
+        first, last = bucket_range(lo, hi, level)
+        return {name: column[first:last] for name, column in self.levels[level].view().items()}
+
+
+class OHLCPyramid(Pyramid):
+    """
+    Candles at every level: open of the first bar, close of the last,
+    highest high and lowest low. Volume keeps the bucket maximum so the
+    tallest bar of a range is the one that is drawn.
+    """
+
+    def __init__(self, open, high, low, close, volume=None):
+        super().__init__()
+        n = len(open)
+        index = np.arange(n)
+        self.build({
+            'first': index, 'last': index,
+            'open': np.asarray(open, dtype=float), 'high': np.asarray(high, dtype=float),
+            'low': np.asarray(low, dtype=float), 'close': np.asarray(close, dtype=float),
+            'volume': np.full(n, np.nan) if volume is None else np.asarray(volume, dtype=float),
+        })
+
+    def append(self, open, high, low, close, volume=None):
+        n = len(open)
+        index = np.arange(len(self), len(self) + n)
+        self.extend({
+            'first': index, 'last': index,
+            'open': np.asarray(open, dtype=float), 'high': np.asarray(high, dtype=float),
+            'low': np.asarray(low, dtype=float), 'close': np.asarray(close, dtype=float),
+            'volume': np.full(n, np.nan) if volume is None else np.asarray(volume, dtype=float),
+        })
+
+    def combine(self, a, b):
+        return {
+            'first': a['first'], 'last': b['last'],
+            'open': a['open'], 'close': b['close'],
+            'high': np.fmax(a['high'], b['high']), 'low': np.fmin(a['low'], b['low']),
+            'volume': np.fmax(a['volume'], b['volume']),
+        }
+
+
+class LinePyramid(Pyramid):
+    """
+    For each bucket, the raw indices of its first, last, lowest and
+    highest values (NaNs are ignored unless the bucket is all NaN).
+    """
+
+    def __init__(self, values):
+        super().__init__()
+        self.data = Columns({'values': np.asarray(values, dtype=float)})
+        self.build(self.base(0, len(self.data)))
+
+    @property
+    def values(self):
+        return self.data['values']
+
+    def base(self, start, stop):
+        index = np.arange(start, stop)
+        return {'first': index, 'last': index, 'imin': index, 'imax': index}
+
+    def append(self, values):
+        start = len(self.data)
+        self.data.write(start, {'values': np.asarray(values, dtype=float)})
+        self.extend(self.base(start, len(self.data)))
+
+    def combine(self, a, b):
+        values = self.values
+        low_a, low_b = values[a['imin']], values[b['imin']]
+        high_a, high_b = values[a['imax']], values[b['imax']]
+        # fmin/fmax semantics: a NaN side never wins over a number
+        take_low = (low_b < low_a) | (np.isnan(low_a) & ~np.isnan(low_b))
+        take_high = (high_b > high_a) | (np.isnan(high_a) & ~np.isnan(high_b))
+        return {
+            'first': a['first'], 'last': b['last'],
+            'imin': np.where(take_low, b['imin'], a['imin']),
+            'imax': np.where(take_high, b['imax'], a['imax']),
+        }
+
+    def points(self, lo, hi, level):
+        """Sorted raw indices to draw a line over bars lo..hi at `level`."""
+        if level == 0 or self.max_level() == 0:
+            return np.arange(max(lo, 0), min(hi, len(self.values)))
+        buckets = self.slice(lo, hi, level)
+        return np.unique(np.concatenate([buckets['first'], buckets['last'],
+                                         buckets['imin'], buckets['imax']]))
+
+    def bars(self, lo, hi, level):
+        """(first, last, index of the largest |value|) per bucket, for histograms."""
+        buckets = self.slice(lo, hi, level)
+        values = self.values
+        low, high = values[buckets['imin']], values[buckets['imax']]
+        pick = np.where(np.abs(low) > np.abs(high), buckets['imin'], buckets['imax'])
+        return buckets['first'], buckets['last'], pick
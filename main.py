@@ -9,164 +9,254 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 from PyQt6.QtCharts import *
-import sqlite3
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import math
 import csv
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import mplfinance as mpf
-import yfinance as yf
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from typing import Dict, List, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
-# ============================================
-# DATABASE MANAGER
-# ============================================
-class DatabaseManager:
-    def __init__(self):
-        self.db_path = "sr_trade.db"
-        self.init_database()
-    
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                email TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Trades table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                symbol TEXT NOT NULL,
-                trade_type TEXT NOT NULL,
-                quantity INTEGER NOT NULL,
-                entry_price REAL NOT NULL,
-                exit_price REAL,
-                stop_loss REAL,
-                target_price REAL,
-                trade_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                exit_date TIMESTAMP,
-                expiry_date DATE,
-                strike_price REAL,
-                option_type TEXT,
-                strategy TEXT,
-                notes TEXT,
-                status TEXT DEFAULT 'OPEN',
-                pnl REAL DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Watchlist table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS watchlist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                symbol TEXT NOT NULL,
-                added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT,
-                UNIQUE(user_id, symbol)
-            )
-        ''')
-        
-        # Market data cache
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS market_cache (
-                symbol TEXT PRIMARY KEY,
-                data TEXT NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def execute_query(self, query, params=()):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        conn.commit()
-        conn.close()
-        return result
-    
-    def get_trades(self, user_id=None):
-        if user_id:
-            return self.execute_query(
-                "SELECT * FROM trades WHERE user_id = ? ORDER BY trade_date DESC",
-                (user_id,)
-            )
-        return self.execute_query("SELECT * FROM trades ORDER BY trade_date DESC")
-    
-    def add_trade(self, trade_data):
-        query = '''
-            INSERT INTO trades (user_id, symbol, trade_type, quantity, entry_price, 
-            stop_loss, target_price, expiry_date, strike_price, option_type, strategy, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        return self.execute_query(query, (
-            trade_data['user_id'],
-            trade_data['symbol'],
-            trade_data['trade_type'],
-            trade_data['quantity'],
-            trade_data['entry_price'],
-            trade_data.get('stop_loss'),
-            trade_data.get('target_price'),
-            trade_data.get('expiry_date'),
-            trade_data.get('strike_price'),
-            trade_data.get('option_type'),
-            trade_data.get('strategy'),
-            trade_data.get('notes')
-        ))
-    
-    def update_trade(self, trade_id, exit_price):
-        query = '''
-            UPDATE trades 
-            SET exit_price = ?, exit_date = CURRENT_TIMESTAMP, status = 'CLOSED',
-                pnl = (exit_price - entry_price) * quantity * 
-                      CASE WHEN trade_type = 'BUY' THEN 1 ELSE -1 END
-            WHERE id = ?
-        '''
-        return self.execute_query(query, (exit_price, trade_id))
+import backtest
+import indicators
+import lod
+import options
+import payoff
+from analytics import TradeAnalytics
+from database import DatabaseManager
+from bar_store import FIELDS, BarStore
+from chart_render import (BlitManager, CandleArtist, IndicatorTrack, LevelOfDetail, bar_width, date_x,
+                          padded)
+from market_data import BatchFetcher, MarketDataDownloader, ticker_for
+from models import (LOSS_COLOR, PROFIT_COLOR, ActionDelegate, PnLDelegate, TradeTableModel,
+                    WatchlistModel)
+from qt_charts import ChartPane, QtCandleStickChart, QtTechnicalIndicatorChart, points, time_ms
+from screener import Screener, parse_rule
+from ticks import SimulatedFeed, TickHub
+from workers import (AnalyticsWorker, ExportWorker, ImportWorker, IndicatorBatchWorker,
+                     MarketDataWorker, QuoteBatchWorker, ScreenerWorker, TickSubscriber)
 
 # ============================================
 # CHART WIDGETS
 # ============================================
 class CandleStickChart(QWidget):
-    def __init__(self, parent=None):
+    # Indicators drawn over the candles vs. in their own panel below
+    OVERLAYS = ("Bollinger Bands", "Moving Averages")
+    PANELS = ("RSI", "MACD", "Volume")
+    
+    def __init__(self, parent=None, cache=None):
         super().__init__(parent)
         self.figure, self.ax = plt.subplots(figsize=(10, 6))
         self.canvas = FigureCanvas(self.figure)
         self.layout = QVBoxLayout()
+        self.layout.addWidget(NavigationToolbar(self.canvas, self))
         self.layout.addWidget(self.canvas)
         self.setLayout(self.layout)
         self.data = None
+        self.title = ""
+        self.indicators = []
+        self.cache = cache
+        self.series = None
+        self.blit = BlitManager(self.canvas)
+        self.candles = None
+        self.live_candle = None
+        self.live = None
+        self.tracks = []
+        self.lod = None
+        self.closed = 0
+    
+    def plot_candlestick(self, df, title="Price Chart", series=None):
+        # series: (symbol, interval, version) of df when it came from the bar store
+        incremental = title == self.title and self.extends(df)
+        self.data = df
+        self.title = title
+        self.series = series
+        if incremental:
+            self.advance(df)
+        else:
+            self.render(df)
+    
+    def extends(self, df):
+        """True if df only changes the forming bar or appends bars to the drawn data."""
+        if self.candles is None or len(df) <= self.closed:
+            return False
+        old = self.data.iloc[:self.closed]
+        new = df.iloc[:self.closed]
+        return (old.index.equals(new.index) and
+                np.array_equal(old[list(FIELDS)].to_numpy(float), new[list(FIELDS)].to_numpy(float),
+                               equal_nan=True))
     
-    def plot_candlestick(self, df, title="Price Chart"):
+    def render(self, df):
         self.figure.clear()
-        ax = self.figure.add_subplot(111)
+        self.blit.clear()
+        self.candles = self.live_candle = self.live = self.lod = None
+        self.tracks = []
+        self.closed = 0
+        
+        panels = [name for name in self.indicators if name in self.PANELS]
+        grid = self.figure.add_gridspec(1 + len(panels), 1, height_ratios=[3] + [1] * len(panels))
+        ax = self.figure.add_subplot(grid[0])
+        ax.set_title(self.title)
+        ax.set_ylabel('Price')
+        ax.xaxis_date()
         
         if len(df) > 0:
-            mpf.plot(df, type='candle', style='charles', 
-                    title=title, ylabel='Price',
-                    ax=ax, show_nontrading=True)
+            x = date_x(df.index)
+            width = bar_width(x)
+            o, h, l, c, v = (df[field].to_numpy(float) for field in FIELDS)
+            
+            # Closed bars are drawn once; the last (forming) bar is blitted
+            self.closed = len(df) - 1
+            self.candles = CandleArtist(ax, width)
+            self.candles.set_data(x[:-1], o[:-1], h[:-1], l[:-1], c[:-1])
+            self.live_candle = CandleArtist(ax, width, animated=True)
+            self.blit.add(self.live_candle.artists)
+            ax.set_ylim(*padded(np.nanmin(l), np.nanmax(h)))
+            
+            for name in self.indicators:
+                if name in self.OVERLAYS:
+                    self.draw_overlay(ax, name, df, x, width)
+            
+            for i, name in enumerate(panels, 1):
+                self.draw_panel(self.figure.add_subplot(grid[i], sharex=ax), name, df, x, width)
+            
+            for track in self.tracks:
+                self.blit.add(track.artists)
+            self.set_live(x[-1], o[-1], h[-1], l[-1], c[-1], v[-1])
+            
+            # History is drawn decimated to the visible range and pixel width
+            self.lod = LevelOfDetail(ax, lambda: self.candles.x['x'])
+            for artist in [self.candles] + self.tracks:
+                self.lod.add(artist)
+            ax.set_xlim(x[0] - width, x[-1] + width)
+            self.lod.update(force=True)
+            
+            # Dates only under the bottom panel
+            for upper in self.figure.axes[:-1]:
+                upper.tick_params(labelbottom=False)
         
         self.canvas.draw()
     
+    def advance(self, df):
+        # Rows from the previously forming bar onward; everything before is drawn
+        rows = df.iloc[self.closed:]
+        x = date_x(rows.index)
+        o, h, l, c, v = (rows[field].to_numpy(float) for field in FIELDS)
+        redraw = False
+        
+        if len(rows) > 1:
+            # Bars closed since the last update join the static artists
+            following = self.figure.axes[0].get_xlim()[1] >= x[0]
+            self.candles.append(x[:-1], o[:-1], h[:-1], l[:-1], c[:-1])
+            for track in self.tracks:
+                track.append(x[:-1], v[:-1] if track.source == 'volume' else c[:-1])
+            self.closed = len(df) - 1
+            if following:
+                left = self.figure.axes[0].get_xlim()[0]
+                self.figure.axes[0].set_xlim(left, x[-1] + self.candles.width)
+            redraw = True
+        
+        redraw = not self.set_live(x[-1], o[-1], h[-1], l[-1], c[-1], v[-1]) or redraw
+        if redraw:
+            self.canvas.draw_idle()
+        else:
+            self.blit.update()
+    
+    def update_tick(self, price, volume=0.0):
+        """Move the forming bar to a new trade price; repaints only the moving parts."""
+        if self.live is None:
+            return
+        x, o, h, l, c, v = self.live
+        if self.set_live(x, o, max(h, price), min(l, price), price, v + volume):
+            self.blit.update()
+        else:
+            self.canvas.draw_idle()
+    
+    def set_live(self, x, o, h, l, c, v):
+        """Update the forming bar's artists; returns False if an axis had to be rescaled."""
+        self.live = (x, o, h, l, c, v)
+        self.live_candle.draw(*(np.array([value]) for value in (x, o, h, l, c)))
+        for track in self.tracks:
+            track.set_live(x, v if track.source == 'volume' else c)
+        
+        in_view = True
+        ax = self.figure.axes[0]
+        low, high = ax.get_ylim()
+        if l < low or h > high:
+            ax.set_ylim(*padded(min(l, low), max(h, high)))
+            in_view = False
+        for track in self.tracks:
+            if track.ax is not ax and not track.in_view():
+                track.ax.set_ylim(*padded(*track.limits()))
+                in_view = False
+        return in_view
+    
+    def toggle_indicator(self, name):
+        if name in self.indicators:
+            self.indicators.remove(name)
+        else:
+            self.indicators.append(name)
+        
+        if self.data is not None:
+            self.render(self.data)
+    
+    def draw_overlay(self, ax, name, df, x, width):
+        close = df['Close'].to_numpy(float)
+        if name == "Bollinger Bands":
+            self.add_track(ax, x, self.compute(indicators.bollinger_bands, close),
+                           indicators.BollingerState(20, 2.0).seed(close[:-1]),
+                           outputs=(None, dict(color='gray', linewidth=1, label='BB (20, 2)'), None),
+                           fill=(0, 2, dict(color='gray', alpha=0.15, linewidth=0)))
+        elif name == "Moving Averages":
+            self.add_track(ax, x, (self.compute(indicators.sma, close, period=20),),
+                           indicators.SMAState(20).seed(close[:-1]),
+                           outputs=(dict(color='blue', linewidth=1, label='SMA 20'),))
+            self.add_track(ax, x, (self.compute(indicators.ema, close, span=50),),
+                           indicators.EMAState(50).seed(close[:-1]),
+                           outputs=(dict(color='purple', linewidth=1, label='EMA 50'),))
+        ax.legend(loc='upper left')
+    
+    def draw_panel(self, ax, name, df, x, width):
+        close = df['Close'].to_numpy(float)
+        if name == "RSI":
+            self.add_track(ax, x, (self.compute(indicators.rsi, close),),
+                           indicators.RSIState(14).seed(close[:-1]),
+                           outputs=(dict(color='orange'),))
+            ax.axhline(y=70, color='r', linestyle='--', alpha=0.5)
+            ax.axhline(y=30, color='g', linestyle='--', alpha=0.5)
+            ax.set_ylim(0, 100)
+        elif name == "MACD":
+            self.add_track(ax, x, self.compute(indicators.macd, close),
+                           indicators.MACDState().seed(close[:-1]),
+                           outputs=(dict(color='blue'), dict(color='red'),
+                                    ('bar', dict(color='gray', alpha=0.5))),
+                           width=width)
+        elif name == "Volume":
+            volume = df['Volume'].to_numpy(float)
+            self.add_track(ax, x, (volume,), source='volume', width=width,
+                           outputs=(('bar', dict(color='gray', alpha=0.5)),))
+            self.add_track(ax, x, (self.compute(indicators.volume_sma, volume),),
+                           indicators.SMAState(20).seed(volume[:-1]), source='volume',
+                           outputs=(dict(color='blue', linewidth=1),))
+        ax.set_ylabel(name)
+        ax.grid(True, alpha=0.3)
+        if name != "RSI":
+            limits = [track.limits() for track in self.tracks if track.ax is ax]
+            limits = [limit for limit in limits if limit is not None]
+            if limits:
+                ax.set_ylim(*padded(min(l for l, _ in limits), max(h for _, h in limits)))
+    
+    def add_track(self, ax, x, values, state=None, **kwargs):
+        self.tracks.append(IndicatorTrack(ax, x, values, state, **kwargs))
+    
+    def compute(self, fn, *args, **params):
+        return indicators.cached(self.cache, self.series, fn, *args, **params)
+    
     def plot_line(self, x_data, y_data, label="Line", color='blue'):
         self.ax.clear()
         self.ax.plot(x_data, y_data, label=label, color=color)
@@ -175,82 +265,162 @@ class CandleStickChart(QWidget):
         self.canvas.draw()
 
 class TechnicalIndicatorChart(QWidget):
-    def __init__(self):
+    def __init__(self, cache=None):
         super().__init__()
         self.figure, (self.ax1, self.ax2, self.ax3) = plt.subplots(3, 1, figsize=(10, 8), 
                                                                    gridspec_kw={'height_ratios': [3, 1, 1]})
         self.canvas = FigureCanvas(self.figure)
         self.layout = QVBoxLayout()
+        self.layout.addWidget(NavigationToolbar(self.canvas, self))
         self.layout.addWidget(self.canvas)
         self.setLayout(self.layout)
+        self.cache = cache
+        self.series = None
+        self.tracks = []
+        self.lod = None
     
-    def plot_indicators(self, df):
+    def plot_indicators(self, df, series=None):
+        self.series = series
+        self.tracks = []
         self.figure.clear()
         
-        # Create subplots
+        # Create subplots; zooming or panning one moves all three
         ax1 = self.figure.add_subplot(311)
-        ax2 = self.figure.add_subplot(312)
-        ax3 = self.figure.add_subplot(313)
+        ax2 = self.figure.add_subplot(312, sharex=ax1)
+        ax3 = self.figure.add_subplot(313, sharex=ax1)
+        for ax in (ax1, ax2, ax3):
+            ax.xaxis_date()
+        
+        x = date_x(df.index)
+        width = bar_width(x)
+        close = df['Close'].to_numpy(float)
+        
+        # Lines keep every bucket's extremes, so long series are drawn at
+        # screen resolution without losing peaks
+        self.lod = LevelOfDetail(ax1, lambda: x)
         
         # Plot price
-        ax1.plot(df.index, df['Close'], label='Close', color='blue')
+        self.add_track(ax1, x, (close,), outputs=(dict(label='Close', color='blue'),))
         ax1.set_title('Price with Indicators')
-        ax1.legend()
         ax1.grid(True, alpha=0.3)
         
         # Calculate and plot RSI
-        rsi = self.calculate_rsi(df['Close'])
-        ax2.plot(df.index, rsi, label='RSI', color='orange')
+        rsi = self.calculate_rsi(close)
+        self.add_track(ax2, x, (rsi,), outputs=(dict(label='RSI', color='orange'),))
         ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5)
         ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5)
         ax2.set_title('RSI (14)')
-        ax2.legend()
+        ax2.set_ylim(0, 100)
         ax2.grid(True, alpha=0.3)
         
         # Calculate and plot MACD
-        macd, signal, hist = self.calculate_macd(df['Close'])
-        ax3.plot(df.index, macd, label='MACD', color='blue')
-        ax3.plot(df.index, signal, label='Signal', color='red')
-        ax3.bar(df.index, hist, label='Histogram', color='gray', alpha=0.5)
+        self.add_track(ax3, x, self.calculate_macd(close), width=width,
+                       outputs=(dict(label='MACD', color='blue'), dict(label='Signal', color='red'),
+                                ('bar', dict(label='Histogram', color='gray', alpha=0.5))))
         ax3.set_title('MACD')
-        ax3.legend()
         ax3.grid(True, alpha=0.3)
         
+        for ax, track in zip((ax1, ax3), (self.tracks[0], self.tracks[2])):
+            limits = track.limits()
+            if limits is not None:
+                ax.set_ylim(*padded(*limits))
+        for ax in (ax1, ax2, ax3):
+            ax.legend()
+        
+        if len(x):
+            ax1.set_xlim(x[0] - width, x[-1] + width)
+        self.lod.update(force=True)
+        
         self.figure.tight_layout()
         self.canvas.draw()
     
+    def add_track(self, ax, x, values, **kwargs):
+        track = IndicatorTrack(ax, x, values, live=False, **kwargs)
+        self.tracks.append(track)
+        self.lod.add(track)
+    
     def calculate_rsi(self, prices, period=14):
-        deltas = np.diff(prices)
-        seed = deltas[:period+1]
-        up = seed[seed >= 0].sum()/period
-        down = -seed[seed < 0].sum()/period
-        rs = up/down
-        rsi = np.zeros_like(prices)
-        rsi[:period] = 100. - 100./(1.+rs)
-        
-        for i in range(period, len(prices)):
-            delta = deltas[i-1]
-            if delta > 0:
-                upval = delta
-                downval = 0.
-            else:
-                upval = 0.
-                downval = -delta
-            
-            up = (up*(period-1) + upval)/period
-            down = (down*(period-1) + downval)/period
-            rs = up/down
-            rsi[i] = 100. - 100./(1.+rs)
-        
-        return rsi
+        return indicators.cached(self.cache, self.series, indicators.rsi, prices, period=period)
     
     def calculate_macd(self, prices, fast=12, slow=26, signal=9):
-        exp1 = prices.ewm(span=fast, adjust=False).mean()
-        exp2 = prices.ewm(span=slow, adjust=False).mean()
-        macd = exp1 - exp2
-        signal_line = macd.ewm(span=signal, adjust=False).mean()
-        histogram = macd - signal_line
-        return macd, signal_line, histogram
+        return indicators.cached(self.cache, self.series, indicators.macd, prices,
+                                 fast=fast, slow=slow, signal=signal)
+
+# Pause in typing before the trade search runs
+SEARCH_DELAY_MS = 250
+
+# Price and indicator chart classes per renderer; both pairs share one interface
+CHART_BACKENDS = {
+    "Matplotlib": (CandleStickChart, TechnicalIndicatorChart),
+    "Qt Charts": (QtCandleStickChart, QtTechnicalIndicatorChart),
+}
+
+CHART_SYMBOLS = ["RELIANCE", "TCS", "HDFCBANK", "INFY", "NIFTY50"]
+
+# Painted watchlist buttons: (action, label)
+WATCHLIST_ACTIONS = (('chart', "📈"), ('trade', "💼"), ('remove', "❌"))
+
+ANALYTICS_CARDS = ("Net P&L", "Win Rate", "Expectancy", "Profit Factor",
+                   "Max Drawdown", "Longest Drawdown", "Sharpe", "Sortino",
+                   "Best Win Streak", "Worst Loss Streak", "Current Streak", "Avg Win / Loss")
+
+# (header, analytics.Performance field, format)
+BREAKDOWN_COLUMNS = (
+    ("Name", None, None),
+    ("Trades", 'trades', ","),
+    ("Win %", 'win_rate', ".1%"),
+    ("Net P&L", 'net_pnl', ",.2f"),
+    ("Expectancy", 'expectancy', ",.2f"),
+    ("Profit Factor", 'profit_factor', ".2f"),
+    ("Max DD", 'max_drawdown', ",.2f"),
+    ("Sharpe", 'sharpe', ".2f"),
+)
+
+# Option chain columns per side: (options.greeks key, header, format); the
+# calls side reads right to left, so both prices sit next to the strike
+CHAIN_FIELDS = (
+    ('rho', "Rho", ".2f"),
+    ('vega', "Vega", ".2f"),
+    ('theta', "Theta", ".2f"),
+    ('gamma', "Gamma", ".5f"),
+    ('delta', "Delta", ".3f"),
+    ('price', "Price", ",.2f"),
+)
+OPTION_EXPIRIES = 10
+OPTION_STRIKES = 100
+ITM_COLOR = "#34495E"
+ATM_COLOR = "#1A5276"
+
+# Strategy builder
+OPEN_POSITIONS = "Open Positions"
+UNDERLYING_LEG = "Underlying"
+OPTION_LOT_SIZE = 75
+STRATEGY_FIGURES = ("Net Premium", "Breakevens", "Max Profit", "Max Loss", "P&L Now",
+                    "Delta", "Gamma", "Theta / day", "Vega / 1%", "Rho / 1%")
+
+
+# Backtest trades table: (header, trades column, format)
+BACKTEST_COLUMNS = (
+    ("Entry Date", 'trade_date', None),
+    ("Type", 'trade_type', None),
+    ("Qty", 'quantity', ","),
+    ("Entry", 'entry_price', ",.2f"),
+    ("Exit Date", 'exit_date', None),
+    ("Exit", 'exit_price', ",.2f"),
+    ("Status", 'status', None),
+    ("P&L", 'pnl', ",.2f"),
+)
+
+
+def metric_text(value, spec, prefix=""):
+    """A metric formatted with `spec`; undefined (NaN) shows as a dash."""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "—"
+        if math.isinf(value):
+            return "∞"
+    return f"{prefix}{value:{spec}}"
+
 
 # ============================================
 # MAIN WINDOWS
@@ -258,7 +428,7 @@ class TechnicalIndicatorChart(QWidget):
 class LoginWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.db = DatabaseManager()
+        self.db = DatabaseManager.shared()
         self.init_ui()
     
     def init_ui(self):
@@ -389,7 +559,7 @@ class LoginWindow(QMainWindow):
 class RegisterWindow(QWidget):
     def __init__(self):
         super().__init__()
-        self.db = DatabaseManager()
+        self.db = DatabaseManager.shared()
         self.init_ui()
     
     def init_ui(self):
@@ -478,7 +648,48 @@ class MainWindow(QMainWindow):
     def __init__(self, user_id):
         super().__init__()
         self.user_id = user_id
-        self.db = DatabaseManager()
+        self.db = DatabaseManager.shared()
+        self.bar_store = BarStore(self.db)
+        self.indicator_cache = indicators.IndicatorCache()
+        self.bar_store.add_listener(self.indicator_cache.invalidate)
+        self.downloader = MarketDataDownloader(self.bar_store)
+        self.market_worker = MarketDataWorker(self.downloader, self)
+        self.market_worker.progress.connect(self.on_market_data_progress)
+        self.market_worker.loaded.connect(self.on_market_data_loaded)
+        self.market_worker.failed.connect(self.on_market_data_failed)
+        
+        self.export_worker = ExportWorker(self.db, self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_progress = None
+        
+        self.import_worker = ImportWorker(self.db, self)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.finished.connect(self.on_import_finished)
+        self.import_worker.failed.connect(self.on_import_failed)
+        self.import_progress = None
+        
+        self.analytics = TradeAnalytics(self.db)
+        self.analytics_worker = AnalyticsWorker(self.analytics, self)
+        self.analytics_worker.progress.connect(self.on_analytics_progress)
+        self.analytics_worker.finished.connect(self.on_analytics_ready)
+        self.analytics_worker.failed.connect(self.on_analytics_failed)
+        self.quote_fetcher = BatchFetcher(self.downloader)
+        self.quote_worker = QuoteBatchWorker(self.quote_fetcher, self)
+        self.quote_worker.quote_ready.connect(self.on_quote_ready)
+        self.quote_worker.finished.connect(self.on_quotes_finished)
+        self.indicator_worker = IndicatorBatchWorker(self.bar_store, self)
+        self.indicator_worker.finished.connect(self.on_watchlist_indicators)
+        self.watchlist_model = None
+        # Live prices: feeds publish into the hub, pages subscribe to it
+        self.tick_hub = TickHub()
+        self.tick_feed = None
+        self.screener = Screener(self.bar_store)
+        self.screener_worker = ScreenerWorker(self.screener, self)
+        self.screener_worker.matched.connect(self.on_screen_match)
+        self.screener_worker.finished.connect(self.on_screen_finished)
+        self.screener_worker.failed.connect(self.on_screen_failed)
         self.init_ui()
         self.load_dashboard()
     
@@ -592,11 +803,16 @@ class MainWindow(QMainWindow):
         stats_widget = QWidget()
         stats_layout = QHBoxLayout()
         
+        # One row of trade_summary, kept current by triggers
+        summary = self.db.get_summary(self.user_id)
+        closed = summary['closed_trades']
+        win_rate = f"{summary['wins'] / closed:.0%}" if closed else "—"
+        pnl = summary['realized_pnl']
         stats = [
-            ("Total Trades", "25", "#2E86C1"),
-            ("Win Rate", "68%", "#27AE60"),
-            ("Profit/Loss", "₹12,500", "#E74C3C"),
-            ("Open Positions", "3", "#F39C12")
+            ("Total Trades", f"{summary['total_trades']:,}", "#2E86C1"),
+            ("Win Rate", win_rate, "#27AE60"),
+            ("Profit/Loss", f"₹{pnl:,.0f}", PROFIT_COLOR if pnl >= 0 else LOSS_COLOR),
+            ("Open Positions", f"{summary['open_trades']:,}", "#F39C12")
         ]
         
         for title, value, color in stats:
@@ -761,26 +977,33 @@ class MainWindow(QMainWindow):
         
         symbol_label = QLabel("Symbol:")
         self.chart_symbol = QComboBox()
-        self.chart_symbol.addItems(["RELIANCE", "TCS", "HDFCBANK", "INFY", "NIFTY50"])
+        self.chart_symbol.addItems(CHART_SYMBOLS)
         self.chart_symbol.currentTextChanged.connect(self.update_chart)
         
-        interval_combo = QComboBox()
-        interval_combo.addItems(["1d", "1h", "30m", "15m", "5m"])
+        self.chart_interval = QComboBox()
+        self.chart_interval.addItems(["1d", "1h", "30m", "15m", "5m"])
+        self.chart_interval.currentTextChanged.connect(self.update_chart)
         
         download_btn = QPushButton("Download Data")
         download_btn.clicked.connect(self.download_market_data)
         
+        self.chart_renderer = QComboBox()
+        self.chart_renderer.addItems(list(CHART_BACKENDS))
+        self.chart_renderer.currentTextChanged.connect(self.set_chart_renderer)
+        
         symbol_layout.addWidget(symbol_label)
         symbol_layout.addWidget(self.chart_symbol)
         symbol_layout.addWidget(QLabel("Interval:"))
-        symbol_layout.addWidget(interval_combo)
+        symbol_layout.addWidget(self.chart_interval)
+        symbol_layout.addWidget(QLabel("Renderer:"))
+        symbol_layout.addWidget(self.chart_renderer)
         symbol_layout.addWidget(download_btn)
         
         symbol_widget.setLayout(symbol_layout)
         price_layout.addWidget(symbol_widget)
         
         # Chart display
-        self.price_chart = CandleStickChart()
+        self.price_chart = CandleStickChart(cache=self.indicator_cache)
         price_layout.addWidget(self.price_chart)
         
         # Indicators
@@ -800,20 +1023,178 @@ class MainWindow(QMainWindow):
         chart_tab.addTab(price_tab, "Price Chart")
         
         # Technical Indicators Tab
-        tech_tab = TechnicalIndicatorChart()
-        chart_tab.addTab(tech_tab, "Technical Indicators")
+        self.tech_chart = TechnicalIndicatorChart(cache=self.indicator_cache)
+        chart_tab.addTab(self.tech_chart, "Technical Indicators")
+        chart_tab.addTab(self.create_backtest_tab(), "Backtest")
+        self.chart_tab = chart_tab
         
         self.content_area.addWidget(chart_tab)
         self.content_area.setCurrentWidget(chart_tab)
         
+        # Live ticks for the charted symbol move the forming bar
+        self.chart_ticks = TickSubscriber(self.tick_hub, [], parent=chart_tab)
+        self.chart_ticks.updated.connect(self.on_chart_ticks)
+        
         # Load initial chart
         self.update_chart()
     
+    def create_backtest_tab(self):
+        backtest_tab = QWidget()
+        layout = QVBoxLayout()
+        
+        rules = QFormLayout()
+        self.backtest_entry = QLineEdit("rsi < 30")
+        self.backtest_entry.setPlaceholderText("e.g. rsi < 30 and macd crosses_above macd_signal")
+        self.backtest_exit = QLineEdit("rsi > 70")
+        self.backtest_exit.setPlaceholderText("e.g. rsi > 70 or close < sma_50")
+        rules.addRow("Entry Rule:", self.backtest_entry)
+        rules.addRow("Exit Rule:", self.backtest_exit)
+        layout.addLayout(rules)
+        
+        controls = QHBoxLayout()
+        self.backtest_side = QComboBox()
+        self.backtest_side.addItems(["Long", "Short"])
+        self.backtest_quantity = QSpinBox()
+        self.backtest_quantity.setRange(1, 1_000_000)
+        self.backtest_quantity.setValue(1)
+        self.backtest_brokerage = QDoubleSpinBox()
+        self.backtest_brokerage.setRange(0, 10_000)
+        self.backtest_brokerage.setValue(backtest.BROKERAGE)
+        self.backtest_brokerage.setPrefix("₹")
+        self.backtest_commission = QDoubleSpinBox()
+        self.backtest_commission.setRange(0, 5)
+        self.backtest_commission.setDecimals(3)
+        self.backtest_commission.setValue(backtest.COMMISSION_RATE * 100)
+        self.backtest_commission.setSuffix(" %")
+        self.backtest_slippage = QDoubleSpinBox()
+        self.backtest_slippage.setRange(0, 5)
+        self.backtest_slippage.setDecimals(3)
+        self.backtest_slippage.setValue(backtest.SLIPPAGE * 100)
+        self.backtest_slippage.setSuffix(" %")
+        run_btn = QPushButton("Run Backtest")
+        run_btn.clicked.connect(self.run_backtest)
+        self.backtest_save = QPushButton("Save to Journal")
+        self.backtest_save.setEnabled(False)
+        self.backtest_save.clicked.connect(self.save_backtest)
+        for label, control in (("Side:", self.backtest_side), ("Quantity:", self.backtest_quantity),
+                               ("Brokerage / order:", self.backtest_brokerage),
+                               ("Charges:", self.backtest_commission), ("Slippage:", self.backtest_slippage)):
+            controls.addWidget(QLabel(label))
+            controls.addWidget(control)
+        controls.addStretch()
+        controls.addWidget(run_btn)
+        controls.addWidget(self.backtest_save)
+        layout.addLayout(controls)
+        
+        self.backtest_status = QLabel("Runs on the cached bars of the symbol and interval selected on the Price Chart tab")
+        self.backtest_status.setStyleSheet("color: #7F8C8D;")
+        layout.addWidget(self.backtest_status)
+        
+        self.backtest_pane = ChartPane("Equity (after costs)")
+        self.backtest_pane.x_axis.setFormat("dd MMM yyyy")
+        self.backtest_line = self.backtest_pane.line(PROFIT_COLOR, 2)
+        layout.addWidget(self.backtest_pane, 2)
+        
+        self.backtest_table = QTableWidget()
+        self.backtest_table.setColumnCount(len(BACKTEST_COLUMNS))
+        self.backtest_table.setHorizontalHeaderLabels([header for header, _, _ in BACKTEST_COLUMNS])
+        header = self.backtest_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for column, (_, name, _) in enumerate(BACKTEST_COLUMNS):
+            if name.endswith('date'):
+                header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        self.backtest_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.backtest_table, 2)
+        
+        backtest_tab.setLayout(layout)
+        self.backtest_result = None
+        return backtest_tab
+    
+    def run_backtest(self):
+        symbol = ticker_for(self.chart_symbol.currentText())
+        interval = self.chart_interval.currentText()
+        try:
+            result = backtest.backtest(
+                self.bar_store, symbol, interval, self.backtest_entry.text(), self.backtest_exit.text(),
+                side="SELL" if self.backtest_side.currentText() == "Short" else "BUY",
+                quantity=self.backtest_quantity.value(),
+                brokerage=self.backtest_brokerage.value(),
+                commission_rate=self.backtest_commission.value() / 100,
+                slippage=self.backtest_slippage.value() / 100,
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Backtest", str(e))
+            return
+        
+        self.backtest_result = result
+        self.backtest_save.setEnabled(len(result.trades) > 0)
+        if not len(result.time):
+            self.backtest_status.setText(f"No cached {interval} bars for {symbol}: download data first")
+        else:
+            self.backtest_status.setText(f"{symbol} {interval}: {result.summary()}")
+        self.plot_backtest(result)
+        self.fill_backtest_trades(result.trades)
+    
+    def plot_backtest(self, result):
+        if not len(result.time):
+            self.backtest_line.clear()
+            return
+        x = time_ms(pd.to_datetime(result.time))
+        pyramid = lod.LinePyramid(result.equity)
+        keep = pyramid.points(0, len(x), lod.level_for(len(x), self.backtest_pane.width()))
+        self.backtest_line.replace(points(x[keep], result.equity[keep]))
+        self.backtest_pane.set_x(x[0], x[-1] if x[-1] > x[0] else x[0] + 86_400_000)
+        self.backtest_pane.set_y(*padded(min(result.equity.min(), 0.0), max(result.equity.max(), 0.0)))
+    
+    def fill_backtest_trades(self, trades):
+        # Newest first, as in the journal
+        rows = trades.iloc[::-1]
+        self.backtest_table.setRowCount(len(rows))
+        for column, (_, name, spec) in enumerate(BACKTEST_COLUMNS):
+            for row, value in enumerate(rows[name].tolist()):
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    text = "—"
+                else:
+                    text = f"{value:{spec}}" if spec else str(value)
+                item = QTableWidgetItem(text)
+                if name == 'pnl' and value:
+                    item.setForeground(QColor(PROFIT_COLOR if value > 0 else LOSS_COLOR))
+                self.backtest_table.setItem(row, column, item)
+    
+    def save_backtest(self):
+        result = self.backtest_result
+        if result is None or not len(result.trades):
+            return
+        count = backtest.save_trades(self.db, self.user_id, result)
+        self.backtest_save.setEnabled(False)
+        self.statusBar().showMessage(
+            f"{count} backtest trades saved to the journal as strategy '{backtest.BACKTEST_STRATEGY}'", 5000)
+    
+    def set_chart_renderer(self, name):
+        # Swap both chart widgets, keeping the selected indicators and data
+        price_class, tech_class = CHART_BACKENDS[name]
+        old_price, old_tech = self.price_chart, self.tech_chart
+        
+        self.price_chart = price_class(cache=self.indicator_cache)
+        self.price_chart.indicators = list(old_price.indicators)
+        old_price.parentWidget().layout().replaceWidget(old_price, self.price_chart)
+        old_price.deleteLater()
+        
+        self.tech_chart = tech_class(cache=self.indicator_cache)
+        index = self.chart_tab.indexOf(old_tech)
+        self.chart_tab.removeTab(index)
+        self.chart_tab.insertTab(index, self.tech_chart, "Technical Indicators")
+        old_tech.deleteLater()
+        
+        if old_price.data is not None:
+            self.price_chart.plot_candlestick(old_price.data, old_price.title, old_price.series)
+            self.tech_chart.plot_indicators(old_price.data, old_price.series)
+    
     def update_chart(self):
-        symbol = self.chart_symbol.currentText()
-        # In production, fetch real data here
-        # For demo, create sample data
-        self.load_sample_chart(self.price_chart, symbol)
+        # Cached bars are read on a worker thread; switching symbols again
+        # before they arrive cancels this request
+        symbol = ticker_for(self.chart_symbol.currentText())
+        self.market_worker.request(symbol, self.chart_interval.currentText())
     
     def load_sample_chart(self, chart_widget, symbol="RELIANCE"):
         # Generate sample OHLC data
@@ -835,30 +1216,49 @@ class MainWindow(QMainWindow):
         }, index=dates)
         
         chart_widget.plot_candlestick(df, f"{symbol} - Sample Chart")
+        return df
     
     def download_market_data(self):
-        symbol = self.chart_symbol.currentText()
-        try:
-            # Using yfinance for demo - in production, use your data source
-            if symbol == "NIFTY50":
-                symbol = "^NSEI"
-            
-            data = yf.download(symbol, period="1mo", interval="1d")
-            if not data.empty:
-                # Cache data
-                self.db.execute_query(
-                    "INSERT OR REPLACE INTO market_cache (symbol, data) VALUES (?, ?)",
-                    (symbol, data.to_json())
-                )
-                QMessageBox.information(self, "Success", f"Data downloaded for {symbol}")
-                self.update_chart()
+        # Only bars newer than the last cached one are fetched
+        symbol = ticker_for(self.chart_symbol.currentText())
+        self.market_worker.request(symbol, self.chart_interval.currentText(), download=True)
+    
+    def on_market_data_progress(self, symbol, percent, message):
+        self.statusBar().showMessage(f"{message} {percent}%")
+    
+    def on_market_data_loaded(self, symbol, interval, df, fetched, version):
+        self.statusBar().clearMessage()
+        
+        if fetched is not None:
+            if fetched:
+                QMessageBox.information(self, "Success", f"{fetched} bars downloaded for {symbol}")
+            elif len(df) > 0:
+                QMessageBox.information(self, "Success", f"{symbol} is already up to date")
             else:
                 QMessageBox.warning(self, "Error", "No data available")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Download failed: {str(e)}")
+        
+        # Show cached bars when we have them, sample data otherwise
+        display_symbol = self.chart_symbol.currentText()
+        if len(df) > 0:
+            series = (symbol, interval, version)
+            self.price_chart.plot_candlestick(df, f"{display_symbol} - {interval}", series)
+        else:
+            series = None
+            df = self.load_sample_chart(self.price_chart, display_symbol)
+        self.tech_chart.plot_indicators(df, series)
+        self.chart_ticks.set_symbols([symbol])
+    
+    def on_chart_ticks(self, ticks):
+        for tick in ticks:
+            self.price_chart.update_tick(tick.price, tick.volume)
+    
+    def on_market_data_failed(self, symbol, error):
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Download failed: {error}")
     
     def add_indicator(self, indicator):
-        QMessageBox.information(self, "Indicator", f"{indicator} added to chart")
+        # Buttons toggle: a second click removes the indicator again
+        self.price_chart.toggle_indicator(indicator)
     
     def show_trades(self):
         self.clear_content()
@@ -881,27 +1281,43 @@ class MainWindow(QMainWindow):
         export_btn = QPushButton("📥 Export CSV")
         export_btn.clicked.connect(self.export_trades_csv)
         
-        filter_combo = QComboBox()
-        filter_combo.addItems(["All Trades", "Open Trades", "Closed Trades", "This Month"])
+        import_btn = QPushButton("📤 Import Trades")
+        import_btn.clicked.connect(self.import_trades_file)
+        
+        self.trade_filter = QComboBox()
+        self.trade_filter.addItems(["All Trades", "Open Trades", "Closed Trades", "This Month"])
+        self.trade_filter.currentTextChanged.connect(self.apply_trade_filters)
         
-        search_input = QLineEdit()
-        search_input.setPlaceholderText("Search trades...")
+        # Search as you type, once typing pauses
+        self.trade_search = QLineEdit()
+        self.trade_search.setPlaceholderText("Search trades...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_trade_filters)
+        self.trade_search.textChanged.connect(self.search_timer.start)
+        self.trade_search.returnPressed.connect(self.apply_trade_filters)
         
         toolbar_layout.addWidget(add_btn)
         toolbar_layout.addWidget(export_btn)
-        toolbar_layout.addWidget(filter_combo)
-        toolbar_layout.addWidget(search_input)
+        toolbar_layout.addWidget(import_btn)
+        toolbar_layout.addWidget(self.trade_filter)
+        toolbar_layout.addWidget(self.trade_search)
         toolbar_layout.addStretch()
         
         toolbar.setLayout(toolbar_layout)
         layout.addWidget(toolbar)
         
-        # Trades table
-        self.trades_table = QTableWidget()
-        self.trades_table.setColumnCount(10)
-        self.trades_table.setHorizontalHeaderLabels([
-            "ID", "Symbol", "Type", "Qty", "Entry", "Exit", "SL", "Target", "Status", "P&L"
-        ])
+        # Trades table: rows are paged in from SQLite as the view scrolls
+        self.trades_model = TradeTableModel(self.db, self.user_id)
+        self.trades_table = QTableView()
+        self.trades_table.setModel(self.trades_model)
+        self.trades_table.setItemDelegateForColumn(TradeTableModel.PNL_COLUMN, PnLDelegate(self.trades_table))
+        self.trades_table.verticalHeader().setVisible(False)
+        # Fixed row heights: the view never measures rows it does not paint
+        self.trades_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.trades_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.trades_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         
         # Load trades
         self.load_trades_table()
@@ -913,26 +1329,22 @@ class MainWindow(QMainWindow):
         self.content_area.setCurrentWidget(trades_widget)
     
     def load_trades_table(self):
-        trades = self.db.get_trades(self.user_id)
-        self.trades_table.setRowCount(len(trades))
-        
-        for row, trade in enumerate(trades):
-            for col, value in enumerate(trade[:10]):  # First 10 columns
-                item = QTableWidgetItem(str(value) if value is not None else "")
-                self.trades_table.setItem(row, col, item)
-                
-                # Color code P&L
-                if col == 9 and value:
-                    try:
-                        pnl = float(value)
-                        if pnl > 0:
-                            item.setForeground(QColor("#27AE60"))
-                        elif pnl < 0:
-                            item.setForeground(QColor("#E74C3C"))
-                    except:
-                        pass
-        
-        self.trades_table.resizeColumnsToContents()
+        self.trades_model.reload()
+        if self.trades_model.canFetchMore():
+            self.trades_model.fetchMore()
+    
+    def apply_trade_filters(self):
+        # Filters and search run in SQL; the model refetches from the first page
+        self.search_timer.stop()
+        name = self.trade_filter.currentText()
+        today = datetime.now()
+        self.trades_model.set_filters(
+            status={"Open Trades": "OPEN", "Closed Trades": "CLOSED"}.get(name),
+            since=today.strftime("%Y-%m-01") if name == "This Month" else None,
+            search=self.trade_search.text().strip(),
+        )
+        if self.trades_model.canFetchMore():
+            self.trades_model.fetchMore()
     
     def add_new_trade(self):
         dialog = TradeDialog(self.user_id, self.db)
@@ -940,19 +1352,77 @@ class MainWindow(QMainWindow):
         self.load_trades_table()
     
     def export_trades_csv(self):
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Export Trades", "", "CSV Files (*.csv)"
+        filename, selected = QFileDialog.getSaveFileName(
+            self, "Export Trades", "", "CSV Files (*.csv);;SR Columnar Files (*.srtc)"
         )
         
         if filename:
-            trades = self.db.get_trades(self.user_id)
-            df = pd.DataFrame(trades, columns=[
-                "ID", "User ID", "Symbol", "Type", "Quantity", "Entry Price",
-                "Exit Price", "Stop Loss", "Target", "Trade Date", "Exit Date",
-                "Expiry", "Strike", "Option Type", "Strategy", "Notes", "Status", "P&L"
-            ])
-            df.to_csv(filename, index=False)
-            QMessageBox.information(self, "Success", f"Trades exported to {filename}")
+            # The export streams from the database on a worker thread
+            format = 'srtc' if filename.endswith('.srtc') or 'srtc' in selected else 'csv'
+            if not filename.endswith('.' + format):
+                filename += '.' + format
+            self.export_progress = QProgressDialog("Exporting trades...", "Cancel", 0, 100, self)
+            self.export_progress.setWindowTitle("Export Trades")
+            self.export_progress.setWindowModality(Qt.WindowModality.WindowModal)
+            self.export_progress.canceled.connect(self.export_worker.cancel)
+            self.export_progress.show()
+            self.export_worker.request(self.user_id, filename, format)
+    
+    def on_export_progress(self, percent, message):
+        if self.export_progress is not None:
+            self.export_progress.setValue(percent)
+            self.export_progress.setLabelText(message)
+    
+    def close_export_progress(self):
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect()
+            self.export_progress.close()
+            self.export_progress = None
+    
+    def on_export_finished(self, filename, rows):
+        self.close_export_progress()
+        QMessageBox.information(self, "Success", f"{rows} trades exported to {filename}")
+    
+    def on_export_failed(self, error):
+        self.close_export_progress()
+        QMessageBox.critical(self, "Error", f"Export failed: {error}")
+    
+    def import_trades_file(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Import Trades", "", "Trade Files (*.csv *.srtc);;All Files (*)"
+        )
+        
+        if filename:
+            self.import_progress = QProgressDialog("Importing trades...", "Cancel", 0, 100, self)
+            self.import_progress.setWindowTitle("Import Trades")
+            self.import_progress.setWindowModality(Qt.WindowModality.WindowModal)
+            self.import_progress.canceled.connect(self.import_worker.cancel)
+            self.import_progress.show()
+            self.import_worker.request(self.user_id, filename)
+    
+    def on_import_progress(self, percent, message):
+        if self.import_progress is not None:
+            self.import_progress.setValue(percent)
+            self.import_progress.setLabelText(message)
+    
+    def close_import_progress(self):
+        if self.import_progress is not None:
+            self.import_progress.canceled.disconnect()
+            self.import_progress.close()
+            self.import_progress = None
+    
+    def on_import_finished(self, result):
+        self.close_import_progress()
+        message = result.summary()
+        if result.errors:
+            message += "\n\n" + "\n".join(result.errors)
+        QMessageBox.information(self, "Import Complete", message)
+        if hasattr(self, 'trades_model'):
+            self.load_trades_table()
+    
+    def on_import_failed(self, error):
+        self.close_import_progress()
+        QMessageBox.critical(self, "Error", f"Import failed: {error}")
     
     def show_watchlist(self):
         self.clear_content()
@@ -979,18 +1449,67 @@ class MainWindow(QMainWindow):
         add_widget.setLayout(add_layout)
         layout.addWidget(add_widget)
         
-        # Watchlist table
-        self.watchlist_table = QTableWidget()
-        self.watchlist_table.setColumnCount(4)
-        self.watchlist_table.setHorizontalHeaderLabels(["Symbol", "LTP", "Change %", "Action"])
+        # Watchlist table: rows come from the model, buttons are painted.
+        # The model (and its refresh timer) goes with the table when the
+        # page is cleared.
+        self.watchlist_table = QTableView()
+        self.watchlist_model = WatchlistModel(self.db, self.user_id, self.watchlist_table)
+        self.watchlist_table.setModel(self.watchlist_model)
+        self.watchlist_actions = ActionDelegate(WATCHLIST_ACTIONS, self.watchlist_table)
+        self.watchlist_actions.clicked.connect(self.on_watchlist_action)
+        self.watchlist_table.setItemDelegateForColumn(WatchlistModel.ACTION_COLUMN,
+                                                      self.watchlist_actions)
+        self.watchlist_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.watchlist_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.watchlist_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        
+        self.watchlist_ticks = TickSubscriber(self.tick_hub, [], parent=self.watchlist_table)
+        self.watchlist_ticks.updated.connect(self.watchlist_model.set_ticks)
         
         # Load watchlist
         self.load_watchlist()
         
         layout.addWidget(self.watchlist_table)
+        
+        # Screener
+        screener_title = QLabel("Screener")
+        screener_title.setStyleSheet("font-size: 18px; font-weight: bold; color: #2E86C1;")
+        layout.addWidget(screener_title)
+        
+        screen_widget = QWidget()
+        screen_layout = QHBoxLayout()
+        
+        self.screen_rule = QLineEdit()
+        self.screen_rule.setPlaceholderText("e.g. rsi < 30 and macd crosses_above macd_signal")
+        self.screen_rule.returnPressed.connect(self.run_screen)
+        
+        self.screen_universe = QComboBox()
+        self.screen_universe.addItems(["Watchlist", "All Cached Symbols"])
+        
+        screen_btn = QPushButton("Run Screen")
+        screen_btn.clicked.connect(self.run_screen)
+        
+        screen_layout.addWidget(self.screen_rule, 1)
+        screen_layout.addWidget(self.screen_universe)
+        screen_layout.addWidget(screen_btn)
+        screen_widget.setLayout(screen_layout)
+        layout.addWidget(screen_widget)
+        
+        self.screen_table = QTableWidget()
+        self.screen_table.setColumnCount(5)
+        self.screen_table.setHorizontalHeaderLabels(["Symbol", "Close", "Change %", "RSI (14)", "MACD"])
+        layout.addWidget(self.screen_table)
+        
+        self.screen_stats = QLabel("")
+        self.screen_stats.setStyleSheet("color: #7F8C8D;")
+        layout.addWidget(self.screen_stats)
+        
         widget.setLayout(layout)
         self.content_area.addWidget(widget)
         self.content_area.setCurrentWidget(widget)
+        
+        # Start the screener processes before the first screen needs them
+        self.screener_worker.warm()
     
     def add_to_watchlist(self):
         symbol = self.watchlist_input.text().upper()
@@ -999,58 +1518,103 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            self.db.execute_query(
-                "INSERT OR IGNORE INTO watchlist (user_id, symbol) VALUES (?, ?)",
-                (self.user_id, symbol)
-            )
-            QMessageBox.information(self, "Success", f"{symbol} added to watchlist")
+            if not self.watchlist_model.add(symbol):
+                QMessageBox.information(self, "Watchlist", f"{symbol} is already in the watchlist")
+                return
             self.watchlist_input.clear()
-            self.load_watchlist()
+            self.statusBar().showMessage(f"{symbol} added to watchlist", 3000)
+            self.watchlist_ticks.set_symbols(self.watchlist_model.tickers())
+            self.refresh_watchlist()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
     
     def load_watchlist(self):
-        # Sample watchlist data - in production, fetch real prices
-        symbols = ["RELIANCE", "TCS", "HDFCBANK", "INFY", "ICICIBANK"]
+        self.watchlist_model.reload()
+        self.watchlist_ticks.set_symbols(self.watchlist_model.tickers())
+        
+        # Last cached quotes until the refresh below comes back
+        for ticker in self.watchlist_model.tickers():
+            quote = self.quote_fetcher.quote(ticker)
+            if quote is not None:
+                self.watchlist_model.set_quote(quote)
+        self.refresh_watchlist()
+    
+    def refresh_watchlist(self):
+        self.update_watchlist_indicators()
         
-        self.watchlist_table.setRowCount(len(symbols))
+        # Refresh every symbol in the background; rows update as quotes arrive
+        tickers = self.watchlist_model.tickers()
+        if not tickers:
+            return
+        self.statusBar().showMessage(f"Refreshing {len(tickers)} symbols...")
+        self.quote_worker.request(tickers)
+    
+    def on_quote_ready(self, quote):
+        if self.watchlist_model is not None:
+            self.watchlist_model.set_quote(quote)
+    
+    def on_quotes_finished(self, count):
+        self.statusBar().showMessage(f"Prices updated for {count} symbols", 3000)
+        self.update_watchlist_indicators()
+    
+    def update_watchlist_indicators(self):
+        # One vectorized pass over the cached daily closes of every symbol,
+        # read and computed on the pool
+        if self.watchlist_model is None or not self.watchlist_model.rowCount():
+            return
+        self.indicator_worker.request(self.watchlist_model.tickers(), '1d')
+    
+    def on_watchlist_indicators(self, batch):
+        if self.watchlist_model is not None:
+            self.watchlist_model.set_indicators(batch)
+    
+    def run_screen(self):
+        try:
+            rule = parse_rule(self.screen_rule.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Screener", str(e))
+            return
         
-        for row, symbol in enumerate(symbols):
-            # Symbol
-            self.watchlist_table.setItem(row, 0, QTableWidgetItem(symbol))
-            
-            # Mock LTP and Change
-            ltp = 1000 + row * 100
-            change = (np.random.random() - 0.5) * 5
-            
-            self.watchlist_table.setItem(row, 1, QTableWidgetItem(f"₹{ltp:.2f}"))
-            
-            change_item = QTableWidgetItem(f"{change:+.2f}%")
-            if change >= 0:
-                change_item.setForeground(QColor("#27AE60"))
-            else:
-                change_item.setForeground(QColor("#E74C3C"))
-            self.watchlist_table.setItem(row, 2, change_item)
-            
-            # Action buttons
-            widget = QWidget()
-            btn_layout = QHBoxLayout()
-            
-            chart_btn = QPushButton("📈")
-            chart_btn.clicked.connect(lambda checked, s=symbol: self.chart_symbol_from_watchlist(s))
-            
-            trade_btn = QPushButton("💼")
-            trade_btn.clicked.connect(lambda checked, s=symbol: self.trade_from_watchlist(s))
-            
-            remove_btn = QPushButton("❌")
-            remove_btn.clicked.connect(lambda checked, s=symbol: self.remove_from_watchlist(s))
-            
-            btn_layout.addWidget(chart_btn)
-            btn_layout.addWidget(trade_btn)
-            btn_layout.addWidget(remove_btn)
-            widget.setLayout(btn_layout)
-            
-            self.watchlist_table.setCellWidget(row, 3, widget)
+        if self.screen_universe.currentText() == "Watchlist":
+            symbols = self.watchlist_model.tickers()
+        else:
+            symbols = self.screener.universe('1d')
+        
+        self.screen_table.setRowCount(0)
+        self.screen_stats.setText(f"Screening {len(symbols)} symbols...")
+        self.screener_worker.request(rule, symbols, '1d')
+    
+    def on_screen_match(self, symbol, values):
+        row = self.screen_table.rowCount()
+        self.screen_table.insertRow(row)
+        self.screen_table.setItem(row, 0, QTableWidgetItem(symbol))
+        self.screen_table.setItem(row, 1, QTableWidgetItem(f"₹{values['close']:.2f}"))
+        
+        change_item = QTableWidgetItem(f"{values['change_pct']:+.2f}%")
+        change_item.setForeground(QColor("#27AE60" if values['change_pct'] >= 0 else "#E74C3C"))
+        self.screen_table.setItem(row, 2, change_item)
+        
+        self.screen_table.setItem(row, 3, QTableWidgetItem(f"{values['rsi']:.1f}"))
+        
+        macd_item = QTableWidgetItem(f"{values['macd_hist']:+.2f}")
+        macd_item.setForeground(QColor("#27AE60" if values['macd_hist'] >= 0 else "#E74C3C"))
+        self.screen_table.setItem(row, 4, macd_item)
+    
+    def on_screen_finished(self, stats):
+        self.screen_stats.setText(stats.summary())
+    
+    def on_screen_failed(self, error):
+        self.screen_stats.setText("")
+        QMessageBox.warning(self, "Screener", f"Screen failed: {error}")
+    
+    def on_watchlist_action(self, action, row):
+        symbol = self.watchlist_model.symbol(row)
+        if action == 'chart':
+            self.chart_symbol_from_watchlist(symbol)
+        elif action == 'trade':
+            self.trade_from_watchlist(symbol)
+        elif action == 'remove':
+            self.remove_from_watchlist(symbol)
     
     def chart_symbol_from_watchlist(self, symbol):
         self.chart_symbol.setCurrentText(symbol)
@@ -1061,11 +1625,8 @@ class MainWindow(QMainWindow):
         self.show_dashboard()
     
     def remove_from_watchlist(self, symbol):
-        self.db.execute_query(
-            "DELETE FROM watchlist WHERE user_id = ? AND symbol = ?",
-            (self.user_id, symbol)
-        )
-        self.load_watchlist()
+        self.watchlist_model.remove(symbol)
+        self.watchlist_ticks.set_symbols(self.watchlist_model.tickers())
     
     def show_options(self):
         self.clear_content()
@@ -1077,17 +1638,485 @@ class MainWindow(QMainWindow):
         title.setStyleSheet("font-size: 24px; font-weight: bold; color: #2E86C1;")
         layout.addWidget(title)
         
-        # Options chain widget would go here
-        # For now, show placeholder
-        placeholder = QLabel("Options Chain - Professional View\n\n"
-                           "• Live Options Data\n• Greeks Calculator\n• Strategy Builder\n• P&L Graphs")
-        placeholder.setStyleSheet("font-size: 16px; color: #7F8C8D;")
-        placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(placeholder)
+        tabs = QTabWidget()
+        tabs.addTab(self.create_chain_tab(), "Option Chain")
+        tabs.addTab(self.create_greeks_tab(), "Greeks Calculator")
+        tabs.addTab(self.create_strategy_tab(), "Strategy Builder")
+        layout.addWidget(tabs)
         
         widget.setLayout(layout)
         self.content_area.addWidget(widget)
         self.content_area.setCurrentWidget(widget)
+        
+        self.on_chain_underlying_changed()
+        self.on_strategy_underlying_changed()
+    
+    def create_chain_tab(self):
+        chain_tab = QWidget()
+        layout = QVBoxLayout()
+        
+        controls = QHBoxLayout()
+        self.chain_underlying = QComboBox()
+        self.chain_underlying.addItems(CHART_SYMBOLS)
+        self.chain_underlying.setCurrentText("NIFTY50")
+        self.chain_spot = QDoubleSpinBox()
+        self.chain_spot.setRange(0.05, 10_000_000)
+        self.chain_spot.setDecimals(2)
+        self.chain_follow = QCheckBox("Live")
+        self.chain_follow.setChecked(True)
+        self.chain_vol = QDoubleSpinBox()
+        self.chain_vol.setRange(1, 300)
+        self.chain_vol.setValue(15)
+        self.chain_vol.setSuffix(" %")
+        self.chain_rate = QDoubleSpinBox()
+        self.chain_rate.setRange(0, 30)
+        self.chain_rate.setValue(options.RISK_FREE_RATE * 100)
+        self.chain_rate.setSuffix(" %")
+        self.chain_strikes = QSpinBox()
+        self.chain_strikes.setRange(5, 500)
+        self.chain_strikes.setValue(OPTION_STRIKES)
+        self.chain_expiry = QComboBox()
+        self.chain_expiry.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
+        
+        for label, control in (("Underlying:", self.chain_underlying), ("Spot:", self.chain_spot),
+                               (None, self.chain_follow), ("Volatility:", self.chain_vol),
+                               ("Rate:", self.chain_rate), ("Strikes:", self.chain_strikes),
+                               ("Expiry:", self.chain_expiry)):
+            if label:
+                controls.addWidget(QLabel(label))
+            controls.addWidget(control)
+        controls.addStretch()
+        layout.addLayout(controls)
+        
+        self.chain_status = QLabel()
+        self.chain_status.setStyleSheet("color: #7F8C8D;")
+        layout.addWidget(self.chain_status)
+        
+        headers = ([f"Call {header}" for _, header, _ in CHAIN_FIELDS] + ["Strike"]
+                   + [f"Put {header}" for _, header, _ in reversed(CHAIN_FIELDS)])
+        self.chain_table = QTableWidget()
+        self.chain_table.setColumnCount(len(headers))
+        self.chain_table.setHorizontalHeaderLabels(headers)
+        self.chain_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.chain_table.verticalHeader().setVisible(False)
+        self.chain_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.chain_table)
+        
+        chain_tab.setLayout(layout)
+        
+        self.option_chain = None
+        self.chain_underlying.currentTextChanged.connect(self.on_chain_underlying_changed)
+        for control in (self.chain_spot, self.chain_vol, self.chain_rate):
+            control.valueChanged.connect(self.update_option_chain)
+        self.chain_strikes.valueChanged.connect(self.update_option_chain)
+        self.chain_expiry.currentIndexChanged.connect(self.fill_option_chain)
+        
+        # The underlying's live price, when a feed publishes it
+        self.chain_ticks = TickSubscriber(self.tick_hub, [], parent=chain_tab)
+        self.chain_ticks.updated.connect(self.on_chain_ticks)
+        return chain_tab
+    
+    def underlying_price(self, ticker):
+        tick = self.tick_hub.latest(ticker)
+        if tick is not None:
+            return tick.price
+        quote = self.quote_fetcher.quote(ticker)
+        return quote.ltp if quote is not None else None
+    
+    def on_chain_underlying_changed(self):
+        ticker = ticker_for(self.chain_underlying.currentText())
+        self.chain_ticks.set_symbols([ticker])
+        spot = self.underlying_price(ticker)
+        if spot is not None:
+            # Also prices the chain, through valueChanged
+            self.chain_spot.setValue(spot)
+        self.update_option_chain()
+        # Once the table has its size
+        QTimer.singleShot(0, self.center_option_chain)
+    
+    def on_chain_ticks(self, ticks):
+        if self.chain_follow.isChecked():
+            self.chain_spot.setValue(ticks[-1].price)
+    
+    def update_option_chain(self):
+        # Every strike of every expiry in one vectorized pass
+        spot = self.chain_spot.value()
+        step = options.strike_step(spot)
+        strikes = options.strikes_around(spot, step, self.chain_strikes.value())
+        expiries = options.expiry_dates(OPTION_EXPIRIES)
+        self.option_chain = options.Chain(spot, strikes, expiries, self.chain_vol.value() / 100,
+                                          self.chain_rate.value() / 100)
+        
+        labels = [expiry.strftime("%d %b %Y") for expiry in expiries]
+        if [self.chain_expiry.itemText(i) for i in range(self.chain_expiry.count())] != labels:
+            index = max(self.chain_expiry.currentIndex(), 0)
+            self.chain_expiry.blockSignals(True)
+            self.chain_expiry.clear()
+            self.chain_expiry.addItems(labels)
+            self.chain_expiry.setCurrentIndex(index)
+            self.chain_expiry.blockSignals(False)
+        self.chain_status.setText(
+            f"{len(self.option_chain):,} contracts, strikes every {step:g}; "
+            "Black-Scholes values at a flat volatility")
+        self.fill_option_chain()
+    
+    def fill_option_chain(self):
+        chain = self.option_chain
+        index = self.chain_expiry.currentIndex()
+        if chain is None or index < 0:
+            return
+        calls, puts = chain.expiry(index)
+        strikes = chain.strikes
+        atm = int(np.argmin(np.abs(strikes - chain.spot)))
+        strike_column = len(CHAIN_FIELDS)
+        
+        table = self.chain_table
+        table.setUpdatesEnabled(False)
+        table.setRowCount(len(strikes))
+        for column, (field, _, spec) in enumerate(CHAIN_FIELDS):
+            put_column = 2 * strike_column - column
+            for col, values in ((column, calls[field]), (put_column, puts[field])):
+                for row, value in enumerate(values.tolist()):
+                    item = QTableWidgetItem(metric_text(value, spec))
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    table.setItem(row, col, item)
+        for row, strike in enumerate(strikes.tolist()):
+            item = QTableWidgetItem(f"{strike:,g}")
+            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            item.setFont(QFont("Arial", 10, QFont.Weight.Bold))
+            table.setItem(row, strike_column, item)
+            
+            # In-the-money halves shaded, at-the-money row highlighted
+            for col in range(table.columnCount()):
+                in_the_money = (col < strike_column and strike < chain.spot) or \
+                               (col > strike_column and strike > chain.spot)
+                color = ATM_COLOR if row == atm else ITM_COLOR if in_the_money else None
+                if color:
+                    table.item(row, col).setBackground(QColor(color))
+        table.setUpdatesEnabled(True)
+    
+    def center_option_chain(self):
+        chain = self.option_chain
+
+        if chain is not None and self.chain_table.rowCount():
+            atm = int(np.argmin(np.abs(chain.strikes - chain.spot)))
+            # Lay the rows out now; scrolling is lost to a pending layout
+            self.chain_table.doItemsLayout()
+            self.chain_table.scrollToItem(self.chain_table.item(atm, len(CHAIN_FIELDS)),
+                                          QAbstractItemView.ScrollHint.PositionAtCenter)
+    
+    def create_greeks_tab(self):
+        greeks_tab = QWidget()
+        layout = QHBoxLayout()
+        
+        inputs = QFormLayout()
+        self.calc_type = QComboBox()
+        self.calc_type.addItems(["CE", "PE"])
+        self.calc_spot = QDoubleSpinBox()
+        self.calc_strike = QDoubleSpinBox()
+        self.calc_premium = QDoubleSpinBox()
+        for control in (self.calc_spot, self.calc_strike, self.calc_premium):
+            control.setRange(0, 10_000_000)
+            control.setDecimals(2)
+        self.calc_spot.setValue(100)
+        self.calc_strike.setValue(100)
+        self.calc_premium.setSpecialValueText("—")
+        self.calc_days = QDoubleSpinBox()
+        self.calc_days.setRange(0, 3650)
+        self.calc_days.setValue(30)
+        self.calc_vol = QDoubleSpinBox()
+        self.calc_vol.setRange(1, 300)
+        self.calc_vol.setValue(20)
+        self.calc_vol.setSuffix(" %")
+        self.calc_rate = QDoubleSpinBox()
+        self.calc_rate.setRange(0, 30)
+        self.calc_rate.setValue(options.RISK_FREE_RATE * 100)
+        self.calc_rate.setSuffix(" %")
+        
+        inputs.addRow("Option Type:", self.calc_type)
+        inputs.addRow("Spot Price:", self.calc_spot)
+        inputs.addRow("Strike Price:", self.calc_strike)
+        inputs.addRow("Days to Expiry:", self.calc_days)
+        inputs.addRow("Volatility:", self.calc_vol)
+        inputs.addRow("Interest Rate:", self.calc_rate)
+        inputs.addRow("Market Premium:", self.calc_premium)
+        layout.addLayout(inputs)
+        
+        results = QFormLayout()
+        self.calc_results = {}
+        for name in ("Price", "Delta", "Gamma", "Theta / day", "Vega / 1%", "Rho / 1%", "Implied Volatility"):
+            label = QLabel("—")
+            label.setStyleSheet("font-size: 16px; font-weight: bold;")
+            results.addRow(f"{name}:", label)
+            self.calc_results[name] = label
+        layout.addLayout(results)
+        
+        greeks_tab.setLayout(layout)
+        
+        self.calc_type.currentIndexChanged.connect(self.update_greeks_calculator)
+        for control in (self.calc_spot, self.calc_strike, self.calc_days, self.calc_vol, self.calc_rate,
+                        self.calc_premium):
+            control.valueChanged.connect(self.update_greeks_calculator)
+        self.update_greeks_calculator()
+        return greeks_tab
+    
+    def update_greeks_calculator(self):
+        spot, strike = self.calc_spot.value(), self.calc_strike.value()
+        if spot <= 0 or strike <= 0:
+            return
+        call = self.calc_type.currentText() == "CE"
+        years = self.calc_days.value() / options.DAYS_PER_YEAR
+        rate = self.calc_rate.value() / 100
+        values = {name: float(value) for name, value in
+                  options.greeks(spot, strike, years, self.calc_vol.value() / 100, call, rate).items()}
+        premium = self.calc_premium.value()
+        iv = float(options.implied_vol(premium, spot, strike, years, call, rate)) if premium > 0 else math.nan
+        
+        texts = {
+            "Price": metric_text(values['price'], ",.2f", "₹"),
+            "Delta": metric_text(values['delta'], ".4f"),
+            "Gamma": metric_text(values['gamma'], ".6f"),
+            "Theta / day": metric_text(values['theta'], ",.2f", "₹"),
+            "Vega / 1%": metric_text(values['vega'], ",.2f", "₹"),
+            "Rho / 1%": metric_text(values['rho'], ",.2f", "₹"),
+            "Implied Volatility": metric_text(iv, ".2%"),
+        }
+        for name, text in texts.items():
+            self.calc_results[name].setText(text)
+    
+    def create_strategy_tab(self):
+        strategy_tab = QWidget()
+        layout = QVBoxLayout()
+        
+        controls = QHBoxLayout()
+        self.strategy_source = QComboBox()
+        self.strategy_source.addItems([OPEN_POSITIONS] + list(payoff.STRATEGIES))
+        self.strategy_underlying = QComboBox()
+        self.open_option_legs = payoff.open_legs(self.db, self.user_id)
+        self.strategy_underlying.addItems(list(self.open_option_legs) +
+                                          [s for s in CHART_SYMBOLS if s not in self.open_option_legs])
+        self.strategy_spot = QDoubleSpinBox()
+        self.strategy_spot.setRange(0.05, 10_000_000)
+        self.strategy_vol = QDoubleSpinBox()
+        self.strategy_vol.setRange(1, 300)
+        self.strategy_vol.setValue(15)
+        self.strategy_vol.setSuffix(" %")
+        self.strategy_expiry = QComboBox()
+        self.strategy_expiry.addItems([expiry.strftime("%d %b %Y")
+                                       for expiry in options.expiry_dates(OPTION_EXPIRIES)])
+        self.strategy_lot = QSpinBox()
+        self.strategy_lot.setRange(1, 100_000)
+        self.strategy_lot.setValue(OPTION_LOT_SIZE)
+        for label, control in (("Strategy:", self.strategy_source), ("Underlying:", self.strategy_underlying),
+                               ("Spot:", self.strategy_spot), ("Volatility:", self.strategy_vol),
+                               ("Expiry:", self.strategy_expiry), ("Lot Size:", self.strategy_lot)):
+            controls.addWidget(QLabel(label))
+            controls.addWidget(control)
+        controls.addStretch()
+        layout.addLayout(controls)
+        
+        body = QHBoxLayout()
+        legs_layout = QVBoxLayout()
+        self.legs_table = QTableWidget()
+        self.legs_table.setColumnCount(5)
+        self.legs_table.setHorizontalHeaderLabels(["Type", "Strike", "Expiry", "Qty", "Premium"])
+        self.legs_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.legs_table.verticalHeader().setVisible(False)
+        self.legs_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.legs_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        legs_layout.addWidget(self.legs_table)
+        
+        # Ad-hoc legs: a premium of 0 means the theoretical price
+        add_row = QHBoxLayout()
+        self.leg_type = QComboBox()
+        self.leg_type.addItems(["CE", "PE", UNDERLYING_LEG])
+        self.leg_strike = QDoubleSpinBox()
+        self.leg_strike.setRange(0, 10_000_000)
+        self.leg_strike.setSpecialValueText("ATM")
+        self.leg_quantity = QSpinBox()
+        self.leg_quantity.setRange(-1_000_000, 1_000_000)
+        self.leg_quantity.setValue(OPTION_LOT_SIZE)
+        self.leg_premium = QDoubleSpinBox()
+        self.leg_premium.setRange(0, 10_000_000)
+        self.leg_premium.setSpecialValueText("Theoretical")
+        add_leg = QPushButton("Add Leg")
+        add_leg.clicked.connect(self.add_strategy_leg)
+        remove_leg = QPushButton("Remove Leg")
+        remove_leg.clicked.connect(self.remove_strategy_leg)
+        for control in (self.leg_type, self.leg_strike, self.leg_quantity, self.leg_premium, add_leg, remove_leg):
+            add_row.addWidget(control)
+        legs_layout.addLayout(add_row)
+        
+        summary = QGridLayout()
+        self.strategy_labels = {}
+        for i, name in enumerate(STRATEGY_FIGURES):
+            title_label = QLabel(name)
+            title_label.setStyleSheet("color: #BDC3C7;")
+            value_label = QLabel("—")
+            value_label.setStyleSheet("font-weight: bold;")
+            summary.addWidget(title_label, i // 2, (i % 2) * 2)
+            summary.addWidget(value_label, i // 2, (i % 2) * 2 + 1)
+            self.strategy_labels[name] = value_label
+        legs_layout.addLayout(summary)
+        body.addLayout(legs_layout, 2)
+        
+        # P&L graph: at expiry, and as of the sliders' date and volatility
+        graph_layout = QVBoxLayout()
+        self.payoff_pane = ChartPane("P&L", dates=False)
+        self.payoff_pane.chart().legend().setVisible(True)
+        self.zero_line = self.payoff_pane.line("#7F8C8D", 1, style=Qt.PenStyle.DashLine)
+        self.spot_line = self.payoff_pane.line("#F39C12", 1, style=Qt.PenStyle.DotLine)
+        self.expiry_line = self.payoff_pane.line("#95A5A6", 2, "At expiry")
+        self.pnl_line = self.payoff_pane.line("#3498DB", 2, "Theoretical")
+        graph_layout.addWidget(self.payoff_pane)
+        
+        sliders = QGridLayout()
+        self.time_slider = QSlider(Qt.Orientation.Horizontal)
+        self.time_slider.setRange(0, payoff.TIME_POINTS - 1)
+        self.vol_slider = QSlider(Qt.Orientation.Horizontal)
+        self.vol_slider.setRange(0, payoff.VOL_POINTS - 1)
+        self.vol_slider.setValue(payoff.VOL_POINTS // 2)
+        self.time_label = QLabel()
+        self.vol_label = QLabel()
+        for row, (name, slider, label) in enumerate((("Date:", self.time_slider, self.time_label),
+                                                     ("Volatility:", self.vol_slider, self.vol_label))):
+            sliders.addWidget(QLabel(name), row, 0)
+            sliders.addWidget(slider, row, 1)
+            sliders.addWidget(label, row, 2)
+        graph_layout.addLayout(sliders)
+        body.addLayout(graph_layout, 3)
+        layout.addLayout(body)
+        
+        strategy_tab.setLayout(layout)
+        
+        self.strategy_legs = []
+        self.strategy = None
+        self.strategy_surface = None
+        self.strategy_source.currentIndexChanged.connect(self.load_strategy_legs)
+        self.strategy_underlying.currentIndexChanged.connect(self.on_strategy_underlying_changed)
+        self.strategy_expiry.currentIndexChanged.connect(self.load_strategy_legs)
+        self.strategy_lot.valueChanged.connect(self.load_strategy_legs)
+        self.strategy_spot.valueChanged.connect(self.update_strategy)
+        self.strategy_vol.valueChanged.connect(self.update_strategy)
+        # Sliders only pick a slice of the computed surface
+        self.time_slider.valueChanged.connect(self.plot_strategy)
+        self.vol_slider.valueChanged.connect(self.plot_strategy)
+        return strategy_tab
+    
+    def on_strategy_underlying_changed(self):
+        symbol = self.strategy_underlying.currentText()
+        spot = self.underlying_price(ticker_for(symbol))
+        legs = self.open_option_legs.get(symbol, [])
+        if spot is None and legs:
+            # No price for it: start from the middle of its strikes
+            spot = float(np.mean([leg.strike for leg in legs]))
+        self.strategy_spot.blockSignals(True)
+        self.strategy_spot.setValue(spot if spot is not None else self.strategy_spot.value())
+        self.strategy_spot.blockSignals(False)
+        self.load_strategy_legs()
+    
+    def load_strategy_legs(self):
+        source = self.strategy_source.currentText()
+        if source == OPEN_POSITIONS:
+            self.strategy_legs = list(self.open_option_legs.get(self.strategy_underlying.currentText(), []))
+        else:
+            spot = self.strategy_spot.value()
+            expiry = options.expiry_dates(OPTION_EXPIRIES)[max(self.strategy_expiry.currentIndex(), 0)]
+            self.strategy_legs = payoff.template_legs(source, spot, options.strike_step(spot), expiry,
+                                                      self.strategy_vol.value() / 100,
+                                                      self.strategy_lot.value())
+        self.update_strategy()
+    
+    def add_strategy_leg(self):
+        spot = self.strategy_spot.value()
+        option_type = self.leg_type.currentText()
+        quantity = self.leg_quantity.value()
+        if not quantity:
+            return
+        if option_type == UNDERLYING_LEG:
+            leg = payoff.Leg(None, 0.0, None, quantity, self.leg_premium.value() or spot)
+        else:
+            expiry = options.expiry_dates(OPTION_EXPIRIES)[max(self.strategy_expiry.currentIndex(), 0)]
+            strike = self.leg_strike.value() or round(spot / options.strike_step(spot)) * options.strike_step(spot)
+            premium = self.leg_premium.value() or round(float(options.price(
+                spot, strike, options.years_to_expiry(expiry)[0], self.strategy_vol.value() / 100,
+                option_type == "CE")), 2)
+            leg = payoff.Leg(option_type, strike, expiry, quantity, premium)
+        self.strategy_legs.append(leg)
+        self.update_strategy()
+    
+    def remove_strategy_leg(self):
+        rows = sorted({index.row() for index in self.legs_table.selectedIndexes()}, reverse=True)
+        for row in rows or [len(self.strategy_legs) - 1]:
+            if 0 <= row < len(self.strategy_legs):
+                del self.strategy_legs[row]
+        self.update_strategy()
+    
+    def update_strategy(self):
+        self.fill_strategy_legs()
+        spot, vol = self.strategy_spot.value(), self.strategy_vol.value() / 100
+        if not self.strategy_legs:
+            self.strategy = self.strategy_surface = None
+            for label in self.strategy_labels.values():
+                label.setText("—")
+            for series in (self.expiry_line, self.pnl_line, self.spot_line, self.zero_line):
+                series.clear()
+            return
+        
+        # The whole price x date x volatility surface in one evaluation
+        self.strategy = payoff.Strategy(self.strategy_legs)
+        self.strategy_surface = self.strategy.surface(spot, vol)
+        breakevens, best, worst = self.strategy.expiry_profile(vol)
+        greeks = self.strategy.greeks(spot, vol)
+        figures = {
+            "Net Premium": metric_text(self.strategy.net_premium, ",.2f", "₹"),
+            "Breakevens": ", ".join(f"{price:,.2f}" for price in breakevens) or "—",
+            "Max Profit": "Unlimited" if best == math.inf else metric_text(best, ",.2f", "₹"),
+            "Max Loss": "Unlimited" if worst == -math.inf else metric_text(worst, ",.2f", "₹"),
+            "P&L Now": metric_text(greeks['pnl'], ",.2f", "₹"),
+            "Delta": metric_text(greeks['delta'], ",.2f"),
+            "Gamma": metric_text(greeks['gamma'], ",.4f"),
+            "Theta / day": metric_text(greeks['theta'], ",.2f", "₹"),
+            "Vega / 1%": metric_text(greeks['vega'], ",.2f", "₹"),
+            "Rho / 1%": metric_text(greeks['rho'], ",.2f", "₹"),
+        }
+        for name, text in figures.items():
+            self.strategy_labels[name].setText(text)
+        
+        surface = self.strategy_surface
+        low, high = surface.prices[0], surface.prices[-1]
+        self.zero_line.replace([QPointF(low, 0), QPointF(high, 0)])
+        self.payoff_pane.set_x(low, high)
+        self.plot_strategy()
+    
+    def fill_strategy_legs(self):
+        self.legs_table.setRowCount(len(self.strategy_legs))
+        for row, leg in enumerate(self.strategy_legs):
+            expiry = str(leg.expiry)[:10] if leg.expiry is not None else ""
+            values = (leg.option_type or UNDERLYING_LEG, f"{leg.strike:,g}" if leg.option_type else "",
+                      expiry, f"{leg.quantity:+,g}", f"{leg.premium:,.2f}")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 3:
+                    item.setForeground(QColor(PROFIT_COLOR if leg.quantity > 0 else LOSS_COLOR))
+                self.legs_table.setItem(row, column, item)
+    
+    def plot_strategy(self):
+        surface = self.strategy_surface
+        if surface is None:
+            return
+        time_index, vol_index = self.time_slider.value(), self.vol_slider.value()
+        self.time_label.setText(f"+{surface.elapsed[time_index] * options.DAYS_PER_YEAR:.1f} days")
+        self.vol_label.setText(f"{surface.vols[vol_index]:.1%}")
+        
+        # The last date of the surface is the nearest expiry
+        curve, expiry = surface.curve(time_index, vol_index), surface.curve(-1, vol_index)
+        self.pnl_line.replace(points(surface.prices, curve))
+        self.expiry_line.replace(points(surface.prices, expiry))
+        low, high = padded(min(curve.min(), expiry.min(), 0.0), max(curve.max(), expiry.max(), 0.0))
+        self.payoff_pane.set_y(low, high)
+        spot = self.strategy_spot.value()
+        self.spot_line.replace([QPointF(spot, low), QPointF(spot, high)])
     
     def show_analytics(self):
         self.clear_content()
@@ -1099,16 +2128,113 @@ class MainWindow(QMainWindow):
         title.setStyleSheet("font-size: 24px; font-weight: bold; color: #2E86C1;")
         layout.addWidget(title)
         
-        # Analytics content would go here
-        placeholder = QLabel("Advanced Analytics\n\n"
-                           "• Performance Metrics\n• Risk Analysis\n• Trade Statistics\n• Portfolio Health")
-        placeholder.setStyleSheet("font-size: 16px; color: #7F8C8D;")
-        placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(placeholder)
+        self.analytics_status = QLabel("Loading analytics...")
+        self.analytics_status.setStyleSheet("color: #7F8C8D;")
+        layout.addWidget(self.analytics_status)
+        
+        # Metric cards, filled in when the report arrives
+        cards = QGridLayout()
+        self.analytics_cards = {}
+        for i, name in enumerate(ANALYTICS_CARDS):
+            card = QWidget()
+            card.setStyleSheet("background-color: #2C3E50; border-radius: 8px;")
+            card_layout = QVBoxLayout()
+            title_label = QLabel(name)
+            title_label.setStyleSheet("color: #BDC3C7; font-size: 12px;")
+            value_label = QLabel("—")
+            value_label.setStyleSheet("color: white; font-size: 18px; font-weight: bold;")
+            card_layout.addWidget(title_label)
+            card_layout.addWidget(value_label)
+            card.setLayout(card_layout)
+            cards.addWidget(card, i // 4, i % 4)
+            self.analytics_cards[name] = value_label
+        layout.addLayout(cards)
+        
+        self.equity_pane = ChartPane("Equity Curve")
+        self.equity_pane.x_axis.setFormat("dd MMM yyyy")
+        self.equity_line = self.equity_pane.line(PROFIT_COLOR, 2)
+        layout.addWidget(self.equity_pane, 2)
+        
+        # Breakdowns by strategy and by symbol
+        tabs = QTabWidget()
+        self.analytics_tables = {}
+        for name in ("By Strategy", "By Symbol"):
+            table = QTableWidget()
+            table.setColumnCount(len(BREAKDOWN_COLUMNS))
+            table.setHorizontalHeaderLabels([header for header, _, _ in BREAKDOWN_COLUMNS])
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            tabs.addTab(table, name)
+            self.analytics_tables[name] = table
+        layout.addWidget(tabs, 2)
         
         widget.setLayout(layout)
         self.content_area.addWidget(widget)
         self.content_area.setCurrentWidget(widget)
+        
+        self.analytics_worker.request(self.user_id)
+    
+    def on_analytics_progress(self, percent, message):
+        self.analytics_status.setText(message)
+    
+    def on_analytics_failed(self, error):
+        self.analytics_status.setText(f"Analytics failed: {error}")
+    
+    def on_analytics_ready(self, report):
+        overall = report.overall
+        self.analytics_status.setText(
+            f"{overall.trades:,} closed trades over {overall.days:,} trading days")
+        values = {
+            "Net P&L": f"₹{overall.net_pnl:,.0f}",
+            "Win Rate": metric_text(overall.win_rate, ".1%"),
+            "Expectancy": metric_text(overall.expectancy, ",.2f", "₹"),
+            "Profit Factor": metric_text(overall.profit_factor, ".2f"),
+            "Max Drawdown": f"₹{overall.max_drawdown:,.0f}",
+            "Longest Drawdown": f"{overall.drawdown_days:,.0f} days / {overall.drawdown_trades:,} trades",
+            "Sharpe": metric_text(overall.sharpe, ".2f"),
+            "Sortino": metric_text(overall.sortino, ".2f"),
+            "Best Win Streak": str(overall.longest_win_streak),
+            "Worst Loss Streak": str(overall.longest_loss_streak),
+            "Current Streak": (f"{abs(overall.current_streak)} "
+                               f"{'wins' if overall.current_streak > 0 else 'losses'}"
+                               if overall.current_streak else "—"),
+            "Avg Win / Loss": f"₹{overall.avg_win:,.0f} / ₹{overall.avg_loss:,.0f}",
+        }
+        for name, text in values.items():
+            self.analytics_cards[name].setText(text)
+        self.analytics_cards["Net P&L"].setStyleSheet(
+            f"color: {PROFIT_COLOR if overall.net_pnl >= 0 else LOSS_COLOR}; "
+            "font-size: 18px; font-weight: bold;")
+        
+        self.plot_equity(report)
+        for name, groups in (("By Strategy", report.by_strategy), ("By Symbol", report.by_symbol)):
+            self.fill_breakdown(self.analytics_tables[name], groups)
+    
+    def plot_equity(self, report):
+        if not len(report.time):
+            self.equity_line.clear()
+            return
+        x = time_ms(pd.to_datetime(report.time, unit='s'))
+        # Decimated to the pane's width; the pyramid keeps every extreme
+        pyramid = lod.LinePyramid(report.equity)
+        level = lod.level_for(len(x), self.equity_pane.width())
+        keep = pyramid.points(0, len(x), level)
+        self.equity_line.replace(points(x[keep], report.equity[keep]))
+        self.equity_pane.set_x(x[0], x[-1] if x[-1] > x[0] else x[0] + 86_400_000)
+        self.equity_pane.set_y(*padded(min(report.equity.min(), 0.0), max(report.equity.max(), 0.0)))
+    
+    def fill_breakdown(self, table, groups):
+        rows = sorted(groups.items(), key=lambda item: item[1].net_pnl, reverse=True)
+        table.setRowCount(len(rows))
+        for row, (name, performance) in enumerate(rows):
+            table.setItem(row, 0, QTableWidgetItem(name))
+            for column, (_, field, spec) in enumerate(BREAKDOWN_COLUMNS[1:], start=1):
+                value = getattr(performance, field)
+                item = QTableWidgetItem(metric_text(value, spec))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if field == 'net_pnl' and value:
+                    item.setForeground(QColor(PROFIT_COLOR if value > 0 else LOSS_COLOR))
+                table.setItem(row, column, item)
     
     def show_settings(self):
         self.clear_content()
@@ -1137,10 +2263,15 @@ class MainWindow(QMainWindow):
         alert_check = QCheckBox("Enable Trade Alerts")
         alert_check.setChecked(True)
         
+        simulated_check = QCheckBox("Simulated live prices (testing)")
+        simulated_check.setChecked(self.tick_feed is not None)
+        simulated_check.toggled.connect(self.set_simulated_feed)
+        
         form.addRow("API Key:", api_key)
         form.addRow("API Secret:", api_secret)
         form.addRow("Theme:", theme_combo)
         form.addRow("", alert_check)
+        form.addRow("", simulated_check)
         
         layout.addLayout(form)
         
@@ -1153,6 +2284,23 @@ class MainWindow(QMainWindow):
         self.content_area.addWidget(widget)
         self.content_area.setCurrentWidget(widget)
     
+    def set_simulated_feed(self, enabled):
+        if self.tick_feed is not None:
+            self.tick_feed.stop()
+            self.tick_feed = None
+        if not enabled:
+            return
+        
+        # Random walks from the last cached price of the watchlist and chart symbols
+        rows = self.db.execute_query("SELECT symbol FROM watchlist WHERE user_id = ?", (self.user_id,))
+        tickers = {ticker_for(symbol) for symbol, in rows} | {ticker_for(s) for s in CHART_SYMBOLS}
+        prices = {}
+        for ticker in sorted(tickers):
+            quote = self.quote_fetcher.quote(ticker)
+            prices[ticker] = quote.ltp if quote is not None else 100.0
+        self.tick_feed = SimulatedFeed(self.tick_hub, prices)
+        self.tick_feed.start()
+    
     def show_education(self):
         self.clear_content()
         
@@ -1196,6 +2344,14 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Education", f"Opening lesson: {topic}")
     
     def clear_content(self):
+        # Results for a page that is going away have nowhere to go
+        self.market_worker.cancel()
+        self.quote_worker.cancel()
+        self.indicator_worker.cancel()
+        self.screener_worker.cancel()
+        self.analytics_worker.cancel()
+        self.watchlist_model = None
+        
         # Remove all widgets from content area
         while self.content_area.count():
             widget = self.content_area.widget(0)
@@ -1206,6 +2362,16 @@ class MainWindow(QMainWindow):
     def load_dashboard(self):
         self.show_dashboard()
     
+    def closeEvent(self, event):
+        self.quote_worker.cancel()
+        self.quote_fetcher.close()
+        self.screener.close()
+        self.export_worker.cancel()
+        self.import_worker.cancel()
+        if self.tick_feed is not None:
+            self.tick_feed.stop()
+        super().closeEvent(event)
+    
     def get_main_style(self):
         return """
             QMainWindow {
@@ -1214,16 +2380,16 @@ class MainWindow(QMainWindow):
             QLabel {
                 color: #ECF0F1;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #2C3E50;
                 color: #ECF0F1;
                 gridline-color: #34495E;
                 border: 1px solid #34495E;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #2E86C1;
             }
             QHeaderView::section {
@@ -0,0 +1,372 @@
+"""
+SR TRADE - Market Data
+Data providers and the incremental downloader that feeds the bar store.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from bar_store import Bars
+
+# Display names that differ from the data source ticker
+TICKERS = {
+    "NIFTY50": "^NSEI",
+}
+
+DEFAULT_PERIOD = "1mo"
+
+
+def ticker_for(symbol):
+    return TICKERS.get(symbol, symbol)
+
+
+# ============================================
+# PROVIDERS
+# ============================================
+class MarketDataProvider:
+    """
+    Source of OHLCV history.
+
+    fetch() returns a DataFrame indexed by bar time with Open/High/Low/
+    Close/Volume columns. Either `start` (inclusive) or `period` is given.
+    """
+
+    def fetch(self, symbol, interval, start=None, period=DEFAULT_PERIOD):
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    def __init__(self, session=None):
+        self.session = session
+
+    @classmethod
+    def pooled(cls, max_connections=8):
+        """A provider whose requests share one keep-alive HTTP connection pool."""
+        import requests
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return cls(session=session)
+
+    def fetch(self, symbol, interval, start=None, period=DEFAULT_PERIOD):
+        import yfinance as yf
+
+        # Concurrency is ours to manage, so yfinance's own threads stay off
+        kwargs = dict(interval=interval, progress=False, threads=False, session=self.session)
+        if start is not None:
+            return yf.download(symbol, start=start, **kwargs)
+        return yf.download(symbol, period=period, **kwargs)
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    In-memory provider for tests and offline use.
+
+    Serves frames registered with add(); every fetch is logged in `calls`
+    so tests can check how much history was requested.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.frames = {}
+        self.calls = []
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def add(self, symbol, interval, df):
+        self.frames[(symbol, interval)] = df.sort_index()
+
+    def fail(self, symbol, times=1):
+        """Make the next `times` fetches of symbol raise ConnectionError."""
+        self.failures[symbol] = times
+
+    def fetch(self, symbol, interval, start=None, period=DEFAULT_PERIOD):
+        with self._lock:
+            self.calls.append((symbol, interval, start, period))
+            failing = self.failures.get(symbol, 0)
+            if failing:
+                self.failures[symbol] = failing - 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise ConnectionError(f"simulated failure for {symbol}")
+
+        df = self.frames.get((symbol, interval))
+        if df is None:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        return df
+
+    @staticmethod
+    def random_walk(periods, freq='D', end=None, start_price=100.0, seed=0):
+        """Generate a plausible OHLCV frame ending at `end` (default: now)."""
+        rng = np.random.default_rng(seed)
+        index = pd.date_range(end=end or datetime.now(), periods=periods, freq=freq)
+        close = start_price + np.cumsum(rng.standard_normal(periods))
+        open_ = close + rng.standard_normal(periods) * 0.5
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + rng.random(periods),
+            'Low': np.minimum(open_, close) - rng.random(periods),
+            'Close': close,
+            'Volume': rng.integers(100000, 1000000, periods).astype(float),
+        }, index=index)
+
+
+# ============================================
+# INCREMENTAL DOWNLOADER
+# ============================================
+class MarketDataDownloader:
+    """
+    Keeps the bar store current by fetching only what is missing.
+
+    The first download of a symbol/interval pulls `period` of history.
+    After that each refresh asks the provider for bars from the last
+    cached bar onward; the last bar is fetched again because it may have
+    been still forming when it was stored. Bars are merged by timestamp,
+    so the overlap is deduplicated rather than appended twice.
+    """
+
+    def __init__(self, bar_store, provider=None):
+        self.bar_store = bar_store
+        self.db = bar_store.db
+        self.provider = provider or YFinanceProvider.pooled()
+        self.init_tables()
+
+    def init_tables(self):
+        self.db.execute_query('''
+            CREATE TABLE IF NOT EXISTS download_watermarks (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                last_bar_ts INTEGER,
+                last_fetch_at TIMESTAMP,
+                bars_fetched INTEGER DEFAULT 0,
+                PRIMARY KEY (symbol, interval)
+            )
+        ''')
+
+    def watermark(self, symbol, interval):
+        """Return (last_bar_ts, last_fetch_at) or None if never downloaded."""
+        result = self.db.execute_query(
+            "SELECT last_bar_ts, last_fetch_at FROM download_watermarks "
+            "WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        )
+        return result[0] if result else None
+
+    def refresh(self, symbol, interval, period=DEFAULT_PERIOD, token=None):
+        """
+        Bring symbol/interval up to date; returns the number of new bars.
+
+        `token` (a workers.CancelToken) is checked between the download and
+        the cache write so a cancelled refresh leaves the store untouched.
+        """
+        last = self.bar_store.last_timestamp(symbol, interval)
+        bars = self.fetch_missing(symbol, interval, last, period)
+        if token is not None:
+            token.check()
+        self.store(symbol, interval, bars)
+        if last is None:
+            return len(bars)
+        return int(np.count_nonzero(bars.time > last))
+
+    def fetch_missing(self, symbol, interval, last, period=DEFAULT_PERIOD):
+        """Fetch bars from `last` (ns timestamp) onward, or `period` if None."""
+        if last is None:
+            df = self.provider.fetch(symbol, interval, period=period)
+        else:
+            df = self.provider.fetch(symbol, interval, start=pd.Timestamp(last))
+        if df is None or df.empty:
+            return Bars.empty()
+
+        bars = Bars.from_frame(df)
+        if last is not None:
+            # Providers round `start` to whole days; drop what we already have
+            bars = bars[bars.time >= last]
+        return bars
+
+    def store(self, symbol, interval, bars):
+        with self.db.transaction():
+            self.bar_store.write(symbol, interval, bars)
+            last = self.bar_store.last_timestamp(symbol, interval)
+            self.db.execute_query('''
+                INSERT INTO download_watermarks
+                    (symbol, interval, last_bar_ts, last_fetch_at, bars_fetched)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?)
+                ON CONFLICT (symbol, interval) DO UPDATE SET
+                    last_bar_ts = excluded.last_bar_ts,
+                    last_fetch_at = excluded.last_fetch_at,
+                    bars_fetched = bars_fetched + excluded.bars_fetched
+            ''', (symbol, interval, last, len(bars)))
+
+
+# ============================================
+# BATCH FETCH
+# ============================================
+class Quote(NamedTuple):
+    symbol: str
+    ltp: float
+    change_pct: float
+    time: int
+
+
+def pause(seconds, token=None):
+    """Sleep, waking early and raising Cancelled if `token` is cancelled."""
+    if token is None:
+        time.sleep(seconds)
+    elif token.wait(seconds):
+        token.check()
+
+
+class RateLimiter:
+    """Token bucket shared by all fetch threads: `rate` calls/s, bursts of `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, token=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            pause(delay, token)
+
+
+class RetryBudget:
+    """A fixed number of retries shared by every symbol in one batch."""
+
+    def __init__(self, retries):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class BatchFetcher:
+    """
+    Refreshes history and quotes for many symbols at once.
+
+    Up to `max_workers` symbols are in flight, every provider call goes
+    through one RateLimiter, and failed calls are retried with backoff
+    while the batch's retry budget lasts (by default a quarter of the
+    batch size, at least 2), up to `max_retries` per symbol. Each symbol
+    is written to the bar store as soon as it arrives and reported
+    through `on_result`.
+
+    The fetch threads are started on the first batch and kept for the
+    next ones until close().
+    """
+
+    def __init__(self, downloader, max_workers=8, rate=5.0, retry_budget=None,
+                 max_retries=3, backoff=0.5):
+        self.downloader = downloader
+        self.bar_store = downloader.bar_store
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+        self.retry_budget = retry_budget
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool = None
+        self._pool_lock = threading.Lock()
+
+    def get_pool(self):
+        with self._pool_lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix="fetch")
+            return self.pool
+
+    def close(self):
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+
+    def fetch(self, symbols, interval='1d', on_result=None, on_error=None, token=None):
+        """Fetch every symbol; returns {symbol: Quote} for those that succeeded."""
+        symbols = list(dict.fromkeys(symbols))
+        budget = RetryBudget(
+            self.retry_budget if self.retry_budget is not None else max(2, len(symbols) // 4)
+        )
+        quotes = {}
+
+        pool = self.get_pool()
+        futures = {}
+        try:
+            for symbol in symbols:
+                futures[pool.submit(self.fetch_one, symbol, interval, budget, token)] = symbol
+            for future in as_completed(futures):
+                if token is not None and token.cancelled:
+                    break
+                symbol = futures[future]
+                try:
+                    quote = future.result()
+                except Exception as e:
+                    if on_error is not None:
+                        on_error(symbol, e)
+                    continue
+                quotes[symbol] = quote
+                if on_result is not None and quote is not None:
+                    on_result(quote)
+        finally:
+            # Drop this batch's queued symbols and let its running ones stop
+            for future in futures:
+                future.cancel()
+            wait(futures)
+        return quotes
+
+    def fetch_one(self, symbol, interval, budget, token=None):
+        attempt = 0
+        while True:
+            if token is not None:
+                token.check()
+            self.limiter.acquire(token)
+            try:
+                self.downloader.refresh(symbol, interval, token=token)
+                return self.quote(symbol, interval)
+            except Exception:
+                if token is not None and token.cancelled:
+                    raise
+                if attempt >= self.max_retries or not budget.take():
+                    raise
+            pause(self.backoff * 2 ** attempt, token)
+            attempt += 1
+
+    def quote(self, symbol, interval='1d'):
+        """Last price and change vs the previous bar, from the bar store."""
+        bars = self.bar_store.tail(symbol, interval, 2)
+        if not len(bars):
+            return None
+        ltp = float(bars.close[-1])
+        change = (ltp / bars.close[0] - 1) * 100 if len(bars) > 1 else 0.0
+        return Quote(symbol, ltp, float(change), int(bars.time[-1]))
+
+    def fetch_watchlist(self, user_id, interval='1d', **kwargs):
+        rows = self.bar_store.db.execute_query(
+            "SELECT symbol FROM watchlist WHERE user_id = ? ORDER BY symbol", (user_id,)
+        )
+        return self.fetch([ticker_for(symbol) for symbol, in rows], interval, **kwargs)
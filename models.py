@@ -0,0 +1,423 @@
+"""
+SR TRADE - Table Models
+Qt item models that keep their rows in numpy columns instead of one
+QTableWidgetItem per cell.
+
+Views ask a model only for the cells they paint, so the cost of a repaint
+depends on the visible rows, not on how many rows are loaded.
+"""
+import numpy as np
+from PyQt6.QtCore import QAbstractTableModel, QEvent, QModelIndex, QRect, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QPalette
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+from database import TRADES_PAGE_SIZE
+from lod import Columns
+from market_data import ticker_for
+
+PROFIT_COLOR = "#27AE60"
+LOSS_COLOR = "#E74C3C"
+
+# Live cells are repainted at most this often, however fast quotes arrive
+REFRESH_INTERVAL_MS = 100
+
+
+class TextCodes:
+    """A text column stored as int32 codes into a list of distinct values."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, texts):
+        codes = np.empty(len(texts), dtype=np.int32)
+        for i, text in enumerate(texts):
+            code = self.codes.get(text)
+            if code is None:
+                code = self.codes[text] = len(self.values)
+                self.values.append(text)
+            codes[i] = code
+        return codes
+
+    def decode(self, code):
+        return self.values[code]
+
+
+# ============================================
+# TRADE JOURNAL
+# ============================================
+class TradeTableModel(QAbstractTableModel):
+    """
+    A user's trades, newest first, fetched from SQLite a page at a time.
+
+    The view calls canFetchMore()/fetchMore() as it scrolls near the end
+    of the loaded rows; each page is one keyset query
+    (DatabaseManager.get_trades_page) appended to the columns. Text
+    columns are interned, numbers are float64 with NaN for NULL.
+    `filters` are get_trades_page's status/since/search arguments. Search
+    text is looked up once per reload (DatabaseManager.search_trades) and
+    every page is read from that lookup.
+    """
+
+    # (header, index in a trades row, kind)
+    COLUMNS = (
+        ("ID", 0, 'int'),
+        ("Symbol", 2, 'text'),
+        ("Type", 3, 'text'),
+        ("Qty", 4, 'int'),
+        ("Entry", 5, 'price'),
+        ("Exit", 6, 'price'),
+        ("SL", 7, 'price'),
+        ("Target", 8, 'price'),
+        ("Status", 16, 'text'),
+        ("P&L", 17, 'price'),
+    )
+    PNL_COLUMN = 9
+
+    DTYPES = {'int': np.int64, 'text': np.int32, 'price': np.float64}
+
+    def __init__(self, db, user_id, page_size=TRADES_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.page_size = page_size
+        self.filters = {}
+        self.search = None
+        self.clear()
+
+    def clear(self):
+        self.columns = Columns({header: np.empty(0, dtype=self.DTYPES[kind])
+                                for header, _, kind in self.COLUMNS})
+        self.texts = {header: TextCodes() for header, _, kind in self.COLUMNS if kind == 'text'}
+        self.cursor = None
+        self.exhausted = False
+
+    def reload(self):
+        """Drop the loaded rows; the view fetches the first page again."""
+        self.beginResetModel()
+        self.clear()
+        text = self.filters.get('search')
+        self.search = text and self.db.search_trades(self.user_id, text, self.filters.get('status'),
+                                                     self.filters.get('since'))
+        self.endResetModel()
+
+    def set_filters(self, **filters):
+        self.filters = {name: value for name, value in filters.items() if value}
+        self.reload()
+
+    # ----------------------------------------
+    # Paging
+    # ----------------------------------------
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        filters = dict(self.filters, search=self.search)
+        rows, self.cursor = self.db.get_trades_page(self.user_id, after=self.cursor,
+                                                    limit=self.page_size, **filters)
+        self.exhausted = self.cursor is None
+        if not rows:
+            return
+
+        fields = list(zip(*rows))
+        page = {}
+        for header, index, kind in self.COLUMNS:
+            values = fields[index]
+            if kind == 'text':
+                page[header] = self.texts[header].encode(values)
+            else:
+                page[header] = np.array([np.nan if v is None else v for v in values], dtype=float)
+                if kind == 'int':
+                    page[header] = np.nan_to_num(page[header]).astype(np.int64)
+
+        start = len(self.columns)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.columns.write(start, page)
+        self.endInsertRows()
+
+    # ----------------------------------------
+    # Model interface
+    # ----------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def value(self, row, column):
+        """The raw cell value: int, str, or float (NaN for NULL)."""
+        header, _, kind = self.COLUMNS[column]
+        value = self.columns[header][row]
+        if kind == 'text':
+            return self.texts[header].decode(value)
+        return int(value) if kind == 'int' else float(value)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        kind = self.COLUMNS[column][2]
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self.value(row, column)
+            if kind == 'price':
+                return "" if np.isnan(value) else f"{value:,.2f}"
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.UserRole:
+            return self.value(row, column)
+        if role == Qt.ItemDataRole.TextAlignmentRole and kind != 'text':
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def trade_id(self, row):
+        return int(self.columns["ID"][row])
+
+
+class PnLDelegate(QStyledItemDelegate):
+    """Paints a numeric cell green when positive and red when negative."""
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        value = index.data(Qt.ItemDataRole.UserRole)
+        if value is None or np.isnan(value) or value == 0:
+            return
+        option.palette.setColor(QPalette.ColorRole.Text,
+                                QColor(PROFIT_COLOR if value > 0 else LOSS_COLOR))
+
+
+# ============================================
+# WATCHLIST
+# ============================================
+class WatchlistModel(QAbstractTableModel):
+    """
+    A user's watchlist table with live prices and indicator values.
+
+    Quotes and indicators are written straight into numpy columns and
+    the rows are only marked dirty; a timer announces all dirty rows
+    with one dataChanged every REFRESH_INTERVAL_MS, so a burst of quotes
+    costs one repaint of the visible rows rather than one per quote.
+    """
+
+    HEADERS = ("Symbol", "LTP", "Change %", "RSI (14)", "MACD", "Action")
+    # Live columns: (array name, format)
+    VALUES = {1: ('ltp', "₹{:,.2f}"), 2: ('change', "{:+.2f}%"), 3: ('rsi', "{:.1f}"),
+              4: ('macd', "{:+.2f}")}
+    ACTION_COLUMN = 5
+    # The live columns plus the previous close that change is measured from
+    ARRAYS = ('ltp', 'change', 'rsi', 'macd', 'previous')
+
+    def __init__(self, db, user_id, parent=None, interval=REFRESH_INTERVAL_MS):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.symbols = []
+        self.rows = {}  # ticker -> row
+        self.columns = Columns({name: np.empty(0) for name in self.ARRAYS})
+        self.dirty = np.zeros(0, dtype=bool)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def reload(self):
+        rows = self.db.execute_query(
+            "SELECT symbol FROM watchlist WHERE user_id = ? ORDER BY symbol",
+            (self.user_id,)
+        )
+        self.beginResetModel()
+        self.symbols = [symbol for symbol, in rows]
+        self.index_rows()
+        self.columns = Columns({name: np.full(len(self.symbols), np.nan) for name in self.ARRAYS})
+        self.dirty = np.zeros(len(self.symbols), dtype=bool)
+        self.endResetModel()
+
+    def index_rows(self):
+        self.rows = {ticker_for(symbol): row for row, symbol in enumerate(self.symbols)}
+
+    def tickers(self):
+        return list(self.rows)
+
+    def add(self, symbol):
+        """Insert symbol into the watchlist in sorted position; False if present."""
+        if symbol in self.symbols:
+            return False
+        self.db.execute_query(
+            "INSERT OR IGNORE INTO watchlist (user_id, symbol) VALUES (?, ?)",
+            (self.user_id, symbol)
+        )
+        row = int(np.searchsorted(np.array(self.symbols, dtype=object), symbol)) if self.symbols else 0
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.symbols.insert(row, symbol)
+        self.index_rows()
+        view = self.columns.view()
+        self.columns.write(row, {name: np.insert(column[row:], 0, np.nan)
+                                 for name, column in view.items()})
+        self.dirty = np.insert(self.dirty, row, False)
+        self.endInsertRows()
+        return True
+
+    def remove(self, symbol):
+        if symbol not in self.symbols:
+            return
+        self.db.execute_query(
+            "DELETE FROM watchlist WHERE user_id = ? AND symbol = ?",
+            (self.user_id, symbol)
+        )
+        row = self.symbols.index(symbol)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.symbols[row]
+        self.index_rows()
+        view = self.columns.view()
+        self.columns.write(row, {name: column[row + 1:].copy() for name, column in view.items()})
+        self.dirty = np.delete(self.dirty, row)
+        self.endRemoveRows()
+
+    # ----------------------------------------
+    # Live updates
+    # ----------------------------------------
+    def set_quote(self, quote):
+        """Store a market_data.Quote; shown at the next refresh."""
+        row = self.rows.get(quote.symbol)
+        if row is None:
+            return
+        self.columns['ltp'][row] = quote.ltp
+        self.columns['change'][row] = quote.change_pct
+        self.columns['previous'][row] = quote.ltp / (1 + quote.change_pct / 100)
+        self.dirty[row] = True
+
+    def set_ticks(self, ticks):
+        """Store the prices of a batch of ticks.Tick from a TickSubscriber."""
+        rows = np.array([self.rows.get(tick.symbol, -1) for tick in ticks], dtype=np.intp)
+        prices = np.array([tick.price for tick in ticks])
+        known = rows >= 0
+        rows, prices = rows[known], prices[known]
+        self.columns['ltp'][rows] = prices
+        # NaN until a quote has given the previous close
+        self.columns['change'][rows] = (prices / self.columns['previous'][rows] - 1) * 100
+        self.dirty[rows] = True
+
+    def set_indicators(self, batch):
+        """Store the latest RSI / MACD histogram of an indicators.BatchIndicators."""
+        rows = np.array([self.rows.get(symbol, -1) for symbol in batch.symbols], dtype=np.intp)
+        known = rows >= 0
+        rows = rows[known]
+        for name, output in (('rsi', 'rsi'), ('macd', 'macd_hist')):
+            self.columns[name][rows] = batch.latest[output][known]
+        self.dirty[rows] = True
+
+    def flush(self):
+        """Announce every row changed since the last flush as one block."""
+        changed = np.flatnonzero(self.dirty)
+        if not len(changed):
+            return
+        self.dirty[:] = False
+        self.dataChanged.emit(self.index(int(changed[0]), 1),
+                              self.index(int(changed[-1]), self.ACTION_COLUMN - 1))
+
+    # ----------------------------------------
+    # Model interface
+    # ----------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.symbols)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def symbol(self, row):
+        return self.symbols[row]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            return self.symbols[row] if role == Qt.ItemDataRole.DisplayRole else None
+        if column not in self.VALUES:
+            return None
+        name, fmt = self.VALUES[column]
+        value = float(self.columns[name][row])
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "-" if np.isnan(value) else fmt.format(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role == Qt.ItemDataRole.ForegroundRole and not np.isnan(value):
+            if name == 'rsi':
+                # Overbought red, oversold green
+                if value >= 70:
+                    return QColor(LOSS_COLOR)
+                if value <= 30:
+                    return QColor(PROFIT_COLOR)
+            elif name != 'ltp':
+                return QColor(PROFIT_COLOR if value >= 0 else LOSS_COLOR)
+        return None
+
+
+class ActionDelegate(QStyledItemDelegate):
+    """
+    Paints a row of push buttons in a cell and reports clicks on them.
+
+    Nothing but paint() runs per visible cell: there are no button
+    widgets, so the column costs the same for ten rows or ten thousand.
+    `clicked` carries the action name and the row.
+    """
+
+    clicked = pyqtSignal(str, int)
+
+    MARGIN = 3
+
+    def __init__(self, actions, parent=None):
+        super().__init__(parent)
+        self.actions = actions  # ((name, label), ...)
+        self.pressed = None     # (row, action index) under a held mouse button
+
+    def button_rects(self, rect):
+        rect = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        width = (rect.width() - self.MARGIN * (len(self.actions) - 1)) // len(self.actions)
+        return [QRect(rect.left() + i * (width + self.MARGIN), rect.top(), width, rect.height())
+                for i in range(len(self.actions))]
+
+    def button_at(self, rect, pos):
+        for i, button in enumerate(self.button_rects(rect)):
+            if button.contains(pos):
+                return i
+        return None
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        for i, (rect, (_, label)) in enumerate(zip(self.button_rects(option.rect), self.actions)):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.StateFlag.State_Enabled
+            button.state |= (QStyle.StateFlag.State_Sunken if self.pressed == (index.row(), i)
+                             else QStyle.StateFlag.State_Raised)
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        kind = event.type()
+        if kind not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease,
+                        QEvent.Type.MouseButtonDblClick):
+            return False
+        button = self.button_at(option.rect, event.position().toPoint())
+        if kind == QEvent.Type.MouseButtonRelease:
+            pressed, self.pressed = self.pressed, None
+            if button is not None and pressed == (index.row(), button):
+                self.clicked.emit(self.actions[button][0], index.row())
+        else:
+            self.pressed = None if button is None else (index.row(), button)
+        if option.widget is not None:
+            # Show the button going down / coming back up
+            option.widget.viewport().update(option.rect)
+        return button is not None
@@ -0,0 +1,255 @@
+"""
+SR TRADE - Options Pricing
+Vectorized Black-Scholes prices, Greeks and implied volatility, without Qt.
+
+Every function broadcasts its arguments, so one call prices a single
+contract or a whole chain (strikes x expiries x calls/puts). The normal
+CDF is scipy.special.ndtr, evaluated in C over the whole array.
+
+Implied volatility is solved for every contract at once: Newton steps
+on vega, each kept inside a per-contract bracket that shrinks as the
+iteration goes (a step that leaves it bisects instead). The few
+contracts that have not converged after NEWTON_ITERATIONS, such as
+deep in or out of the money with almost no vega, are finished one by
+one with scipy.optimize.brentq on their bracket.
+"""
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq
+from scipy.special import ndtr
+
+RISK_FREE_RATE = 0.065
+DAYS_PER_YEAR = 365.0
+
+# NSE index options expire on Tuesdays, at the close
+EXPIRY_WEEKDAY = 1
+EXPIRY_TIME = (15, 30)
+
+# Implied volatility search range and tolerances
+MIN_VOL, MAX_VOL = 1e-4, 5.0
+PRICE_TOLERANCE = 1e-6
+VOL_TOLERANCE = 1e-8
+NEWTON_ITERATIONS = 30
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def as_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def is_call(option_type):
+    """Bool array from 'CE' / 'PE' codes (or bools)."""
+    kinds = np.asarray(option_type)
+    if kinds.dtype == bool:
+        return kinds
+    return np.char.upper(kinds.astype(str)) == 'CE'
+
+
+def npdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def d1_d2(spot, strike, years, vol, rate, dividend):
+    root = vol * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * vol * vol) * years) / root
+    return d1, d1 - root
+
+
+# ============================================
+# PRICES AND GREEKS
+# ============================================
+def price(spot, strike, years, vol, call, rate=RISK_FREE_RATE, dividend=0.0):
+    """
+    Black-Scholes price of European options.
+
+    `years` is the time to expiry in years and `call` is a bool array
+    (see is_call). Expired contracts are worth their intrinsic value.
+    """
+    spot, strike, years, vol = map(as_array, (spot, strike, years, vol))
+    call = np.asarray(call, dtype=bool)
+    live = years > 0
+    t = np.where(live, years, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = d1_d2(spot, strike, t, vol, rate, dividend)
+        sign = np.where(call, 1.0, -1.0)
+        carry = spot * np.exp(-dividend * t)
+        discount = strike * np.exp(-rate * t)
+        value = sign * (carry * ndtr(sign * d1) - discount * ndtr(sign * d2))
+    intrinsic = np.maximum(sign * (spot - strike), 0.0)
+    return np.where(live, value, intrinsic)
+
+
+def greeks(spot, strike, years, vol, call, rate=RISK_FREE_RATE, dividend=0.0):
+    """
+    Price and Greeks of European options, as a dict of arrays.
+
+    theta is per calendar day, vega and rho per percentage point of
+    volatility and rate; delta and gamma per unit of the underlying.
+    """
+    spot, strike, years, vol = np.broadcast_arrays(*map(as_array, (spot, strike, years, vol)))
+    call = np.broadcast_to(np.asarray(call, dtype=bool), spot.shape)
+    t = np.maximum(years, 1e-12)
+    root_t = np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = d1_d2(spot, strike, t, vol, rate, dividend)
+        sign = np.where(call, 1.0, -1.0)
+        carry = np.exp(-dividend * t)
+        discount = strike * np.exp(-rate * t)
+        density = npdf(d1)
+        n1, n2 = ndtr(sign * d1), ndtr(sign * d2)
+
+        value = sign * (spot * carry * n1 - discount * n2)
+        delta = sign * carry * n1
+        gamma = carry * density / (spot * vol * root_t)
+        vega = spot * carry * density * root_t
+        theta = (-spot * carry * density * vol / (2 * root_t)
+                 - sign * rate * discount * n2
+                 + sign * dividend * spot * carry * n1)
+        rho = sign * discount * t * n2
+    return {
+        'price': value,
+        'delta': delta,
+        'gamma': gamma,
+        'theta': theta / DAYS_PER_YEAR,
+        'vega': vega / 100,
+        'rho': rho / 100,
+    }
+
+
+# ============================================
+# IMPLIED VOLATILITY
+# ============================================
+def implied_vol(premium, spot, strike, years, call, rate=RISK_FREE_RATE, dividend=0.0):
+    """
+    Volatility at which price() matches each premium; NaN where none does.
+
+    A premium below the option's discounted intrinsic value, or above
+    what any volatility up to MAX_VOL gives, has no implied volatility.
+    Neither has one within PRICE_TOLERANCE of the value at MIN_VOL, such
+    as the near-zero premium of a far out-of-the-money option: any
+    volatility up to where the price leaves that band matches it.
+    """
+    premium, spot, strike, years = np.broadcast_arrays(*map(as_array, (premium, spot, strike, years)))
+    call = np.broadcast_to(np.asarray(call, dtype=bool), premium.shape)
+    shape = premium.shape
+    premium, spot, strike, years, call = (a.ravel() for a in (premium, spot, strike, years, call))
+
+    def value(vol, i=slice(None)):
+        return price(spot[i], strike[i], years[i], vol, call[i], rate, dividend)
+
+    low = np.full(premium.shape, MIN_VOL)
+    high = np.full(premium.shape, MAX_VOL)
+    solvable = (years > 0) & (premium > value(low) + PRICE_TOLERANCE) & (premium < value(high))
+    vol = np.full(premium.shape, np.nan)
+
+    # Brenner-Subrahmanyam's at-the-money estimate as the first guess
+    guess = np.clip(premium / spot * np.sqrt(2 * np.pi / np.where(years > 0, years, 1.0)), 0.05, 2.0)
+    active = np.flatnonzero(solvable)
+    sigma = guess[active]
+    lo, hi = low[active], high[active]
+    for _ in range(NEWTON_ITERATIONS):
+        if not len(active):
+            break
+        i = active
+        g = greeks(spot[i], strike[i], years[i], sigma, call[i], rate, dividend)
+        error = g['price'] - premium[i]
+
+        # The price rises with volatility: shrink the bracket around the root
+        hi = np.where(error > 0, sigma, hi)
+        lo = np.where(error < 0, sigma, lo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = sigma - error / (g['vega'] * 100)
+        inside = (step > lo) & (step < hi)
+        # Converged on the price, or on the volatility where the price is
+        # too large for PRICE_TOLERANCE to be reachable in floating point
+        done = (np.abs(error) < PRICE_TOLERANCE) | (inside & (np.abs(step - sigma) < VOL_TOLERANCE))
+        vol[i[done]] = np.where(inside, step, sigma)[done]
+        sigma = np.where(inside, step, (lo + hi) / 2)
+
+        keep = ~done
+        active, sigma, lo, hi = active[keep], sigma[keep], lo[keep], hi[keep]
+
+    # Stragglers: Brent's method on what is left of their bracket
+    for i, a, b in zip(active.tolist(), lo.tolist(), hi.tolist()):
+        target = premium[i]
+        vol[i] = brentq(lambda s: float(value(s, i)) - target, a, b, xtol=1e-10)
+    return vol.reshape(shape)
+
+
+# ============================================
+# CHAINS
+# ============================================
+def expiry_dates(count, today=None, weekday=EXPIRY_WEEKDAY):
+    """The next `count` weekly expiry dates, today's included."""
+    today = today or datetime.now().date()
+    first = today + timedelta(days=(weekday - today.weekday()) % 7)
+    return [first + timedelta(weeks=week) for week in range(count)]
+
+
+def years_to_expiry(expiry, now=None):
+    """Years from `now` to each expiry date's close; 0 once expired."""
+    now = pd.Timestamp(now or datetime.now())
+    # Dates, datetimes or the trades table's expiry_date text; only the day counts
+    expiry = pd.to_datetime(pd.Series(np.atleast_1d(expiry)).astype(str).str[:10])
+    close = expiry + pd.Timedelta(hours=EXPIRY_TIME[0], minutes=EXPIRY_TIME[1])
+    seconds = (close - now).dt.total_seconds().to_numpy()
+    return np.maximum(seconds, 0.0) / (DAYS_PER_YEAR * 86400)
+
+
+def strike_step(spot):
+    """A round strike interval for an underlying at `spot`: 1, 2 or 5 x 10^k, about 0.25% of it."""
+    target = max(spot * 0.0025, 0.05)
+    scale = 10.0 ** math.floor(math.log10(target))
+    return next(step * scale for step in (1, 2, 5, 10) if step * scale >= target / 1.5)
+
+
+def strikes_around(spot, step, count):
+    """`count` strikes `step` apart, centred on the one nearest to spot."""
+    atm = np.round(spot / step) * step
+    return atm + step * (np.arange(count) - count // 2)
+
+
+class Chain:
+    """
+    Every contract of an option chain as flat numpy columns.
+
+    Contracts are ordered expiry, then strike, then call before put, so
+    reshape(len(expiries), len(strikes), 2) gives the usual grid.
+    """
+
+    def __init__(self, spot, strikes, expiries, vol, rate=RISK_FREE_RATE, dividend=0.0, now=None):
+        self.spot = float(spot)
+        self.strikes = as_array(strikes)
+        self.expiries = list(expiries)
+        years = years_to_expiry(self.expiries, now)
+        grid = np.broadcast_arrays(years[:, None, None], self.strikes[None, :, None],
+                                   np.array([True, False])[None, None, :])
+        self.years, self.strike, self.call = (a.ravel() for a in grid)
+        # One volatility, or one per contract (e.g. a fitted smile)
+        self.vol = np.broadcast_to(as_array(vol), self.years.shape).copy()
+        self.rate = rate
+        self.dividend = dividend
+        self.columns = greeks(self.spot, self.strike, self.years, self.vol, self.call, rate, dividend)
+
+    def __len__(self):
+        return len(self.strike)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def implied_vols(self, premiums):
+        """Implied volatility of every contract from market premiums in chain order."""
+        return implied_vol(premiums, self.spot, self.strike, self.years, self.call, self.rate,
+                           self.dividend)
+
+    def expiry(self, index):
+        """(calls, puts) column dicts of one expiry, each in strike order."""
+        n = len(self.strikes)
+        rows = slice(index * n * 2, (index + 1) * n * 2)
+        columns = dict(self.columns, vol=self.vol)
+        return ({name: values[rows][0::2] for name, values in columns.items()},
+                {name: values[rows][1::2] for name, values in columns.items()})
@@ -0,0 +1,222 @@
+"""
+SR TRADE - Strategy Payoff
+Payoff and theoretical P&L of multi-leg option positions, without Qt.
+
+A Strategy holds its legs as numpy columns. Its P&L over a grid of
+underlying prices x time elapsed x volatility is one broadcast
+options.price() call over (prices, times, vols, legs), summed over the
+legs with a matrix product, so a GUI computes the whole surface once and
+its sliders only pick slices of it.
+
+At the nearest expiry the payoff is piecewise linear in the underlying
+price, with kinks at the strikes. Breakevens, maximum profit and maximum
+loss are read off the kinks and the slopes beyond them exactly, rather
+than searched for on a grid.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import options
+
+# Grid resolution of Strategy.surface()
+PRICE_POINTS = 201
+TIME_POINTS = 31
+VOL_POINTS = 21
+
+# Prices from PRICE_RANGE below the lowest strike to above the highest
+PRICE_RANGE = 0.15
+
+# Volatility grid as multiples of the base volatility
+VOL_SCALES = (0.5, 1.5)
+
+# A user's open option positions; BUY legs are long, SELL legs short
+OPEN_OPTION_LEGS = '''
+    SELECT symbol, trade_type, quantity, entry_price, strike_price, option_type, expiry_date
+    FROM trades
+    WHERE user_id = ? AND status = 'OPEN' AND option_type IN ('CE', 'PE')
+      AND strike_price IS NOT NULL AND expiry_date IS NOT NULL
+    ORDER BY symbol, expiry_date, strike_price
+'''
+
+
+class Leg(NamedTuple):
+    option_type: Optional[str]  # 'CE', 'PE', or None for the underlying itself
+    strike: float               # ignored for the underlying
+    expiry: object              # date, datetime or expiry_date text; None for the underlying
+    quantity: float             # positive long, negative short
+    premium: float              # price paid or received per unit
+
+
+# Ad-hoc strategies: (option type, strikes away from the money, lots)
+STRATEGIES = {
+    "Long Call": (('CE', 0, 1),),
+    "Long Put": (('PE', 0, 1),),
+    "Bull Call Spread": (('CE', 0, 1), ('CE', 2, -1)),
+    "Bear Put Spread": (('PE', 0, 1), ('PE', -2, -1)),
+    "Long Straddle": (('CE', 0, 1), ('PE', 0, 1)),
+    "Short Straddle": (('CE', 0, -1), ('PE', 0, -1)),
+    "Long Strangle": (('CE', 2, 1), ('PE', -2, 1)),
+    "Short Strangle": (('CE', 2, -1), ('PE', -2, -1)),
+    "Iron Condor": (('PE', -4, 1), ('PE', -2, -1), ('CE', 2, -1), ('CE', 4, 1)),
+    "Iron Butterfly": (('PE', -3, 1), ('PE', 0, -1), ('CE', 0, -1), ('CE', 3, 1)),
+    "Call Butterfly": (('CE', -2, 1), ('CE', 0, -2), ('CE', 2, 1)),
+    "Covered Call": ((None, 0, 1), ('CE', 2, -1)),
+    "Protective Put": ((None, 0, 1), ('PE', -2, 1)),
+}
+
+
+def template_legs(name, spot, step, expiry, vol, lot_size=1, rate=options.RISK_FREE_RATE, now=None):
+    """The legs of STRATEGIES[name] around spot, at their theoretical premiums."""
+    atm = round(spot / step) * step
+    years = float(options.years_to_expiry(expiry, now)[0])
+    legs = []
+    for option_type, steps, lots in STRATEGIES[name]:
+        if option_type is None:
+            legs.append(Leg(None, 0.0, None, lots * lot_size, spot))
+            continue
+        strike = atm + steps * step
+        premium = float(options.price(spot, strike, years, vol, option_type == 'CE', rate))
+        legs.append(Leg(option_type, strike, expiry, lots * lot_size, round(premium, 2)))
+    return legs
+
+
+def open_legs(db, user_id):
+    """{symbol: [Leg]} of the user's open option trades."""
+    positions = {}
+    for symbol, side, quantity, price, strike, option_type, expiry in db.execute_query(
+            OPEN_OPTION_LEGS, (user_id,)):
+        sign = -1 if side == 'SELL' else 1
+        positions.setdefault(symbol, []).append(
+            Leg(option_type, float(strike), expiry, sign * quantity, float(price)))
+    return positions
+
+
+class Strategy:
+    """A set of legs on one underlying, valued together."""
+
+    def __init__(self, legs, rate=options.RISK_FREE_RATE, now=None):
+        self.legs = list(legs)
+        self.rate = rate
+        self.option = np.array([leg.option_type is not None for leg in self.legs], dtype=bool)
+        self.call = np.array([leg.option_type == 'CE' for leg in self.legs], dtype=bool)
+        self.strike = np.array([leg.strike for leg in self.legs], dtype=np.float64)
+        self.quantity = np.array([leg.quantity for leg in self.legs], dtype=np.float64)
+        self.premium = np.array([leg.premium for leg in self.legs], dtype=np.float64)
+        self.years = np.zeros(len(self.legs))
+        if self.option.any():
+            self.years[self.option] = options.years_to_expiry(
+                [leg.expiry for leg in self.legs if leg.option_type is not None], now)
+        # Time left to the nearest expiry: the end of the time axis
+        self.horizon = float(self.years[self.option].min()) if self.option.any() else 0.0
+
+    def __len__(self):
+        return len(self.legs)
+
+    @property
+    def net_premium(self):
+        """Paid to open the position (negative: received)."""
+        return float(self.premium @ self.quantity)
+
+    def pnl(self, prices, elapsed, vols):
+        """
+        Theoretical P&L over prices x elapsed years x volatilities.
+
+        Returns an array of shape (len(prices), len(elapsed), len(vols)).
+        Legs past their expiry are worth their intrinsic value.
+        """
+        prices = options.as_array(prices)[:, None, None, None]
+        left = np.maximum(self.years - options.as_array(elapsed)[:, None], 0.0)[None, :, None, :]
+        vols = options.as_array(vols)[None, None, :, None]
+        values = np.where(self.option,
+                          options.price(prices, self.strike, left, vols, self.call, self.rate),
+                          prices)
+        return (values - self.premium) @ self.quantity
+
+    def surface(self, spot, vol, prices=None):
+        """
+        A Surface of P&L around spot, from now to the nearest expiry and
+        over VOL_SCALES of `vol`.
+        """
+        if prices is None:
+            prices = self.price_grid(spot)
+        elapsed = np.linspace(0.0, self.horizon, TIME_POINTS)
+        vols = vol * np.linspace(*VOL_SCALES, VOL_POINTS)
+        return Surface(prices, elapsed, vols, self.pnl(prices, elapsed, vols))
+
+    def price_grid(self, spot, points=PRICE_POINTS):
+        """`points` prices spanning spot and the strikes, plus the strikes themselves."""
+        strikes = self.strike[self.option]
+        low = min(strikes.min(), spot) if len(strikes) else spot
+        high = max(strikes.max(), spot) if len(strikes) else spot
+        grid = np.linspace(max(low * (1 - PRICE_RANGE), 0.0), high * (1 + PRICE_RANGE), points)
+        # With the strikes on the grid, expiry payoffs are drawn with sharp kinks
+        return np.union1d(grid, strikes)
+
+    def greeks(self, spot, vol, elapsed=0.0):
+        """Position delta, gamma, theta, vega and rho (see options.greeks)."""
+        left = np.maximum(self.years - elapsed, 0.0)
+        legs = options.greeks(spot, self.strike, left, vol, self.call, self.rate)
+        # The underlying is worth the spot price and has a delta of one
+        underlying = {'price': spot, 'delta': 1.0}
+        totals = {}
+        for name, values in legs.items():
+            values = np.where(self.option, values, underlying.get(name, 0.0))
+            totals[name] = float(np.nan_to_num(values) @ self.quantity)
+        totals['pnl'] = totals.pop('price') - self.net_premium
+        return totals
+
+    def payoff(self, prices, vol):
+        """P&L at the nearest expiry; legs expiring later are valued at `vol`."""
+        return self.pnl(prices, [self.horizon], [vol])[:, 0, 0]
+
+    def expiry_profile(self, vol):
+        """
+        (breakevens, max profit, max loss) at the nearest expiry.
+
+        Exact when every option leg expires then: the payoff is linear
+        between strikes, so its extremes are at the kinks or at the ends
+        and each sign change between two kinks is a breakeven. Legs
+        expiring later are valued at `vol` and are not linear in the
+        price; with any of those the profile is read off a fine grid
+        instead. Unlimited profit or loss is returned as +/-inf.
+        """
+        strikes = np.unique(self.strike[self.option])
+        if not len(self.legs):
+            return np.empty(0), 0.0, 0.0
+        later = self.option & (self.years > self.horizon)
+        if later.any():
+            x = np.linspace(0.0, 2 * strikes.max(), 20_001)
+        else:
+            x = np.concatenate([[0.0], strikes, [strikes.max() + 1.0 if len(strikes) else 1.0]])
+        y = self.payoff(x, vol)
+
+        # Past the last point only calls and the underlying still move;
+        # a slope that is rounding error is flat
+        slope = (y[-1] - y[-2]) / (x[-1] - x[-2])
+        if abs(slope) * x[-1] <= 1e-9 * max(1.0, np.abs(y).max()):
+            slope = 0.0
+        a, b = y[:-1], y[1:]
+        crossing = np.flatnonzero(((a < 0) & (b >= 0)) | ((a > 0) & (b <= 0)) | ((a == 0) & (b != 0)))
+        roots = x[crossing] - a[crossing] * (x[crossing + 1] - x[crossing]) / (b[crossing] - a[crossing])
+        if (y[-1] < 0 < slope) or (slope < 0 < y[-1]):
+            roots = np.append(roots, x[-1] - y[-1] / slope)
+        roots = np.unique(np.round(roots[roots > 0], 6))
+
+        best = np.inf if slope > 0 else float(y.max())
+        worst = -np.inf if slope < 0 else float(y.min())
+        return roots, best, worst
+
+
+class Surface:
+    """P&L over prices x elapsed x vols, with the grids it was taken over."""
+
+    def __init__(self, prices, elapsed, vols, values):
+        self.prices = prices
+        self.elapsed = elapsed
+        self.vols = vols
+        self.values = values
+
+    def curve(self, time_index, vol_index):
+        """P&L against price at one grid time and volatility."""
+        return self.values[:, time_index, vol_index]
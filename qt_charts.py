@@ -0,0 +1,599 @@
+"""
+SR TRADE - Qt Charts Backend
+Candlestick and indicator charts drawn with QtCharts instead of matplotlib.
+
+The widgets here have the same interface as CandleStickChart and
+TechnicalIndicatorChart in main.py. Series are created once per chart
+layout; updates swap their points in place (QXYSeries.replace, setters
+on reused candlestick sets), so the scene repaints only what changed
+and nothing is rasterized on the CPU by Agg. Long series go through the
+same lod pyramids as the matplotlib charts.
+"""
+import numpy as np
+import pandas as pd
+from PyQt6.QtCharts import (QAreaSeries, QCandlestickSeries, QCandlestickSet, QChart, QChartView,
+                            QDateTimeAxis, QLineSeries, QValueAxis)
+from PyQt6.QtCore import QDateTime, QPointF, Qt
+from PyQt6.QtGui import QColor, QPainter, QPen
+from PyQt6.QtWidgets import QVBoxLayout, QWidget
+
+import indicators
+import lod
+from bar_store import FIELDS
+from chart_render import DOWN_COLOR, UP_COLOR, padded
+
+
+def time_ms(index):
+    """
+    Bar times in ms for QDateTimeAxis.
+
+    The axis shows local time, so timestamps are shifted by the local UTC
+    offset to display the index's own wall-clock times.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    offset = QDateTime.currentDateTime().offsetFromUtc() * 1000
+    return (index.as_unit('ns').asi8 // 1_000_000 - offset).astype(float)
+
+
+def points(x, y):
+    keep = np.isfinite(y)
+    return [QPointF(a, b) for a, b in zip(x[keep].tolist(), y[keep].tolist())]
+
+
+def needles(x, y):
+    """Histogram bars as one polyline: up to each value and back to zero."""
+    keep = np.isfinite(y)
+    x, y = x[keep].tolist(), y[keep].tolist()
+    result = []
+    for a, b in zip(x, y):
+        result += [QPointF(a, 0.), QPointF(a, b), QPointF(a, 0.)]
+    return result
+
+
+class ChartPane(QChartView):
+    """One QChart with a date (or, with dates=False, value) x axis and a value y axis."""
+
+    def __init__(self, title="", parent=None, dates=True):
+        chart = QChart()
+        chart.setTitle(title)
+        chart.legend().setVisible(False)
+        chart.setMargins(chart.margins().__class__(4, 4, 4, 4))
+        super().__init__(chart, parent)
+        self.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.setRubberBand(QChartView.RubberBand.HorizontalRubberBand)
+        self.setMinimumHeight(140)
+
+        self.dates = dates
+        if dates:
+            self.x_axis = QDateTimeAxis()
+            self.x_axis.setFormat("dd MMM hh:mm")
+        else:
+            self.x_axis = QValueAxis()
+            self.x_axis.setLabelFormat("%.6g")
+        self.x_axis.setTickCount(6)
+        chart.addAxis(self.x_axis, Qt.AlignmentFlag.AlignBottom)
+        self.y_axis = QValueAxis()
+        self.y_axis.setLabelFormat("%.5g")
+        chart.addAxis(self.y_axis, Qt.AlignmentFlag.AlignLeft)
+
+    def add(self, series):
+        self.chart().addSeries(series)
+        series.attachAxis(self.x_axis)
+        series.attachAxis(self.y_axis)
+        # Only named series get a legend entry (not candle sets or bands)
+        for marker in self.chart().legend().markers(series):
+            marker.setVisible(bool(series.name()))
+        return series
+
+    def line(self, color, width=1, name=None, style=Qt.PenStyle.SolidLine):
+        series = QLineSeries()
+        series.setPen(QPen(QColor(color), width, style))
+        if name:
+            series.setName(name)
+            self.chart().legend().setVisible(True)
+        return self.add(series)
+
+    def hline(self, y, color, low, high):
+        """A dashed level line from x=low to x=high, like ax.axhline."""
+        series = self.line(color, 1, style=Qt.PenStyle.DashLine)
+        series.replace([QPointF(low, y), QPointF(high, y)])
+        return series
+
+    def set_x(self, low, high):
+        if not self.dates:
+            self.x_axis.setRange(low, high)
+            return
+        self.x_axis.setRange(QDateTime.fromMSecsSinceEpoch(int(low)),
+                             QDateTime.fromMSecsSinceEpoch(int(high)))
+
+    def x_range(self):
+        if not self.dates:
+            return (self.x_axis.min(), self.x_axis.max())
+        return (self.x_axis.min().toMSecsSinceEpoch(), self.x_axis.max().toMSecsSinceEpoch())
+
+    def set_y(self, low, high):
+        self.y_axis.setRange(low, high)
+
+    def plot_width(self):
+        return self.chart().plotArea().width()
+
+
+class QtCandles:
+    """Candles in a QCandlestickSeries; the last set is the forming bar."""
+
+    def __init__(self, pane, x, open, high, low, close):
+        self.pane = pane
+        self.series = QCandlestickSeries()
+        self.series.setIncreasingColor(QColor(UP_COLOR))
+        self.series.setDecreasingColor(QColor(DOWN_COLOR))
+        self.series.setBodyOutlineVisible(False)
+        pane.add(self.series)
+        self.x = lod.Columns({'x': np.asarray(x, dtype=float)[:-1]})
+        self.pyramid = lod.OHLCPyramid(open[:-1], high[:-1], low[:-1], close[:-1])
+        self.sets = []
+        self.live = (x[-1], open[-1], high[-1], low[-1], close[-1])
+        self.view = (0, None, 0)
+
+    def resize(self, count):
+        if count > len(self.sets):
+            new = [QCandlestickSet(0., 0., 0., 0., 0.) for _ in range(count - len(self.sets))]
+            self.series.append(new)
+            self.sets += new
+        elif count < len(self.sets):
+            self.series.remove(self.sets[count:])
+            del self.sets[count:]
+
+    def show(self, lo=0, hi=None, level=0):
+        self.view = (lo, hi, level)
+        x = self.x['x']
+        bars = self.pyramid.slice(lo, len(x) if hi is None else hi, level)
+        centers = (x[bars['first']] + x[bars['last']]) / 2
+        self.resize(len(centers) + 1)
+        # Reuse the sets in place instead of rebuilding the series
+        for candle, values in zip(self.sets, zip(centers.tolist(), bars['open'].tolist(),
+                                                 bars['high'].tolist(), bars['low'].tolist(),
+                                                 bars['close'].tolist())):
+            self.fill(candle, *values)
+        self.fill(self.sets[-1], *self.live)
+
+    @staticmethod
+    def fill(candle, x, open, high, low, close):
+        candle.setTimestamp(x)
+        candle.setOpen(open)
+        candle.setHigh(high)
+        candle.setLow(low)
+        candle.setClose(close)
+
+    def append(self, x, open, high, low, close):
+        self.x.write(len(self.x), {'x': np.asarray(x, dtype=float)})
+        self.pyramid.append(open, high, low, close)
+
+    def set_live(self, x, open, high, low, close):
+        self.live = (x, open, high, low, close)
+        if self.sets:
+            self.fill(self.sets[-1], *self.live)
+
+
+class QtTrack:
+    """
+    One indicator as QLineSeries, mirroring chart_render.IndicatorTrack.
+
+    Each series' last point is the forming bar; set_live() replaces just
+    that point. `outputs` are dict(color=, name=, width=) for lines,
+    ('bar', dict(color=)) for histograms or None; `fill` = (i, j, color).
+    """
+
+    def __init__(self, pane, x, values, state=None, outputs=({},), source='close', fill=None,
+                 live=True):
+        self.pane = pane
+        self.state = state
+        self.outputs = outputs
+        self.source = source
+        self.fill = fill
+        self.has_live = live
+        closed = slice(None, -1) if live else slice(None)
+        self.x = lod.Columns({'x': np.asarray(x, dtype=float)[closed]})
+        self.pyramids = [None if v is None else lod.LinePyramid(np.asarray(v, dtype=float)[closed])
+                         for v in values]
+        self.live_x = float(x[-1]) if len(x) else np.nan
+        self.live_values = [None if v is None or not live else float(v[-1]) for v in values]
+        self.view = (0, None, 0)
+
+        self.series = []
+        for output, style in enumerate(outputs):
+            if style is None:
+                # Unplotted outputs still feed a band fill
+                self.series.append(QLineSeries() if fill and output in fill[:2] else None)
+            elif isinstance(style, tuple):
+                self.series.append(pane.line(style[1]['color'], style[1].get('width', 2)))
+            else:
+                self.series.append(pane.line(style['color'], style.get('width', 1), style.get('name')))
+        if fill is not None:
+            area = QAreaSeries(self.series[fill[0]], self.series[fill[1]])
+            color = QColor(fill[2])
+            color.setAlphaF(0.15)
+            area.setBrush(color)
+            area.setPen(QPen(Qt.PenStyle.NoPen))
+            pane.add(area)
+
+    def values(self, output):
+        return self.pyramids[output].values
+
+    def show(self, lo=0, hi=None, level=0):
+        self.view = (lo, hi, level)
+        x = self.x['x']
+        hi = len(x) if hi is None else hi
+        for output, series in enumerate(self.series):
+            if series is None:
+                continue
+            pyramid = self.pyramids[output]
+            live = self.live_values[output] if self.has_live else None
+            if isinstance(self.outputs[output], tuple):
+                first, last, pick = pyramid.bars(lo, hi, level)
+                bar_x, bar_y = (x[first] + x[last]) / 2, pyramid.values[pick]
+                if live is not None:
+                    bar_x, bar_y = np.append(bar_x, self.live_x), np.append(bar_y, live)
+                series.replace(needles(bar_x, bar_y))
+            else:
+                index = pyramid.points(lo, hi, level)
+                line_x, line_y = x[index], pyramid.values[index]
+                if live is not None:
+                    line_x, line_y = np.append(line_x, self.live_x), np.append(line_y, live)
+                series.replace(points(line_x, line_y))
+
+    def step(self, value, commit):
+        if self.state is None:
+            return (value,)
+        result = self.state.update(value) if commit else self.state.peek(value)
+        return result if isinstance(result, tuple) else (result,)
+
+    def append(self, x, inputs):
+        new = [self.step(value, commit=True) for value in inputs]
+        self.x.write(len(self.x), {'x': np.asarray(x, dtype=float)})
+        for output, pyramid in enumerate(self.pyramids):
+            if pyramid is not None:
+                pyramid.append([row[output] for row in new])
+
+    def set_live(self, x, value):
+        moved = x != self.live_x
+        self.live_x = x
+        self.live_values = list(self.step(value, commit=False))
+        if moved:
+            self.show(*self.view)
+            return
+        for output, series in enumerate(self.series):
+            y = self.live_values[output]
+            if series is None or series.count() == 0 or not np.isfinite(y):
+                continue
+            if isinstance(self.outputs[output], tuple):
+                series.replace(series.count() - 2, QPointF(x, y))
+            else:
+                series.replace(series.count() - 1, QPointF(x, y))
+
+    def limits(self):
+        drawn = [np.append(pyramid.values, self.live_values[output] if self.has_live else np.nan)
+                 for output, pyramid in enumerate(self.pyramids)
+                 if pyramid is not None and self.outputs[output] is not None]
+        if any(isinstance(style, tuple) for style in self.outputs):
+            drawn.append(np.zeros(1))
+        values = np.concatenate(drawn) if drawn else np.empty(0)
+        values = values[np.isfinite(values)]
+        return (float(values.min()), float(values.max())) if len(values) else None
+
+
+class PaneGroup:
+    """
+    Keeps the x ranges of stacked panes in step and their series decimated.
+
+    A zoom (rubber band) or resize on any pane re-decimates every artist
+    from its pyramid for the new visible range.
+    """
+
+    def __init__(self, x):
+        self.x = x  # callable returning the closed bars' x positions (ms)
+        self.panes = []
+        self.artists = []
+        self.drawn = None
+        self.syncing = False
+
+    def add_pane(self, pane):
+        self.panes.append(pane)
+        pane.x_axis.rangeChanged.connect(lambda low, high, p=pane: self.on_range(p))
+
+    def add(self, artist):
+        self.artists.append(artist)
+
+    def set_x(self, low, high):
+        self.syncing = True
+        for pane in self.panes:
+            pane.set_x(low, high)
+        self.syncing = False
+        self.update(force=True)
+
+    def on_range(self, source):
+        if self.syncing:
+            return
+        self.syncing = True
+        low, high = source.x_range()
+        for pane in self.panes:
+            if pane is not source:
+                pane.set_x(low, high)
+        self.syncing = False
+        self.update()
+
+    def update(self, force=False):
+        if not self.panes:
+            return
+        x = self.x()
+        n = len(x)
+        left, right = self.panes[0].x_range()
+        lo = int(np.searchsorted(x, left, side='left'))
+        hi = int(np.searchsorted(x, right, side='right'))
+        level = lod.level_for(hi - lo, self.panes[0].plot_width() or 800)
+        if not force and self.drawn is not None:
+            drawn_lo, drawn_hi, drawn_level = self.drawn
+            if drawn_level == level and drawn_lo <= lo and hi <= drawn_hi:
+                return
+
+        span = max(hi - lo, 1)
+        lo = max(lo - span, 0) >> level << level
+        hi = min(hi + span, n)
+        self.drawn = (lo, hi, level)
+        for artist in self.artists:
+            artist.show(lo, None if hi >= n else hi, level)
+
+
+# ============================================
+# WIDGETS
+# ============================================
+class QtCandleStickChart(QWidget):
+    """CandleStickChart drawn with QtCharts; indicator panels are stacked panes."""
+
+    OVERLAYS = ("Bollinger Bands", "Moving Averages")
+    PANELS = ("RSI", "MACD", "Volume")
+
+    def __init__(self, parent=None, cache=None):
+        super().__init__(parent)
+        self.layout = QVBoxLayout()
+        self.layout.setSpacing(0)
+        self.setLayout(self.layout)
+        self.data = None
+        self.title = ""
+        self.indicators = []
+        self.cache = cache
+        self.series = None
+        self.panes = []
+        self.candles = None
+        self.tracks = []
+        self.group = None
+        self.live = None
+        self.closed = 0
+
+    def plot_candlestick(self, df, title="Price Chart", series=None):
+        # series: (symbol, interval, version) of df when it came from the bar store
+        incremental = title == self.title and self.extends(df)
+        self.data = df
+        self.title = title
+        self.series = series
+        if incremental:
+            self.advance(df)
+        else:
+            self.render(df)
+
+    def extends(self, df):
+        """True if df only changes the forming bar or appends bars to the drawn data."""
+        if self.candles is None or len(df) <= self.closed:
+            return False
+        old = self.data.iloc[:self.closed]
+        new = df.iloc[:self.closed]
+        return (old.index.equals(new.index) and
+                np.array_equal(old[list(FIELDS)].to_numpy(float), new[list(FIELDS)].to_numpy(float),
+                               equal_nan=True))
+
+    def clear(self):
+        for pane in self.panes:
+            self.layout.removeWidget(pane)
+            pane.deleteLater()
+        self.panes = []
+        self.tracks = []
+        self.candles = self.group = self.live = None
+        self.closed = 0
+
+    def render(self, df):
+        self.clear()
+        price = ChartPane(self.title)
+        self.panes.append(price)
+        self.layout.addWidget(price, 3)
+        price.y_axis.setTitleText("Price")
+        if len(df) == 0:
+            return
+
+        x = time_ms(df.index)
+        o, h, l, c, v = (df[field].to_numpy(float) for field in FIELDS)
+        self.closed = len(df) - 1
+        self.candles = QtCandles(price, x, o, h, l, c)
+        price.set_y(*padded(np.nanmin(l), np.nanmax(h)))
+
+        for name in self.indicators:
+            if name in self.OVERLAYS:
+                self.draw_overlay(price, name, df, x)
+        for name in self.indicators:
+            if name in self.PANELS:
+                pane = ChartPane()
+                pane.y_axis.setTitleText(name)
+                self.panes.append(pane)
+                self.layout.addWidget(pane, 1)
+                self.draw_panel(pane, name, df, x)
+
+        self.group = PaneGroup(lambda: self.candles.x['x'])
+        for pane in self.panes:
+            self.group.add_pane(pane)
+        for artist in [self.candles] + self.tracks:
+            self.group.add(artist)
+        self.live = (x[-1], o[-1], h[-1], l[-1], c[-1], v[-1])
+        spacing = np.median(np.diff(x)) if len(x) > 1 else 86_400_000
+        self.group.set_x(x[0] - spacing, x[-1] + spacing)
+
+    def advance(self, df):
+        rows = df.iloc[self.closed:]
+        x = time_ms(rows.index)
+        o, h, l, c, v = (rows[field].to_numpy(float) for field in FIELDS)
+        if len(rows) > 1:
+            following = self.panes[0].x_range()[1] >= x[0]
+            self.candles.append(x[:-1], o[:-1], h[:-1], l[:-1], c[:-1])
+            for track in self.tracks:
+                track.append(x[:-1], v[:-1] if track.source == 'volume' else c[:-1])
+            self.closed = len(df) - 1
+            self.set_live(x[-1], o[-1], h[-1], l[-1], c[-1], v[-1])
+            low, high = self.panes[0].x_range()
+            if following:
+                high = x[-1] + (x[-1] - x[-2] if len(x) > 1 else 0)
+            self.group.set_x(low, high)
+        else:
+            self.set_live(x[-1], o[-1], h[-1], l[-1], c[-1], v[-1])
+
+    def update_tick(self, price, volume=0.0):
+        """Move the forming bar to a new trade price."""
+        if self.live is None:
+            return
+        x, o, h, l, c, v = self.live
+        self.set_live(x, o, max(h, price), min(l, price), price, v + volume)
+
+    def set_live(self, x, o, h, l, c, v):
+        self.live = (x, o, h, l, c, v)
+        self.candles.set_live(x, o, h, l, c)
+        for track in self.tracks:
+            track.set_live(x, v if track.source == 'volume' else c)
+
+        price = self.panes[0]
+        if l < price.y_axis.min() or h > price.y_axis.max():
+            price.set_y(*padded(min(l, price.y_axis.min()), max(h, price.y_axis.max())))
+        for track in self.tracks:
+            if track.pane is not price:
+                live = [y for y in track.live_values if y is not None and np.isfinite(y)]
+                axis = track.pane.y_axis
+                if live and (min(live) < axis.min() or max(live) > axis.max()):
+                    track.pane.set_y(*padded(*track.limits()))
+
+    def toggle_indicator(self, name):
+        if name in self.indicators:
+            self.indicators.remove(name)
+        else:
+            self.indicators.append(name)
+
+        if self.data is not None:
+            self.render(self.data)
+
+    def draw_overlay(self, pane, name, df, x):
+        close = df['Close'].to_numpy(float)
+        if name == "Bollinger Bands":
+            self.add_track(pane, x, self.compute(indicators.bollinger_bands, close),
+                           indicators.BollingerState(20, 2.0).seed(close[:-1]),
+                           outputs=(None, dict(color='gray', name='BB (20, 2)'), None),
+                           fill=(0, 2, 'gray'))
+        elif name == "Moving Averages":
+            self.add_track(pane, x, (self.compute(indicators.sma, close, period=20),),
+                           indicators.SMAState(20).seed(close[:-1]),
+                           outputs=(dict(color='blue', name='SMA 20'),))
+            self.add_track(pane, x, (self.compute(indicators.ema, close, span=50),),
+                           indicators.EMAState(50).seed(close[:-1]),
+                           outputs=(dict(color='purple', name='EMA 50'),))
+
+    def draw_panel(self, pane, name, df, x):
+        close = df['Close'].to_numpy(float)
+        if name == "RSI":
+            self.add_track(pane, x, (self.compute(indicators.rsi, close),),
+                           indicators.RSIState(14).seed(close[:-1]),
+                           outputs=(dict(color='orange'),))
+            for level, color in ((70, 'red'), (30, 'green')):
+                pane.hline(level, color, x[0], x[-1] + (x[-1] - x[0]))
+            pane.set_y(0, 100)
+        elif name == "MACD":
+            self.add_track(pane, x, self.compute(indicators.macd, close),
+                           indicators.MACDState().seed(close[:-1]),
+                           outputs=(dict(color='blue'), dict(color='red'),
+                                    ('bar', dict(color='gray'))))
+        elif name == "Volume":
+            volume = df['Volume'].to_numpy(float)
+            self.add_track(pane, x, (volume,), source='volume',
+                           outputs=(('bar', dict(color='gray')),))
+            self.add_track(pane, x, (self.compute(indicators.volume_sma, volume),),
+                           indicators.SMAState(20).seed(volume[:-1]), source='volume',
+                           outputs=(dict(color='blue'),))
+        if name != "RSI":
+            limits = [track.limits() for track in self.tracks if track.pane is pane]
+            limits = [limit for limit in limits if limit is not None]
+            if limits:
+                pane.set_y(*padded(min(l for l, _ in limits), max(h for _, h in limits)))
+
+    def add_track(self, pane, x, values, state=None, **kwargs):
+        self.tracks.append(QtTrack(pane, x, values, state, **kwargs))
+
+    def compute(self, fn, *args, **params):
+        return indicators.cached(self.cache, self.series, fn, *args, **params)
+
+
+class QtTechnicalIndicatorChart(QWidget):
+    """TechnicalIndicatorChart drawn with QtCharts."""
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.layout = QVBoxLayout()
+        self.layout.setSpacing(0)
+        self.setLayout(self.layout)
+        self.cache = cache
+        self.series = None
+        self.panes = []
+        self.tracks = []
+        self.group = None
+
+    def plot_indicators(self, df, series=None):
+        self.series = series
+        for pane in self.panes:
+            self.layout.removeWidget(pane)
+            pane.deleteLater()
+        self.tracks = []
+
+        x = time_ms(df.index)
+        close = df['Close'].to_numpy(float)
+        price, rsi_pane, macd_pane = (ChartPane(title) for title in
+                                      ('Price with Indicators', 'RSI (14)', 'MACD'))
+        self.panes = [price, rsi_pane, macd_pane]
+        for pane, stretch in zip(self.panes, (3, 1, 1)):
+            self.layout.addWidget(pane, stretch)
+
+        self.group = PaneGroup(lambda: x)
+        self.add_track(price, x, (close,), outputs=(dict(color='blue', name='Close'),))
+        self.add_track(rsi_pane, x, (self.calculate_rsi(close),),
+                       outputs=(dict(color='orange', name='RSI'),))
+        if len(x):
+            for level, color in ((70, 'red'), (30, 'green')):
+                rsi_pane.hline(level, color, x[0], x[-1])
+        rsi_pane.set_y(0, 100)
+        self.add_track(macd_pane, x, self.calculate_macd(close),
+                       outputs=(dict(color='blue', name='MACD'), dict(color='red', name='Signal'),
+                                ('bar', dict(color='gray'))))
+
+        for pane, track in ((price, self.tracks[0]), (macd_pane, self.tracks[-1])):
+            limits = track.limits()
+            if limits is not None:
+                pane.set_y(*padded(*limits))
+        for pane in self.panes:
+            self.group.add_pane(pane)
+        if len(x):
+            spacing = np.median(np.diff(x)) if len(x) > 1 else 86_400_000
+            self.group.set_x(x[0] - spacing, x[-1] + spacing)
+
+    def add_track(self, pane, x, values, **kwargs):
+        track = QtTrack(pane, x, values, live=False, **kwargs)
+        self.tracks.append(track)
+        self.group.add(track)
+
+    def calculate_rsi(self, prices, period=14):
+        return indicators.cached(self.cache, self.series, indicators.rsi, prices, period=period)
+
+    def calculate_macd(self, prices, fast=12, slow=26, signal=9):
+        return indicators.cached(self.cache, self.series, indicators.macd, prices,
+                                 fast=fast, slow=slow, signal=signal)
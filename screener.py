@@ -0,0 +1,366 @@
+"""
+SR TRADE - Market Screener
+Evaluates indicator rules over cached bars for many symbols in parallel.
+
+Rules are small boolean expressions over the columns of
+indicators.compute_batch(), evaluated at each symbol's latest bar:
+
+    rsi < 30 and macd crosses_above macd_signal
+    close > sma_200 and (change_pct >= 2 or rsi > 70)
+
+Operands are numbers or indicator names (close, change_pct, rsi, macd,
+macd_signal, macd_hist, sma_N, ema_N). Comparisons are <, <=, >, >=, ==,
+!= and crosses_above / crosses_below, which compare the last two bars.
+Combine them with and, or, not and parentheses.
+"""
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import indicators
+
+SHARD_SIZE = 64
+
+# Bars loaded per symbol when the rule needs no more: enough for sma_200
+# and for ema_50, rsi and macd to settle
+HISTORY_LENGTH = 250
+# Periods of history an ema_N gets before its value is used; bars older
+# than that weigh under 1e-4 in it
+EMA_WARMUP = 5
+
+BASE_COLUMNS = ('close', 'change_pct', 'rsi', 'macd', 'macd_signal', 'macd_hist')
+MA_COLUMN = re.compile(r'^(sma|ema)_(\d+)$')
+
+COMPARISONS = ('<=', '>=', '==', '!=', '<', '>', 'crosses_above', 'crosses_below')
+
+TOKEN = re.compile(r'\s*(?:(\d+(?:\.\d*)?|\.\d+)|(<=|>=|==|!=|<|>|\(|\))|([A-Za-z_]\w*))')
+
+
+# ============================================
+# RULE LANGUAGE
+# ============================================
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unexpected character in rule at: {text[pos:pos + 10]!r}")
+        number, symbol, name = match.groups()
+        if number is not None:
+            tokens.append(('number', float(number)))
+        elif symbol is not None:
+            tokens.append(('op', symbol))
+        else:
+            word = name.lower()
+            tokens.append(('op', word) if word in ('and', 'or', 'not') + COMPARISONS
+                          else ('name', word))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser producing nested tuples (picklable ASTs)."""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Rule is empty")
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.pos][1]!r} in rule")
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        kind, token = self.peek()
+        if kind is None:
+            raise ValueError("Rule ends unexpectedly")
+        if value is not None and token != value:
+            raise ValueError(f"Expected {value!r} but found {token!r}")
+        self.pos += 1
+        return kind, token
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ('op', 'or'):
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() == ('op', 'and'):
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == ('op', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek() == ('op', '('):
+            self.take()
+            node = self.parse_or()
+            self.take(')')
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_operand()
+        kind, op = self.take()
+        if kind != 'op' or op not in COMPARISONS:
+            raise ValueError(f"Expected a comparison after {left[1]!r}, found {op!r}")
+        return ('compare', op, left, self.parse_operand())
+
+    def parse_operand(self):
+        kind, token = self.take()
+        if kind == 'number':
+            return ('number', token)
+        if kind == 'name':
+            if token not in BASE_COLUMNS and not MA_COLUMN.match(token):
+                raise ValueError(f"Unknown indicator {token!r}")
+            return ('name', token)
+        raise ValueError(f"Expected a number or indicator, found {token!r}")
+
+
+def parse_rule(text):
+    return Parser(text).parse()
+
+
+def rule_names(node):
+    """All indicator names used by a parsed rule."""
+    if node[0] == 'name':
+        return {node[1]}
+    if node[0] == 'number':
+        return set()
+    if node[0] == 'compare':
+        return rule_names(node[2]) | rule_names(node[3])
+    return set().union(*(rule_names(child) for child in node[1:]))
+
+
+def ma_periods(node):
+    return tuple(sorted({int(MA_COLUMN.match(name).group(2))
+                         for name in rule_names(node) if MA_COLUMN.match(name)}))
+
+
+def history_length(node, minimum=HISTORY_LENGTH):
+    """
+    Bars per symbol the rule needs at its last two bars (for crosses_*).
+
+    An sma_N needs N + 1 bars, an ema_N EMA_WARMUP periods; shorter
+    histories would leave long averages NaN and the rule matching nothing.
+    """
+    length = minimum
+    for name in rule_names(node):
+        match = MA_COLUMN.match(name)
+        if match:
+            kind, period = match.group(1), int(match.group(2))
+            length = max(length, period + 1 if kind == 'sma' else period * EMA_WARMUP)
+    return length
+
+
+def evaluate(node, batch):
+    """Boolean mask over batch.symbols; NaN comparisons are False."""
+    kind = node[0]
+    if kind == 'and':
+        return evaluate(node[1], batch) & evaluate(node[2], batch)
+    if kind == 'or':
+        return evaluate(node[1], batch) | evaluate(node[2], batch)
+    if kind == 'not':
+        return ~evaluate(node[1], batch)
+
+    _, op, left, right = node
+    if op in ('crosses_above', 'crosses_below'):
+        a_prev, a_last = operand_values(left, batch, 2)
+        b_prev, b_last = operand_values(right, batch, 2)
+        if op == 'crosses_above':
+            return (a_prev <= b_prev) & (a_last > b_last)
+        return (a_prev >= b_prev) & (a_last < b_last)
+
+    a = operand_values(left, batch, 1)[-1]
+    b = operand_values(right, batch, 1)[-1]
+    with np.errstate(invalid='ignore'):
+        return {
+            '<': np.less, '<=': np.less_equal, '>': np.greater,
+            '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal,
+        }[op](a, b)
+
+
+def operand_values(node, batch, bars):
+    """The operand at each symbol's last `bars` bars, oldest first."""
+    if node[0] == 'number':
+        return [np.full(len(batch), node[1])] * bars
+    values = batch.full[node[1]]
+    width = values.shape[1]
+    return [values[:, width - bars + i] if width >= bars - i else np.full(len(batch), np.nan)
+            for i in range(bars)]
+
+
+# ============================================
+# SHARD WORKERS
+# ============================================
+_store = None
+
+
+def init_worker(db_path):
+    """Runs once in each pool process: open its own read-only store."""
+    global _store
+    from bar_store import BarStore
+    from database import DatabaseManager
+
+    _store = BarStore(DatabaseManager(db_path, read_only=True))
+
+
+def screen_shard(symbols, interval, length, rule, store=None):
+    """
+    Screen one shard of symbols; returns (matches, timings).
+
+    matches is a list of (symbol, {column: latest value}); timings holds
+    the seconds spent loading bars, computing indicators and evaluating.
+    """
+    store = store or _store
+    timings = {}
+
+    start = time.perf_counter()
+    closes = indicators.stack_series(
+        [store.tail(symbol, interval, length).close for symbol in symbols], length)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = indicators.compute_batch(symbols, closes, ma_periods=ma_periods(rule))
+    timings['compute'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = [(batch.symbols[i], {name: float(values[i]) for name, values in batch.latest.items()})
+               for i in np.flatnonzero(evaluate(rule, batch))]
+    timings['evaluate'] = time.perf_counter() - start
+    return matches, timings
+
+
+# ============================================
+# SCREENER
+# ============================================
+class ScreenStats:
+    """Per-stage timings of one screen, in seconds."""
+
+    STAGES = ('parse', 'load', 'compute', 'evaluate')
+
+    def __init__(self):
+        self.stages = dict.fromkeys(self.STAGES, 0.)
+        self.wall = 0.
+        self.symbols = 0
+        self.shards = 0
+        self.matches = 0
+
+    def add(self, timings):
+        for stage, seconds in timings.items():
+            self.stages[stage] += seconds
+
+    def summary(self):
+        stages = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in self.stages.items())
+        return (f"{self.matches} of {self.symbols} symbols matched in "
+                f"{self.wall * 1000:.0f} ms ({self.shards} shards; {stages})")
+
+
+class Screener:
+    """
+    Runs rules over the bar store, sharding symbols across processes.
+
+    Load/compute/evaluate times are summed over shards (CPU time across
+    processes); `wall` is the elapsed time of the whole screen. Screens of
+    a single shard run in the calling process and skip the pool. `length`
+    is the least history loaded per symbol; rules on longer averages load
+    what they need (see history_length).
+    """
+
+    def __init__(self, bar_store, processes=None, shard_size=SHARD_SIZE, length=HISTORY_LENGTH):
+        self.bar_store = bar_store
+        self.processes = processes or os.cpu_count() or 2
+        self.shard_size = shard_size
+        self.length = length
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            # spawn: never fork a process that is running Qt threads
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(self.bar_store.db.db_path,),
+            )
+        return self.pool
+
+    def warm(self):
+        """Start the worker processes now instead of on the first screen."""
+        pool = self.get_pool()
+        for future in [pool.submit(time.sleep, 0) for _ in range(self.processes)]:
+            future.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def universe(self, interval='1d'):
+        """Every symbol with cached bars for interval."""
+        return [symbol for symbol, series_interval in self.bar_store.series()
+                if series_interval == interval]
+
+    def run(self, rule, symbols, interval='1d', on_match=None, token=None):
+        """
+        Screen symbols; returns (matches, stats).
+
+        on_match(symbol, values) is called for every match as soon as its
+        shard completes, so results can be shown before the screen ends.
+        """
+        stats = ScreenStats()
+        started = time.perf_counter()
+
+        node = parse_rule(rule) if isinstance(rule, str) else rule
+        length = history_length(node, self.length)
+        stats.stages['parse'] = time.perf_counter() - started
+
+        symbols = list(dict.fromkeys(symbols))
+        shards = [symbols[i:i + self.shard_size] for i in range(0, len(symbols), self.shard_size)]
+        stats.symbols, stats.shards = len(symbols), len(shards)
+
+        matches = []
+
+        def collect(shard_matches, timings):
+            stats.add(timings)
+            for symbol, values in shard_matches:
+                matches.append((symbol, values))
+                if on_match is not None:
+                    on_match(symbol, values)
+
+        if len(shards) <= 1:
+            for shard in shards:
+                collect(*screen_shard(shard, interval, length, node, self.bar_store))
+        else:
+            pool = self.get_pool()
+            futures = [pool.submit(screen_shard, shard, interval, length, node)
+                       for shard in shards]
+            try:
+                for future in as_completed(futures):
+                    if token is not None:
+                        token.check()
+                    collect(*future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        stats.matches = len(matches)
+        stats.wall = time.perf_counter() - started
+        return matches, stats
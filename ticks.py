@@ -0,0 +1,198 @@
+"""
+SR TRADE - Tick Hub
+Fans live ticks out from feeds to any number of subscribers, without Qt.
+
+Feeds call TickHub.publish() from their own threads. Each symbol has one
+slot holding its latest tick, a publish counter and the volume traded
+so far; publishing overwrites the slot and bumps the counter, with no
+lock and no queue. Subscribers poll at their own pace: a poll compares
+the counters of its symbols with the ones it saw last time (one numpy
+comparison) and returns only the symbols that moved, each conflated to
+its latest price plus the volume traded since. However fast ticks come
+in, a subscriber sees at most one update per symbol per poll.
+
+SimulatedFeed publishes random-walk ticks for testing and benchmarks.
+"""
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Default delivery rate for GUI subscribers
+UPDATE_INTERVAL_MS = 100
+
+# Slots are allocated in blocks that never move, so a publisher never
+# writes into an array that is being copied
+BLOCK_BITS = 10
+BLOCK_SIZE = 1 << BLOCK_BITS
+
+
+class Tick(NamedTuple):
+    symbol: str
+    price: float
+    volume: float  # traded in this tick; in a poll's results, since the last poll
+    time: int      # ns since epoch, UTC
+
+
+class TickHub:
+    """Latest-value slots per symbol, written by feeds and polled by subscriptions."""
+
+    def __init__(self):
+        self.slots = {}      # symbol -> slot index
+        self.symbols = []
+        self.ticks = []      # latest Tick per slot
+        self.versions = []   # int64 blocks: ticks published per slot
+        self.volumes = []    # float64 blocks: volume published per slot
+        self._lock = threading.Lock()  # only taken to add a slot
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def slot(self, symbol):
+        index = self.slots.get(symbol)
+        if index is not None:
+            return index
+        with self._lock:
+            index = self.slots.get(symbol)
+            if index is None:
+                index = len(self.symbols)
+                if index & (BLOCK_SIZE - 1) == 0:
+                    self.versions.append(np.zeros(BLOCK_SIZE, dtype=np.int64))
+                    self.volumes.append(np.zeros(BLOCK_SIZE, dtype=np.float64))
+                self.ticks.append(None)
+                self.symbols.append(symbol)
+                # Made visible last: lock-free readers find a complete slot
+                self.slots[symbol] = index
+            return index
+
+    def publish(self, tick):
+        index = self.slot(tick.symbol)
+        block, offset = index >> BLOCK_BITS, index & (BLOCK_SIZE - 1)
+        # The tick is in place before the counter says there is one
+        self.ticks[index] = tick
+        self.volumes[block][offset] += tick.volume
+        self.versions[block][offset] += 1
+
+    def latest(self, symbol):
+        index = self.slots.get(symbol)
+        return None if index is None else self.ticks[index]
+
+    def counters(self, count):
+        """(versions, volumes) of the first `count` slots as flat arrays."""
+        blocks = -(-count >> BLOCK_BITS)
+        return (np.concatenate(self.versions[:blocks])[:count] if blocks else np.empty(0, np.int64),
+                np.concatenate(self.volumes[:blocks])[:count] if blocks else np.empty(0))
+
+    def subscribe(self, symbols=None):
+        """A Subscription to `symbols`, or to every symbol published if None."""
+        return Subscription(self, symbols)
+
+
+class Subscription:
+    """What one subscriber has seen of a TickHub; poll() returns what is new."""
+
+    def __init__(self, hub, symbols=None):
+        self.hub = hub
+        self.set_symbols(symbols)
+
+    def set_symbols(self, symbols):
+        self.all = symbols is None
+        if self.all:
+            self.indices = np.empty(0, dtype=np.intp)
+        else:
+            self.indices = np.array([self.hub.slot(symbol) for symbol in symbols], dtype=np.intp)
+        # Ticks published before subscribing count as new: the first poll
+        # returns the current price of every symbol that has one
+        self.seen = np.zeros(len(self.indices), dtype=np.int64)
+        self.seen_volume = np.zeros(len(self.indices))
+
+    def poll(self):
+        """The latest Tick of each symbol published since the last poll."""
+        hub = self.hub
+        if self.all:
+            count = len(hub)
+            grown = count - len(self.indices)
+            if grown:
+                self.indices = np.arange(count, dtype=np.intp)
+                self.seen = np.append(self.seen, np.zeros(grown, dtype=np.int64))
+                self.seen_volume = np.append(self.seen_volume, np.zeros(grown))
+            versions, volumes = hub.counters(count)
+        else:
+            versions, volumes = hub.counters(len(hub))
+            versions, volumes = versions[self.indices], volumes[self.indices]
+
+        changed = np.flatnonzero(versions != self.seen)
+        if not len(changed):
+            return []
+        traded = volumes[changed] - self.seen_volume[changed]
+        self.seen[changed] = versions[changed]
+        self.seen_volume[changed] = volumes[changed]
+        ticks = hub.ticks
+        return [ticks[index]._replace(volume=volume)
+                for index, volume in zip(self.indices[changed].tolist(), traded.tolist())]
+
+
+# ============================================
+# SIMULATED FEED
+# ============================================
+class SimulatedFeed:
+    """
+    Random-walk ticks for `prices` ({symbol: starting price}) on a thread.
+
+    About `rate` ticks per second spread over the symbols, published in
+    small batches; rate=None publishes as fast as the hub accepts them.
+    """
+
+    BATCH_SECONDS = 0.01
+
+    def __init__(self, hub, prices, rate=1000, volatility=0.0005, seed=None):
+        self.hub = hub
+        self.symbols = list(prices)
+        self.prices = np.array([prices[symbol] for symbol in self.symbols], dtype=float)
+        self.rate = rate
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+        self.published = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="SimulatedFeed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def batch(self, count):
+        """Publish `count` ticks on randomly chosen symbols."""
+        picks = self.rng.integers(len(self.symbols), size=count)
+        moves = np.exp(self.rng.normal(0.0, self.volatility, count))
+        sizes = self.rng.integers(1, 500, size=count).astype(float)
+        now = time.time_ns()
+        publish, symbols, prices = self.hub.publish, self.symbols, self.prices
+        for pick, move, size in zip(picks.tolist(), moves.tolist(), sizes.tolist()):
+            prices[pick] *= move
+            publish(Tick(symbols[pick], round(float(prices[pick]), 2), size, now))
+        self.published += count
+
+    def run(self):
+        if not self.symbols:
+            return
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            if self.rate is None:
+                self.batch(1000)
+                continue
+            self._stop.wait(self.BATCH_SECONDS)
+            now = time.perf_counter()
+            # Carry the fraction over so the long-run rate is exact
+            due = (now - last) * self.rate
+            count = int(due)
+            last = now - (due - count) / self.rate
+            if count:
+                self.batch(count)
@@ -0,0 +1,390 @@
+"""
+SR TRADE - Trade Import
+Bulk loads trades from CSV / broker tradebook files or .srtc exports.
+
+Files are parsed IMPORT_CHUNK_SIZE rows at a time. Each chunk is
+normalized with column-wise pandas operations, then written with one
+executemany inside one transaction. A trade is skipped when the journal
+already held one with the same natural key (user, time, symbol, side,
+quantity and price) before the import started, so importing the same
+file twice adds nothing the second time. Keys are counted: two identical
+fills in a file are two trades, and skipped only if the journal already
+has two. The keys already stored over a chunk's time span are read from
+idx_trades_natural_key in one range scan and anti-joined with the chunk,
+rather than probed row by row.
+
+A file without a trade date column is dated at the time of the import,
+so importing it again cannot recognise its trades and adds them again.
+"""
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import export
+
+IMPORT_CHUNK_SIZE = 50_000
+
+# Normalized header -> trades column. Covers our own exports and the
+# usual names in broker tradebooks.
+COLUMN_ALIASES = {
+    'symbol': 'symbol', 'tradingsymbol': 'symbol', 'trading symbol': 'symbol',
+    'ticker': 'symbol', 'scrip': 'symbol', 'instrument': 'symbol',
+    'type': 'trade_type', 'trade type': 'trade_type', 'side': 'trade_type',
+    'buy/sell': 'trade_type', 'transaction type': 'trade_type', 'action': 'trade_type',
+    'quantity': 'quantity', 'qty': 'quantity', 'filled qty': 'quantity',
+    'entry price': 'entry_price', 'price': 'entry_price', 'trade price': 'entry_price',
+    'avg price': 'entry_price', 'average price': 'entry_price',
+    'exit price': 'exit_price',
+    'stop loss': 'stop_loss', 'sl': 'stop_loss',
+    'target': 'target_price', 'target price': 'target_price',
+    'trade date': 'trade_date', 'date': 'trade_date', 'time': 'trade_date',
+    'datetime': 'trade_date', 'timestamp': 'trade_date', 'order execution time': 'trade_date',
+    'exit date': 'exit_date',
+    'expiry': 'expiry_date', 'expiry date': 'expiry_date',
+    'strike': 'strike_price', 'strike price': 'strike_price',
+    'option type': 'option_type',
+    'strategy': 'strategy',
+    'notes': 'notes', 'remarks': 'notes',
+    'status': 'status',
+    'p&l': 'pnl', 'pnl': 'pnl', 'realized p&l': 'pnl',
+}
+
+REQUIRED = ('symbol', 'quantity', 'entry_price')
+
+SIDES = {'BUY': 'BUY', 'B': 'BUY', 'LONG': 'BUY', 'SELL': 'SELL', 'S': 'SELL', 'SHORT': 'SELL'}
+OPTION_TYPES = {'CE': 'CE', 'CALL': 'CE', 'C': 'CE', 'PE': 'PE', 'PUT': 'PE', 'P': 'PE'}
+
+INSERT_COLUMNS = ('user_id', 'symbol', 'trade_type', 'quantity', 'entry_price', 'exit_price',
+                  'stop_loss', 'target_price', 'trade_date', 'exit_date', 'expiry_date',
+                  'strike_price', 'option_type', 'strategy', 'notes', 'status', 'pnl')
+
+INSERT_TRADE = (f"INSERT INTO trades ({', '.join(INSERT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(INSERT_COLUMNS))})")
+
+# Two trades with the same natural key are the same trade
+NATURAL_KEY = ('trade_date', 'symbol', 'trade_type', 'quantity', 'entry_price')
+
+# Covered by idx_trades_natural_key (id is the rowid every index
+# carries): an index-only range scan. Rows after id `last_id` were added
+# by the import itself.
+EXISTING_KEYS = f'''
+    SELECT {", ".join(NATURAL_KEY)} FROM trades
+    WHERE user_id = ? AND trade_date BETWEEN ? AND ? AND id <= ?
+'''
+
+LAST_ID = "SELECT COALESCE(MAX(id), 0) FROM trades"
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The start of all-numeric dates such as 02/01/2024 or 2-1-24 09:15: day
+# and month in either order, then the year
+NUMERIC_DATE = re.compile(r'\s*(\d{1,2})[/.-](\d{1,2})[/.-]\d')
+
+# Indian broker tradebooks write the day first
+DAYFIRST = True
+
+MAX_ERRORS = 20
+
+
+class ImportResult:
+    """Row counts of one import and the first few rejected rows."""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.undated = 0
+        self.errors = []
+        self.dayfirst = None  # day/month order of the file's numeric dates, once known
+
+    def reject(self, lines, reason):
+        self.rejected += len(lines)
+        for line in lines[:MAX_ERRORS - len(self.errors)]:
+            self.errors.append(f"Row {line}: {reason}")
+
+    def summary(self):
+        text = (f"{self.inserted:,} trades imported, {self.duplicates:,} duplicates skipped, "
+                f"{self.rejected:,} rows rejected")
+        if self.undated:
+            text += (f"\n{self.undated:,} rows had no trade date and were dated now; "
+                     f"importing them again will add them again")
+        return text
+
+
+def header_key(name):
+    return " ".join(str(name).lower().replace('_', ' ').split())
+
+
+def read_chunks(path, chunk_size=IMPORT_CHUNK_SIZE):
+    """Yield (DataFrame, fraction of the file read) chunks of a trade file."""
+    size = max(os.path.getsize(path), 1)
+    if path.endswith('.srtc'):
+        # Chunks as the exporter wrote them
+        with open(path, 'rb') as file:
+            for chunk in export.read_columnar(file):
+                yield chunk, min(file.tell() / size, 1.0)
+        return
+
+    with open(path, 'r', newline='', encoding='utf-8-sig') as file:
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                                 skipinitialspace=True):
+            yield chunk, min(file.tell() / size, 1.0)
+
+
+# ============================================
+# NORMALIZATION
+# ============================================
+def parse_dates(values, dayfirst=None):
+    """
+    Strings to DATE_FORMAT text; returns (text, ambiguous, dayfirst).
+
+    Blank or unparseable values become None. Numeric dates are read in
+    the `dayfirst` order, and a value that only reads the other way is
+    unparseable. With dayfirst None the order comes from the column: a
+    first number over 12 means day first, a second one over 12 month
+    first, and with neither it is DAYFIRST. A column showing both orders
+    mixes them; its values that read either way are flagged `ambiguous`
+    and left None rather than guessed. The returned dayfirst is the
+    order the column settled on, or None if it did not.
+    """
+    values = values.astype(object)
+    first, second = date_fields(values)
+    numeric = ~np.isnan(first)
+    ambiguous = np.zeros(len(values), dtype=bool)
+    day_first = np.full(len(values), DAYFIRST if dayfirst is None else dayfirst)
+    if dayfirst is None and numeric.any():
+        day_seen, month_seen = (first > 12).any(), (second > 12).any()
+        if day_seen and month_seen:
+            day_first = first > 12
+            ambiguous = numeric & (first <= 12) & (second <= 12)
+        elif day_seen or month_seen:
+            dayfirst = bool(day_seen)
+            day_first[:] = dayfirst
+
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for order in (True, False):
+        fill_dates(dates, values, numeric & ~ambiguous & (day_first == order), order)
+    fill_dates(dates, values, ~numeric, False)
+    # Numeric dates only in their own order: pandas would swap day and
+    # month where that is the only reading
+    day = np.where(day_first, first, second)
+    month = np.where(day_first, second, first)
+    swapped = numeric & ((dates.dt.day != day) | (dates.dt.month != month)).to_numpy()
+    dates[swapped] = pd.NaT
+
+    text = dates.dt.strftime(DATE_FORMAT)
+    return text.astype(object).where(dates.notna(), None), ambiguous, dayfirst
+
+
+def date_fields(values):
+    """
+    The first two numbers of each all-numeric date, NaN for other values.
+
+    Read from each value's first characters; those repeat, so each
+    distinct prefix is matched once.
+    """
+    codes, prefixes = pd.factorize(values.astype(str).str[:7])
+    fields = [NUMERIC_DATE.match(prefix) for prefix in prefixes]
+    fields = np.array([match.groups() if match else (np.nan, np.nan) for match in fields]
+                      + [(np.nan, np.nan)], dtype=np.float64)
+    return fields[codes, 0], fields[codes, 1]
+
+
+def fill_dates(dates, values, rows, dayfirst):
+    """Parse values[rows] into dates: in one format when they share it, else one by one."""
+    if not rows.any():
+        return
+    subset = values[rows]
+    parsed = pd.to_datetime(subset, errors='coerce', dayfirst=dayfirst)
+    retry = parsed.isna() & subset.notna() & (subset != "")
+    if retry.any():
+        # A mix of formats: parse the stragglers one by one
+        parsed[retry] = pd.to_datetime(subset[retry], errors='coerce', format='mixed',
+                                       dayfirst=dayfirst)
+    dates[rows] = parsed
+
+
+def numbers(values):
+    """Numeric column; thousands separators are allowed, anything else is NaN."""
+    parsed = pd.to_numeric(values, errors='coerce').astype(float)
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        cleaned = values[retry].astype(str).str.replace(',', '', regex=False).str.strip()
+        parsed[retry] = pd.to_numeric(cleaned, errors='coerce')
+    return parsed
+
+
+def texts(values, clean=None):
+    """
+    Stripped text column with blanks as None, optionally mapped by clean().
+
+    Work is done once per distinct value: trade files repeat the same
+    symbols, sides and strategies over and over.
+    """
+    codes, uniques = pd.factorize(values)
+    cleaned = [str(value).strip() for value in uniques]
+    cleaned = [(clean(value) if clean else value) if value else None for value in cleaned]
+    # code -1 (missing) picks the trailing None
+    cleaned = np.array(cleaned + [None], dtype=object)
+    return pd.Series(cleaned[codes], index=values.index, dtype=object)
+
+
+def normalize(chunk, user_id, first_line, result, now):
+    """
+    Map one raw chunk onto INSERT_COLUMNS.
+
+    Returns a DataFrame of valid rows; invalid ones are counted in
+    `result` with their file line numbers.
+    """
+    columns = {}
+    for name in chunk.columns:
+        column = COLUMN_ALIASES.get(header_key(name))
+        if column is not None and column not in columns:
+            columns[column] = chunk[name]
+    missing = [name for name in REQUIRED if name not in columns]
+    if missing:
+        raise ValueError(f"Import file has no {', '.join(missing)} column")
+
+    n = len(chunk)
+    lines = np.arange(first_line, first_line + n)
+    out = pd.DataFrame(index=chunk.index)
+    out['user_id'] = user_id
+    out['symbol'] = texts(columns['symbol'], str.upper)
+
+    quantity = numbers(columns['quantity'])
+    if 'trade_type' in columns:
+        out['trade_type'] = texts(columns['trade_type'], lambda side: SIDES.get(side.upper()))
+    else:
+        # Signed quantities give the side
+        out['trade_type'] = np.where(quantity < 0, 'SELL', 'BUY')
+    out['quantity'] = quantity.abs()
+
+    for column in ('entry_price', 'exit_price', 'stop_loss', 'target_price', 'strike_price', 'pnl'):
+        out[column] = numbers(columns[column]) if column in columns else np.nan
+    for column in ('strategy', 'notes'):
+        out[column] = texts(columns[column]) if column in columns else None
+    ambiguous = {}
+    for column in ('trade_date', 'exit_date', 'expiry_date'):
+        if column in columns:
+            out[column], ambiguous[column], result.dayfirst = parse_dates(columns[column],
+                                                                          result.dayfirst)
+        else:
+            out[column] = None
+    out['option_type'] = (texts(columns['option_type'], lambda kind: OPTION_TYPES.get(kind.upper()))
+                          if 'option_type' in columns else None)
+
+    if 'trade_date' not in columns:
+        out['trade_date'] = now
+        result.undated += n
+
+    closed = out['exit_price'].notna()
+    if 'status' in columns:
+        status = texts(columns['status'], str.upper)
+        out['status'] = status.where(status.isin(['OPEN', 'CLOSED']),
+                                     pd.Series(np.where(closed, 'CLOSED', 'OPEN'), index=out.index))
+    else:
+        out['status'] = np.where(closed, 'CLOSED', 'OPEN')
+    sign = np.where(out['trade_type'] == 'SELL', -1.0, 1.0)
+    computed = (out['exit_price'] - out['entry_price']) * out['quantity'] * sign
+    out['pnl'] = out['pnl'].fillna(computed.where(closed)).fillna(0.0)
+
+    checks = [
+        (out['symbol'].isna(), "missing symbol"),
+        (out['trade_type'].isna(), "unknown trade type"),
+        (~(out['quantity'] > 0) | (out['quantity'] % 1 != 0),
+         "quantity must be a positive whole number"),
+        (~(out['entry_price'] > 0), "entry price must be positive"),
+        *((mask, f"ambiguous {column.replace('_', ' ')}: the file has both day-first and "
+                 f"month-first dates") for column, mask in ambiguous.items()),
+        (out['trade_date'].isna(), "unreadable trade date"),
+    ]
+    bad = np.zeros(n, dtype=bool)
+    for mask, reason in checks:
+        mask = np.asarray(mask) & ~bad
+        if mask.any():
+            result.reject(lines[mask].tolist(), reason)
+            bad |= mask
+
+    out = out[~bad]
+    out['quantity'] = out['quantity'].astype(np.int64)
+    return out[list(INSERT_COLUMNS)]
+
+
+def drop_existing(conn, user_id, frame, last_id):
+    """
+    Rows of frame not already in the journal up to id last_id.
+
+    Keys are matched as a multiset: the n-th row of frame with a key is
+    dropped only if the journal holds at least n trades with that key.
+    """
+    if frame.empty:
+        return frame
+    key = list(NATURAL_KEY)
+    existing = pd.DataFrame(
+        conn.execute(EXISTING_KEYS, (user_id, frame['trade_date'].min(),
+                                     frame['trade_date'].max(), last_id)).fetchall(),
+        columns=key)
+    if existing.empty:
+        return frame
+    existing['quantity'] = existing['quantity'].astype(np.int64)
+    existing['entry_price'] = existing['entry_price'].astype(float)
+    stored = existing.groupby(key).size().rename('stored').reset_index()
+    occurrence = frame[key].assign(occurrence=frame.groupby(key).cumcount().to_numpy())
+    merged = occurrence.merge(stored, on=key, how='left')
+    return frame[~(merged['occurrence'] < merged['stored']).to_numpy()]
+
+
+def sql_rows(frame):
+    """Rows for executemany, with NaN turned into NULL."""
+    columns = []
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if values.dtype.kind == 'f':
+            missing = np.isnan(values)
+            values = values.astype(object)
+            values[missing] = None
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+# ============================================
+# IMPORT
+# ============================================
+def import_trades(db, user_id, path, chunk_size=IMPORT_CHUNK_SIZE, token=None, progress=None,
+                  dayfirst=None):
+    """
+    Import a trade file for user_id; returns an ImportResult.
+
+    dayfirst fixes the day/month order of numeric dates such as
+    02/01/2024; by default it is worked out from the file (see
+    parse_dates) and kept for the rest of the file once known.
+
+    Each chunk commits on its own: cancelling keeps the chunks already
+    imported, and importing the file again skips them as duplicates.
+    """
+    result = ImportResult()
+    result.dayfirst = dayfirst
+    now = datetime.now().strftime(DATE_FORMAT)
+    # Trades after this one are the import's own, never its duplicates
+    last_id = db.execute_query(LAST_ID)[0][0]
+    line = 2  # first data row, after the header
+    for chunk, fraction in read_chunks(path, chunk_size):
+        if token is not None:
+            token.check()
+        rows = normalize(chunk, user_id, line, result, now)
+        line += len(chunk)
+        result.read += len(chunk)
+
+        with db.bulk_insert() as conn:
+            new = drop_existing(conn, user_id, rows, last_id)
+            conn.executemany(INSERT_TRADE, sql_rows(new))
+        result.inserted += len(new)
+        result.duplicates += len(rows) - len(new)
+
+        if progress is not None:
+            progress(int(fraction * 100), f"Imported {result.inserted:,} of {result.read:,} rows")
+    return result
@@ -0,0 +1,364 @@
+"""
+SR TRADE - Background Workers
+Runs blocking work (network, parsing, cache writes) on a QThreadPool and
+reports back to the GUI thread through signals.
+"""
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+import export
+import indicators
+import ticks
+import trade_import
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """Block up to `timeout` seconds or until cancel(); True if cancelled."""
+        return self._event.wait(timeout)
+
+    def check(self):
+        """Raise Cancelled if cancel() was called; call between stages."""
+        if self._event.is_set():
+            raise Cancelled()
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int, str)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """
+    Runs fn(*args, token=..., progress=..., **kwargs) on a pool thread.
+
+    `progress(percent, message)` may be called from fn. Nothing but
+    `finished` is emitted once the worker has been cancelled.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.token = CancelToken()
+        self.signals = WorkerSignals()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def report(self, percent, message=""):
+        if not self.token.cancelled:
+            self.signals.progress.emit(percent, message)
+
+    def run(self):
+        try:
+            self.token.check()
+            result = self.fn(*self.args, token=self.token, progress=self.report, **self.kwargs)
+        except Cancelled:
+            pass
+        except Exception as e:
+            if not self.token.cancelled:
+                self.signals.error.emit(str(e))
+        else:
+            if not self.token.cancelled:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class LatestRequestWorker(QObject):
+    """
+    Runs one kind of job on the pool, where only the latest request counts.
+
+    request(*args, **kwargs) cancels the job before it and runs
+    work(*args, token=..., progress=..., **kwargs) on a pool thread.
+    Progress, results and errors that still arrive from a superseded job
+    are dropped. The rest go to on_progress / on_result / on_error, which
+    get the request's positional args first and by default emit the
+    subclass's `progress(percent, message)`, `finished(result)` and
+    `failed(error)` signals.
+    """
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.current = None
+
+    def request(self, *args, **kwargs):
+        self.cancel()
+
+        worker = Worker(self.work, *args, **kwargs)
+        worker.signals.progress.connect(
+            lambda percent, message, w=worker: self.relay(w, False, self.on_progress,
+                                                          args, percent, message))
+        worker.signals.result.connect(
+            lambda result, w=worker: self.relay(w, True, self.on_result, args, result))
+        worker.signals.error.connect(
+            lambda error, w=worker: self.relay(w, True, self.on_error, args, error))
+
+        self.current = worker
+        self.pool.start(worker)
+        return worker
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.cancel()
+            self.current = None
+
+    def work(self, *args, token, progress, **kwargs):
+        raise NotImplementedError
+
+    def relay(self, worker, done, handler, args, *values):
+        if worker is self.current:
+            if done:
+                self.current = None
+            handler(args, *values)
+
+    def on_progress(self, args, percent, message):
+        self.progress.emit(percent, message)
+
+    def on_result(self, args, result):
+        self.finished.emit(result)
+
+    def on_error(self, args, error):
+        self.failed.emit(error)
+
+
+# ============================================
+# MARKET DATA
+# ============================================
+class MarketDataWorker(LatestRequestWorker):
+    """
+    Loads (and optionally downloads) chart bars off the GUI thread.
+
+    request(symbol, interval, download=False). Flicking through symbols
+    never paints a stale chart: only the latest request is reported.
+    """
+
+    progress = pyqtSignal(str, int, str)  # symbol, percent, message
+    # symbol, interval, DataFrame, new bars (None if not downloaded), data version
+    loaded = pyqtSignal(str, str, object, object, int)
+    failed = pyqtSignal(str, str)  # symbol, error
+
+    def __init__(self, downloader, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.downloader = downloader
+        self.bar_store = downloader.bar_store
+
+    def work(self, symbol, interval, download=False, *, token, progress):
+        fetched = None
+        if download:
+            progress(10, f"Downloading {symbol} ({interval})...")
+            fetched = self.downloader.refresh(symbol, interval, token=token)
+        token.check()
+
+        progress(80, f"Loading {symbol} ({interval})...")
+        # One snapshot: indicator results cached under this version are
+        # computed from exactly these bars
+        bars, version = self.bar_store.read_versioned(symbol, interval)
+        df = bars.to_frame()
+        progress(100, f"{symbol} ({interval}) ready")
+        return symbol, interval, df, fetched, version
+
+    def on_progress(self, args, percent, message):
+        self.progress.emit(args[0], percent, message)
+
+    def on_result(self, args, result):
+        self.loaded.emit(*result)
+
+    def on_error(self, args, error):
+        self.failed.emit(args[0], error)
+
+
+class QuoteBatchWorker(LatestRequestWorker):
+    """
+    Runs a BatchFetcher on the pool and streams quotes back one by one.
+
+    request(symbols, interval='1d'). A new batch cancels the running one;
+    its remaining symbols are skipped and nothing more is reported from it.
+    """
+
+    quote_ready = pyqtSignal(object)     # market_data.Quote
+    symbol_failed = pyqtSignal(str, str)  # symbol, error
+    finished = pyqtSignal(int)           # number of quotes received
+    failed = pyqtSignal(str)
+
+    def __init__(self, fetcher, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.fetcher = fetcher
+
+    def work(self, symbols, interval='1d', *, token, progress):
+        def on_result(quote):
+            # Emitted from a pool thread; Qt queues it to the GUI thread
+            if not token.cancelled:
+                self.quote_ready.emit(quote)
+
+        def on_error(symbol, error):
+            if not token.cancelled:
+                self.symbol_failed.emit(symbol, str(error))
+
+        return self.fetcher.fetch(symbols, interval, on_result=on_result,
+                                  on_error=on_error, token=token)
+
+    def on_result(self, args, quotes):
+        self.finished.emit(len(quotes))
+
+
+class IndicatorBatchWorker(LatestRequestWorker):
+    """
+    Reads many symbols' bars and computes their indicators on the pool.
+
+    request(symbols, interval='1d') runs indicators.load_batch().
+    """
+
+    finished = pyqtSignal(object)  # indicators.BatchIndicators
+    failed = pyqtSignal(str)
+
+    def __init__(self, bar_store, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.bar_store = bar_store
+
+    def work(self, symbols, interval='1d', *, token, progress):
+        return indicators.load_batch(self.bar_store, symbols, interval)
+
+
+# ============================================
+# SCREENER
+# ============================================
+class ScreenerWorker(LatestRequestWorker):
+    """
+    Runs a screener.Screener on the pool and streams matches as shards finish.
+
+    request(rule, symbols, interval='1d'). A new screen cancels the running
+    one; shards already in flight finish in their processes but their
+    matches are no longer reported.
+    """
+
+    matched = pyqtSignal(str, object)  # symbol, {indicator: latest value}
+    finished = pyqtSignal(object)      # screener.ScreenStats
+    failed = pyqtSignal(str)
+
+    def __init__(self, screener, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.screener = screener
+
+    def warm(self):
+        """Spawn the screener processes in the background."""
+        self.pool.start(Worker(lambda token, progress: self.screener.warm()))
+
+    def work(self, rule, symbols, interval='1d', *, token, progress):
+        def on_match(symbol, values):
+            if not token.cancelled:
+                self.matched.emit(symbol, values)
+
+        matches, stats = self.screener.run(rule, symbols, interval, on_match=on_match, token=token)
+        return stats
+
+
+# ============================================
+# EXPORT / IMPORT
+# ============================================
+class ExportWorker(LatestRequestWorker):
+    """Streams the trade journal to a file on the pool (see export.py)."""
+
+    progress = pyqtSignal(int, str)   # percent, message
+    finished = pyqtSignal(str, int)   # path, rows written
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.db = db
+
+    def work(self, user_id, path, format='csv', *, token, progress):
+        return export.export_trades(self.db, user_id, path, format, token=token, progress=progress)
+
+    def on_result(self, args, rows):
+        self.finished.emit(args[1], rows)
+
+
+class ImportWorker(LatestRequestWorker):
+    """Bulk imports a trade file on the pool (see trade_import.py)."""
+
+    progress = pyqtSignal(int, str)   # percent, message
+    finished = pyqtSignal(object)     # trade_import.ImportResult
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.db = db
+
+    def work(self, user_id, path, *, token, progress):
+        return trade_import.import_trades(self.db, user_id, path, token=token, progress=progress)
+
+
+# ============================================
+# ANALYTICS
+# ============================================
+class AnalyticsWorker(LatestRequestWorker):
+    """Computes a user's analytics.Report on the pool."""
+
+    progress = pyqtSignal(int, str)   # percent, message
+    finished = pyqtSignal(object)     # analytics.Report
+    failed = pyqtSignal(str)
+
+    def __init__(self, analytics, parent=None, pool=None):
+        super().__init__(parent, pool)
+        self.analytics = analytics
+
+    def work(self, user_id, *, token, progress):
+        return self.analytics.report(user_id, token=token, progress=progress)
+
+
+# ============================================
+# LIVE TICKS
+# ============================================
+class TickSubscriber(QObject):
+    """
+    Polls a ticks.TickHub subscription on the GUI thread at a fixed rate.
+
+    Feeds never post anything to the event loop: each timeout delivers
+    the symbols that moved since the previous one, conflated to their
+    latest tick, as one `updated` signal.
+    """
+
+    updated = pyqtSignal(object)  # list of ticks.Tick
+
+    def __init__(self, hub, symbols=None, interval=ticks.UPDATE_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.subscription = hub.subscribe(symbols)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start()
+
+    def set_symbols(self, symbols):
+        self.subscription.set_symbols(symbols)
+
+    def set_interval(self, interval):
+        self.timer.setInterval(interval)
+
+    def stop(self):
+        self.timer.stop()
+
+    def poll(self):
+        updates = self.subscription.poll()
+        if updates:
+            self.updated.emit(updates)